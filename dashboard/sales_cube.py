@@ -0,0 +1,64 @@
+"""Queries of filtered slices of the sales cube for the dashboard.
+
+The dbt model ``analytics.sales_cube`` holds the orders aggregated by date, country, product,
+channel and priority. Any slice the dashboard shows is a rollup of it: filter the cells, group
+them by some of the dimensions and sum the measures. Averages are computed from the rolled-up
+sums, since averaging the cells' averages would weight every cell the same.
+"""
+
+from collections.abc import Mapping, Sequence
+from datetime import date
+
+CUBE_TABLE = "analytics.sales_cube"
+DIMENSIONS = ("order_date", "region", "country", "item_type", "sales_channel", "order_priority")
+MEASURES = {
+    "order_count": "sum(order_count)",
+    "total_units": "sum(total_units)",
+    "total_revenue": "sum(total_revenue)",
+    "total_profit": "sum(total_profit)",
+    "avg_days_to_ship": "sum(total_days_to_ship) / nullif(sum(order_count), 0)",
+    "profit_margin": "sum(total_profit) / nullif(sum(total_revenue), 0) * 100",
+}
+
+
+def sales_slice_query(
+    group_by: Sequence[str],
+    filters: Mapping[str, object | Sequence[object]] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> tuple[str, dict[str, object]]:
+    """Return the query rolling the cube up by dimensions, and its bind parameters.
+
+    ``filters`` maps a dimension to a value or a list of accepted values; an empty list
+    accepts none, so the slice is empty. The date range includes both ends. Dimension names
+    are checked, and values are bound, not inlined.
+    """
+    filters = filters or {}
+    unknown = [name for name in (*group_by, *filters) if name not in DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown sales cube dimensions: {', '.join(unknown)}")
+
+    conditions = []
+    params: dict[str, object] = {}
+    for name, value in filters.items():
+        values = list(value) if isinstance(value, list | tuple | set) else [value]
+        placeholders = []
+        for position, item in enumerate(values):
+            params[f"{name}_{position}"] = item
+            placeholders.append(f"%({name}_{position})s")
+        # "in ()" is a syntax error
+        conditions.append(f"{name} in ({', '.join(placeholders)})" if placeholders else "false")
+    if start_date:
+        params["start_date"] = start_date
+        conditions.append("order_date >= %(start_date)s")
+    if end_date:
+        params["end_date"] = end_date
+        conditions.append("order_date <= %(end_date)s")
+
+    columns = [*group_by, *(f"{expression} as {name}" for name, expression in MEASURES.items())]
+    query = f"select {', '.join(columns)} from {CUBE_TABLE}"  # noqa: S608
+    if conditions:
+        query += f" where {' and '.join(conditions)}"
+    if group_by:
+        query += f" group by {', '.join(group_by)} order by {', '.join(group_by)}"
+    return query, params
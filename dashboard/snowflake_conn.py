@@ -1,24 +1,32 @@
-import os
+from collections.abc import Mapping, Sequence
+from datetime import date
 
 import pandas as pd
 from dotenv import load_dotenv
-from snowflake.sqlalchemy import URL
-from sqlalchemy import create_engine
+
+from dashboard.sales_cube import sales_slice_query
+from utils.snowflake_session import session
 
 load_dotenv()
 
 
-engine = create_engine(
-    URL(
-        account=os.getenv("SNOWFLAKE_ACCOUNT"),
-        user=os.getenv("SNOWFLAKE_USER"),
-        password=os.getenv("SNOWFLAKE_PASSWORD"),
-        database=os.getenv("SNOWFLAKE_DATABASE"),
-        warehouse=os.getenv("SNOWFLAKE_WAREHOUSE"),
-    ),
-)
+def load_snowflake_data(
+    query: str,
+    params: Sequence | Mapping | None = None,
+) -> pd.DataFrame:
+    """Load data from Snowflake using the provided query, over a pooled session."""
+    with session("dashboard") as conn, conn.cursor() as cursor:
+        cursor.execute(query, params)
+        columns = [column[0] for column in cursor.description]
+        return pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
 
 
-def load_snowflake_data(query: str, **kwargs: object) -> pd.DataFrame:
-    """Load data from Snowflake using the provided query."""
-    return pd.read_sql(query, engine, **kwargs)
+def load_sales_slice(
+    group_by: Sequence[str],
+    filters: Mapping[str, object | Sequence[object]] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> pd.DataFrame:
+    """Load a filtered rollup of the sales cube; see ``sales_slice_query``."""
+    query, params = sales_slice_query(group_by, filters, start_date, end_date)
+    return load_snowflake_data(query, params)
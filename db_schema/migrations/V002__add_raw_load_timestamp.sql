@@ -0,0 +1,4 @@
+-- Load timestamp of each raw row, which drives the incremental dbt models. Snowflake cannot
+-- add a column with a CURRENT_TIMESTAMP default to an existing table, so the pipeline sets it
+-- after every load instead (utils.bulk_load.stamp_loaded_rows).
+ALTER TABLE raw_sales_data ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMP_LTZ;
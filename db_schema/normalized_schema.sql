@@ -1,34 +1,55 @@
-CREATE TABLE IF NOT EXISTS region (region VARCHAR(255) PRIMARY KEY);
+-- Surrogate keys are NUMBER(20, 0): the lower 64 bits of the MD5 of the natural key, derived
+-- the same way by the dbt models (macro integer_key), so facts need no key lookups.
+-- loaded_at is the load time of the latest raw row behind each row; the incremental models
+-- read the raw rows loaded after it.
+CREATE TABLE IF NOT EXISTS region (
+    region_id NUMBER(20, 0) PRIMARY KEY,
+    region VARCHAR(255) NOT NULL UNIQUE,
+    loaded_at TIMESTAMP_LTZ
+);
 
 CREATE TABLE IF NOT EXISTS country (
-    country VARCHAR(255) PRIMARY KEY,
-    region VARCHAR(255) NOT NULL
+    country_id NUMBER(20, 0) PRIMARY KEY,
+    country VARCHAR(255) NOT NULL UNIQUE,
+    region_id NUMBER(20, 0) NOT NULL,
+    loaded_at TIMESTAMP_LTZ
 );
 
 CREATE TABLE IF NOT EXISTS product (
-    item_type VARCHAR(255) PRIMARY KEY,
+    product_id NUMBER(20, 0) PRIMARY KEY,
+    item_type VARCHAR(255) NOT NULL UNIQUE,
     unit_cost FLOAT,
-    unit_price FLOAT
+    unit_price FLOAT,
+    loaded_at TIMESTAMP_LTZ
 );
 
-CREATE TABLE IF NOT EXISTS order_priority (order_priority VARCHAR(255) PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS order_priority (
+    order_priority_id NUMBER(20, 0) PRIMARY KEY,
+    order_priority VARCHAR(255) NOT NULL UNIQUE,
+    loaded_at TIMESTAMP_LTZ
+);
 
 CREATE TABLE IF NOT EXISTS orders (
-    id VARCHAR(255) PRIMARY KEY,
-    source_order_id INTEGER,
-    country VARCHAR(255) NOT NULL,
+    id NUMBER(20, 0) PRIMARY KEY,
+    source_order_id INTEGER NOT NULL UNIQUE,
+    country_id NUMBER(20, 0) NOT NULL,
     is_online BOOLEAN,
-    order_priority VARCHAR(255) NOT NULL,
-    product_id VARCHAR(255) NOT NULL,
+    order_priority_id NUMBER(20, 0) NOT NULL,
+    product_id NUMBER(20, 0) NOT NULL,
     units_sold INTEGER,
+    unit_price FLOAT,
+    unit_cost FLOAT,
+    revenue FLOAT,
+    profit FLOAT,
     order_date DATE,
-    ship_date DATE
+    ship_date DATE,
+    loaded_at TIMESTAMP_LTZ
 );
 
-ALTER TABLE country ADD FOREIGN KEY (region) REFERENCES region (region);
+ALTER TABLE country ADD FOREIGN KEY (region_id) REFERENCES region (region_id);
 
-ALTER TABLE orders ADD FOREIGN KEY (country) REFERENCES country (country);
+ALTER TABLE orders ADD FOREIGN KEY (country_id) REFERENCES country (country_id);
 
-ALTER TABLE orders ADD FOREIGN KEY (order_priority) REFERENCES order_priority (order_priority);
+ALTER TABLE orders ADD FOREIGN KEY (order_priority_id) REFERENCES order_priority (order_priority_id);
 
-ALTER TABLE orders ADD FOREIGN KEY (product_id) REFERENCES product (item_type);
+ALTER TABLE orders ADD FOREIGN KEY (product_id) REFERENCES product (product_id);
@@ -0,0 +1,18 @@
+{% macro integer_key(columns) %}
+    {#-
+        Deterministic 64-bit integer surrogate key of the columns: the lower 64 bits of the
+        MD5 of their values, concatenated like dbt_utils.generate_surrogate_key does. The same
+        values give the same key on every run, so facts derive the keys of their dimensions
+        without a lookup join.
+    -#}
+    {%- set fields = [] -%}
+    {%- for column in columns -%}
+        {%- do fields.append(
+            "coalesce(cast(" ~ column ~ " as varchar), '_dbt_utils_surrogate_key_null_')"
+        ) -%}
+        {%- if not loop.last -%}
+            {%- do fields.append("'-'") -%}
+        {%- endif -%}
+    {%- endfor -%}
+    md5_number_lower64({{ dbt.concat(fields) }})
+{%- endmacro %}
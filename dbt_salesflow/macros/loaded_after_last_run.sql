@@ -0,0 +1,23 @@
+{% macro loaded_after_last_run(column='loaded_at') %}
+    {#-
+        Rows loaded after the latest load timestamp already in the incremental model.
+
+        A relation deployed by an earlier version of the models has no loaded_at column, and
+        no integer keys to merge on either, so it cannot be upgraded incrementally: rebuild
+        the models once with `dbt run --full-refresh`. Compilation fails until then.
+    -#}
+    {%- if execute -%}
+        {%- set relation = load_relation(this) -%}
+        {%- set existing_columns = adapter.get_columns_in_relation(relation)
+            | map(attribute='name') | map('lower') | list if relation else [] -%}
+        {%- if relation and 'loaded_at' not in existing_columns -%}
+            {{ exceptions.raise_compiler_error(
+                this ~ " was built by an earlier version of the model and has no loaded_at"
+                ~ " column; upgrade it with `dbt run --full-refresh`"
+            ) }}
+        {%- endif -%}
+    {%- endif -%}
+    {{ column }} > (
+        select coalesce(max(loaded_at), '1900-01-01'::timestamp_ltz) from {{ this }}
+    )
+{%- endmacro %}
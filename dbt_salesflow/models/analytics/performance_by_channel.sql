@@ -1,12 +1,18 @@
+{{ config(unique_key='sales_channel') }}
+
 select
-    case when is_online then 'Online' else 'Offline' end as sales_channel,
-    count(distinct id) as order_count,
-    sum(units_sold) as total_units,
-    sum(units_sold * p.unit_price) as total_revenue,
-    sum(units_sold * (p.unit_price - p.unit_cost)) as total_profit
+    sales_channel,
+    sum(order_count) as order_count,
+    sum(total_units) as total_units,
+    sum(total_revenue) as total_revenue,
+    sum(total_profit) as total_profit,
+    max(loaded_at) as loaded_at
 from
-    {{ ref('orders') }} o
-join
-    {{ ref('product') }} p on o.product_id = p.item_type
+    {{ ref('sales_cube') }}
+{% if is_incremental() %}
+where sales_channel in (
+    select sales_channel from {{ ref('sales_cube') }} where {{ loaded_after_last_run() }}
+)
+{% endif %}
 group by
-    is_online
+    sales_channel
@@ -1,14 +1,20 @@
+{{ config(unique_key='order_priority') }}
+
+-- The average is rolled up from the cube's sums, not averaged again
 select
-    o.order_priority,
-    avg(datediff('day', o.order_date, o.ship_date)) as avg_days_to_ship,
-    count(distinct o.id) as order_count,
-    sum(o.units_sold * p.unit_price) as total_revenue,
-    sum(o.units_sold * (p.unit_price - p.unit_cost)) as total_profit,
+    order_priority,
+    sum(total_days_to_ship) / nullif(sum(order_count), 0) as avg_days_to_ship,
+    sum(total_days_to_ship) as total_days_to_ship,
+    sum(order_count) as order_count,
+    sum(total_revenue) as total_revenue,
+    sum(total_profit) as total_profit,
+    max(loaded_at) as loaded_at
 from
-    {{ ref('orders') }} o
-join
-    {{ ref('product') }} p on o.product_id = p.item_type
+    {{ ref('sales_cube') }}
+{% if is_incremental() %}
+where order_priority in (
+    select order_priority from {{ ref('sales_cube') }} where {{ loaded_after_last_run() }}
+)
+{% endif %}
 group by
-    o.order_priority
-order by
-    avg_days_to_ship
+    order_priority
@@ -1,18 +1,38 @@
+{{
+  config(
+    incremental_strategy='delete+insert',
+    unique_key='country'
+  )
+}}
+
+-- One row per country, under its current region. Replacing the rows of each recomputed
+-- country drops the row of its old region when it moves to another one.
 select
-    r.region,
-    c.country,
-    sum(o.units_sold * p.unit_price) as total_revenue,
-    sum(o.units_sold * (p.unit_price - p.unit_cost)) as total_profit,
-    count(distinct o.id) as order_count
+    region,
+    country,
+    sum(total_revenue) as total_revenue,
+    sum(total_profit) as total_profit,
+    sum(order_count) as order_count,
+    max(loaded_at) as loaded_at
 from
-    {{ ref('orders') }} o
-join
-    {{ ref('country') }} c on o.country = c.country
-join
-    {{ ref('region') }} r on c.region = r.region
-join
-    {{ ref('product') }} p on o.product_id = p.item_type
+    {{ ref('sales_cube') }}
+{% if is_incremental() %}
+-- Recompute the countries that have orders loaded since the last run, and those that moved
+-- to another region since their row was built
+where country in (
+    select country from {{ ref('sales_cube') }} where {{ loaded_after_last_run() }}
+    union
+    select
+        existing.country
+    from
+        {{ this }} existing
+    join
+        {{ ref('country') }} c on existing.country = c.country
+    join
+        {{ ref('region') }} r on c.region_id = r.region_id
+    where
+        existing.region <> r.region
+)
+{% endif %}
 group by
-    r.region, c.country
-order by
-    total_revenue desc
+    region, country
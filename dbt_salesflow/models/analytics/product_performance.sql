@@ -1,14 +1,19 @@
+{{ config(unique_key='item_type') }}
+
+-- The margin is a ratio of sums, so it is recomputed from the cube's sums
 select
-    p.item_type,
-    sum(o.units_sold) as total_units,
-    sum(o.units_sold * p.unit_price) as total_revenue,
-    sum(o.units_sold * (p.unit_price - p.unit_cost)) as total_profit,
-    (sum(o.units_sold * (p.unit_price - p.unit_cost)) / nullif(sum(o.units_sold * p.unit_price), 0)) * 100 as profit_margin
+    item_type,
+    sum(total_units) as total_units,
+    sum(total_revenue) as total_revenue,
+    sum(total_profit) as total_profit,
+    (sum(total_profit) / nullif(sum(total_revenue), 0)) * 100 as profit_margin,
+    max(loaded_at) as loaded_at
 from
-    {{ ref('orders') }} o
-join
-    {{ ref('product') }} p on o.product_id = p.item_type
+    {{ ref('sales_cube') }}
+{% if is_incremental() %}
+where item_type in (
+    select item_type from {{ ref('sales_cube') }} where {{ loaded_after_last_run() }}
+)
+{% endif %}
 group by
-    p.item_type
-order by
-    total_profit desc
+    item_type
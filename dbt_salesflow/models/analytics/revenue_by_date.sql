@@ -1,12 +1,17 @@
+{{ config(unique_key='order_date') }}
+
 select
-    o.order_date,
-    sum(o.units_sold * p.unit_price) as total_revenue,
-    sum(o.units_sold * (p.unit_price - p.unit_cost)) as total_profit
+    order_date,
+    sum(total_revenue) as total_revenue,
+    sum(total_profit) as total_profit,
+    max(loaded_at) as loaded_at
 from
-    {{ ref('orders') }} o
-join
-    {{ ref('product') }} p on o.product_id = p.item_type
+    {{ ref('sales_cube') }}
+{% if is_incremental() %}
+-- Recompute only the dates that have orders loaded since the last run
+where order_date in (
+    select order_date from {{ ref('sales_cube') }} where {{ loaded_after_last_run() }}
+)
+{% endif %}
 group by
-    o.order_date
-order by
-    o.order_date
+    order_date
@@ -0,0 +1,74 @@
+{{
+  config(
+    incremental_strategy='delete+insert',
+    unique_key='order_date'
+  )
+}}
+
+-- Orders aggregated to one row per date, country, product, channel and priority. The analytics
+-- models and the dashboard roll it up instead of scanning orders. Orders carry their revenue
+-- and profit, so they are aggregated in a join-free scan on their integer keys, and only the
+-- aggregated cells are joined to the dimension names. A run rebuilds the dates that have
+-- orders loaded since the last run, so a cell left without orders is removed rather than
+-- kept stale, and the dates with cells of a country that has since moved to another region,
+-- so no cell keeps the old region.
+with cells as (
+    select
+        order_date,
+        country_id,
+        product_id,
+        is_online,
+        order_priority_id,
+        count(distinct id) as order_count,
+        sum(units_sold) as total_units,
+        sum(revenue) as total_revenue,
+        sum(profit) as total_profit,
+        sum(datediff('day', order_date, ship_date)) as total_days_to_ship,
+        max(loaded_at) as loaded_at
+    from
+        {{ ref('orders') }}
+    {% if is_incremental() %}
+    where order_date in (
+        select order_date from {{ ref('orders') }} where {{ loaded_after_last_run() }}
+        union
+        select
+            existing.order_date
+        from
+            {{ this }} existing
+        join
+            {{ ref('country') }} c on existing.country = c.country
+        join
+            {{ ref('region') }} r on c.region_id = r.region_id
+        where
+            existing.region <> r.region
+    )
+    {% endif %}
+    group by
+        order_date, country_id, product_id, is_online, order_priority_id
+)
+
+-- Every order falls in exactly one cell, so order counts add up across cells, and averages
+-- are rolled up as a sum divided by a count
+select
+    cells.order_date,
+    r.region,
+    c.country,
+    p.item_type,
+    case when cells.is_online then 'Online' else 'Offline' end as sales_channel,
+    op.order_priority,
+    cells.order_count,
+    cells.total_units,
+    cells.total_revenue,
+    cells.total_profit,
+    cells.total_days_to_ship,
+    cells.loaded_at
+from
+    cells
+join
+    {{ ref('country') }} c on cells.country_id = c.country_id
+join
+    {{ ref('region') }} r on c.region_id = r.region_id
+join
+    {{ ref('product') }} p on cells.product_id = p.product_id
+join
+    {{ ref('order_priority') }} op on cells.order_priority_id = op.order_priority_id
@@ -1,5 +1,35 @@
-select distinct
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='country_id'
+  )
+}}
+
+-- Countries of the clean rows loaded since the last run: unseen ones are inserted, and the
+-- region of known ones is updated from their latest row
+with latest_countries as (
+    select
+        country,
+        region,
+        loaded_at,
+        row_number() over (
+            partition by country
+            order by loaded_at desc nulls last, order_date desc
+        ) as row_num
+    from
+        {{ ref('raw_sales_data_clean') }}
+    {% if is_incremental() %}
+    where {{ loaded_after_last_run() }}
+    {% endif %}
+)
+
+select
+    {{ integer_key(['country']) }} as country_id,
     country,
-    region
+    {{ integer_key(['region']) }} as region_id,
+    loaded_at
 from
-    {{ ref('raw_sales_data_clean') }}
+    latest_countries
+where
+    row_num = 1
@@ -1,4 +1,20 @@
-select distinct
-    order_priority
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='order_priority_id'
+  )
+}}
+
+-- Priorities of the clean rows loaded since the last run; unseen ones are inserted
+select
+    {{ integer_key(['order_priority']) }} as order_priority_id,
+    order_priority,
+    max(loaded_at) as loaded_at
 from
     {{ ref('raw_sales_data_clean') }}
+{% if is_incremental() %}
+where {{ loaded_after_last_run() }}
+{% endif %}
+group by
+    order_priority
@@ -1,19 +1,47 @@
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='source_order_id',
+    on_schema_change='append_new_columns'
+  )
+}}
+
+-- Merged on the source order id: a clean row replaced by a copy of the order with an earlier
+-- order date updates the order, with the price of that copy, instead of adding a second one
 select
-    {{ dbt_utils.generate_surrogate_key(['order_id', 'order_date']) }} as id,
+    {{ integer_key(['order_id']) }} as id,
     order_id as source_order_id,
-    country,
+    -- Dimension keys derived from the natural keys, as the dimensions derive them
+    {{ integer_key(['country']) }} as country_id,
     case
       when sales_channel = 'Online' then true
       when sales_channel = 'Offline' then false
     end as is_online,
-    order_priority,
-    item_type as product_id,
+    {{ integer_key(['order_priority']) }} as order_priority_id,
+    {{ integer_key(['item_type']) }} as product_id,
     units_sold,
+    -- Cost and price at order time, as recorded on the order, so later price changes of the
+    -- product do not rewrite the revenue and profit of past orders
+    unit_price,
+    unit_cost,
+    units_sold * unit_price as revenue,
+    units_sold * (unit_price - unit_cost) as profit,
     order_date,
-    ship_date
+    ship_date,
+    loaded_at
 from
     {{ ref('raw_sales_data_clean') }}
 
 {% if is_incremental() %}
-    where order_date > (select max(order_date) from {{ this }})
+    -- Re-read the last days already loaded so that late-arriving orders are merged in, and
+    -- the clean rows loaded since the last run whatever their order date
+    where order_date >= (
+        select coalesce(
+            dateadd(day, -{{ var('orders_lookback_days') }}, max(order_date)),
+            '1900-01-01'::date
+        )
+        from {{ this }}
+    )
+    or {{ loaded_after_last_run() }}
 {% endif %}
@@ -1,6 +1,37 @@
-select distinct
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='product_id'
+  )
+}}
+
+-- Products of the clean rows loaded since the last run: unseen ones are inserted, and the
+-- cost and price of known ones are updated from their latest row
+with latest_products as (
+    select
+        item_type,
+        unit_cost,
+        unit_price,
+        loaded_at,
+        row_number() over (
+            partition by item_type
+            order by loaded_at desc nulls last, order_date desc
+        ) as row_num
+    from
+        {{ ref('raw_sales_data_clean') }}
+    {% if is_incremental() %}
+    where {{ loaded_after_last_run() }}
+    {% endif %}
+)
+
+select
+    {{ integer_key(['item_type']) }} as product_id,
     item_type,
     unit_cost,
-    unit_price
+    unit_price,
+    loaded_at
 from
-    {{ ref('raw_sales_data_clean') }}
+    latest_products
+where
+    row_num = 1
@@ -1,4 +1,24 @@
-select distinct
-    region
+-- depends_on: {{ ref('country') }}
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='region_id',
+    post_hook="delete from {{ this }} where region_id not in (select region_id from {{ ref('country') }})"
+  )
+}}
+
+-- Regions of the clean rows loaded since the last run; unseen ones are inserted. A country
+-- that moved to another region can leave its old region without countries, which the post-hook
+-- deletes, so region is built after country.
+select
+    {{ integer_key(['region']) }} as region_id,
+    region,
+    max(loaded_at) as loaded_at
 from
     {{ ref('raw_sales_data_clean') }}
+{% if is_incremental() %}
+where {{ loaded_after_last_run() }}
+{% endif %}
+group by
+    region
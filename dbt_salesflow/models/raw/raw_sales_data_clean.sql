@@ -1,24 +1,52 @@
-with deduplicated_sales as (
+{{
+  config(
+    materialized='incremental',
+    incremental_strategy='merge',
+    unique_key='order_id',
+    on_schema_change='append_new_columns'
+  )
+}}
+
+-- Only the raw rows loaded since the last run are deduplicated, then merged on order_id
+with new_sales as (
+    select *
+    from {{ source('raw', 'raw_sales_data') }}
+    {% if is_incremental() %}
+    where {{ loaded_after_last_run() }}
+    {% endif %}
+),
+
+deduplicated_sales as (
     select
         *,
         row_number() over (
             partition by order_id
-            order by order_date
+            order by order_date, loaded_at
         ) as row_num
-    from {{ source('raw', 'raw_sales_data') }}
+    from new_sales
 )
 
 select
-    region,
-    country,
-    item_type,
-    sales_channel,
-    order_priority,
-    order_date,
-    order_id,
-    ship_date,
-    units_sold,
-    unit_price,
-    unit_cost
-from deduplicated_sales
-where row_num = 1
+    sales.region,
+    sales.country,
+    sales.item_type,
+    sales.sales_channel,
+    sales.order_priority,
+    sales.order_date,
+    sales.order_id,
+    sales.ship_date,
+    sales.units_sold,
+    sales.unit_price,
+    sales.unit_cost,
+    sales.loaded_at
+from deduplicated_sales as sales
+where sales.row_num = 1
+{% if is_incremental() %}
+    -- Keep the earliest order_date: a new row only replaces a clean one with a later date
+    and not exists (
+        select 1
+        from {{ this }} as clean
+        where clean.order_id = sales.order_id
+          and clean.order_date <= sales.order_date
+    )
+{% endif %}
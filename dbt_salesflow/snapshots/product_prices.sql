@@ -0,0 +1,22 @@
+{% snapshot product_prices %}
+
+{{
+  config(
+    target_schema='normalized',
+    unique_key='product_id',
+    strategy='check',
+    check_cols=['unit_cost', 'unit_price']
+  )
+}}
+
+-- Price history of each product (SCD2): a change of cost or price closes the current row
+-- (dbt_valid_to) and opens a new one, so past prices stay queryable
+select
+    product_id,
+    item_type,
+    unit_cost,
+    unit_price
+from
+    {{ ref('product') }}
+
+{% endsnapshot %}
@@ -9,7 +9,7 @@ analytics_countries AS (
 normalized_countries AS (
   SELECT r.region, COUNT(DISTINCT c.country) AS country_count
   FROM {{ ref('region') }} r
-  JOIN {{ ref('country') }} c ON r.region = c.region
+  JOIN {{ ref('country') }} c ON r.region_id = c.region_id
   GROUP BY r.region
 )
 
@@ -3,5 +3,5 @@
 SELECT
   r.region
 FROM {{ ref('region') }} r
-LEFT JOIN {{ ref('country') }} c ON r.region = c.region
+LEFT JOIN {{ ref('country') }} c ON r.region_id = c.region_id
 WHERE c.country IS NULL
@@ -3,18 +3,29 @@ Entry point script that orchestrates the data pipeline process:
 1. Downloads sample data
 2. Creates Azure services and uploads to Azure Blob Storage
 3. Initializes Snowflake structures
-4. Creates and triggers ADF pipeline to load data into Snowflake
+4. Creates and triggers ADF pipeline to load data into Snowflake, waiting for the copy, or with
+LOADER=direct stages the local extract in Snowflake and loads it with COPY INTO; once rows were
+loaded into Snowflake, their load time is stamped
+5. Runs dbt transformations and the product price snapshot once the copy has succeeded
+
+The staged blobs the load copied are recorded as loaded once step 5 succeeded. Steps 4 and 5
+are skipped when every staged blob was already loaded with its current content, so a failed
+load or dbt run is retried by the next run.
 """
 
 import shutil
 import subprocess
 from pathlib import Path
 
-from scripts import adf_pipeline_creator, azure_blob_upload, init_snowflake_db
+from scripts import adf_pipeline_creator, azure_blob_upload, init_snowflake_db, snowflake_loader
+from utils import config, snowflake_session
+from utils.bulk_load import stamp_loaded_rows
 from utils.logger import get_logger
 
 logger = get_logger()
 
+LOADERS = ("adf", "direct")
+
 
 class PipelineError(Exception):
     """Custom exception for pipeline processing failures."""
@@ -51,6 +62,22 @@ def run_dbt() -> bool:
 
         logger.info("dbt run completed successfully: %s", result.stdout)
 
+        # Record product price changes in the product_prices snapshot
+        snapshot_result = subprocess.run(
+            [dbt_executable, "snapshot", "--profiles-dir", profiles_dir],
+            cwd=dbt_project_path,
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+
+        if snapshot_result.returncode != 0:
+            logger.error("dbt stderr: %s", snapshot_result.stderr)
+            logger.error("dbt snapshot failed with exit code %d", snapshot_result.returncode)
+            return False
+
+        logger.info("dbt snapshot completed: %s", snapshot_result.stdout)
+
         # Optionally run tests
         test_result = subprocess.run(
             [dbt_executable, "test", "--profiles-dir", profiles_dir],
@@ -79,24 +106,62 @@ def main() -> None:
     """Execute the full data pipeline initialization sequence."""
 
     logger.info("Starting data pipeline initialization...")
+    load_settings = config.get_load_settings()
+    loader = load_settings["loader"]
+    if loader not in LOADERS:
+        raise ValueError(f"Unknown loader: {loader}")
+    # Checked before anything is provisioned or uploaded
+    if loader == "direct" and config.get_upload_settings()["mode"] == "pipelined":
+        raise ValueError("The direct loader needs the local extract, which pipelined uploads skip")
 
     # Step 1: Upload data to Azure Blob
     logger.info("Uploading data to Azure Blob Storage...")
-    azure_blob_upload.main()
+    pending_blobs = azure_blob_upload.main()
 
     # Step 2: Initialize Snowflake database and database_schemas
     logger.info("Initializing Snowflake structures...")
     init_snowflake_db.main()
 
-    # Step 3: Create and run ADF pipeline to load data to Snowflake
-    logger.info("Creating and running Azure Data Factory pipeline...")
-    adf_pipeline_creator.main()
+    if not pending_blobs:
+        logger.info("Source data was already loaded, skipping the load and dbt transformations")
+        return
+
+    # Step 3: Load the data into Snowflake, with ADF or directly with PUT and COPY INTO.
+    # Both block until the load finished and raise if it failed, so dbt never sees a
+    # partial load.
+    if loader == "direct":
+        logger.info("Loading the extract directly into Snowflake...")
+        load_report = snowflake_loader.main(pending_blobs)
+    else:
+        logger.info("Creating and running Azure Data Factory pipeline...")
+        load_report = adf_pipeline_creator.main()
+    logger.info(
+        "%s load copied %d rows (%d skipped) in %.1fs",
+        loader.upper(),
+        load_report.rows_copied,
+        load_report.rows_skipped,
+        load_report.duration,
+    )
+
+    # Stamp the new raw rows, which the incremental dbt models read. The local backend of the
+    # direct loader loads into SQLite, so there is nothing to stamp in Snowflake.
+    if loader == "adf" or load_settings["backend"] == "snowflake":
+        with snowflake_session.session("loader") as conn, conn.cursor() as cursor:
+            stamped = stamp_loaded_rows(cursor)
+        logger.info("Stamped the load time of %d new raw rows", stamped)
+    snowflake_session.log_pool_metrics()
 
     # Step 4: Run dbt transformations
     logger.info("Running dbt transformations...")
     if not run_dbt():
         raise PipelineError("dbt processing failed")
 
+    # An incremental ADF copy leaves blobs staged after its window to the next run
+    loaded_blobs = pending_blobs
+    if loader == "adf":
+        copied = set(load_report.copied_blobs)
+        loaded_blobs = [name for name in pending_blobs if name in copied]
+    azure_blob_upload.mark_loaded(loaded_blobs)
     logger.info("Pipeline initialization completed successfully!")
 
 
@@ -1,6 +1,8 @@
 """Script to load data from Azure Blob Storage to Snowflake RAW schema."""
 
-import time
+from collections.abc import Callable, Collection
+from dataclasses import dataclass
+from pathlib import Path
 
 from azure.core.exceptions import ResourceNotFoundError
 from azure.mgmt.datafactory import DataFactoryManagementClient
@@ -9,28 +11,169 @@ from azure.mgmt.datafactory.models import (
     DatasetResource,
     DelimitedTextDataset,
     Factory,
+    JsonDataset,
     LinkedServiceReference,
     LinkedServiceResource,
+    ParquetDataset,
     PipelineResource,
+    SecureString,
+    SnowflakeV2LinkedService,
 )
+from azure.storage.blob import BlobProperties, ContainerClient
 
 from utils import config
+from utils.adf_deploy import FactoryResource, deploy_resources
+from utils.adf_monitor import PipelineRunError, PipelineRunReport, monitor_pipeline_run
 from utils.azure import get_azure_credential
 from utils.logger import get_logger
+from utils.partition_status import (
+    failed_partitions,
+    partition_list_blob,
+    read_partition_status,
+    record_partition_status,
+    write_partition_list,
+)
+from utils.provisioning import DATA_FACTORY_LOCATION, poll_provisioning
+from utils.sales_data import (
+    RAW_COLUMNS,
+    changed_files_manifest,
+    partition_glob,
+    partition_prefix,
+    staged_blob_name,
+)
+from utils.watermark import EPOCH, LoadWindow, advance_watermark, next_window
 
 logger = get_logger(__name__)
 
 RAW_TABLE_NAME = "RAW_SALES_DATA"
 SCHEMA_RAW = "RAW"
+SOURCE_DATASETS = {"csv": "SalesCSV", "parquet": "SalesParquet"}
+TARGET_DATASET = "RawSalesTable"
+BLOB_LINKED_SERVICE = "AzureBlobStorage"
+SNOWFLAKE_LINKED_SERVICE = "SnowflakeDB"
+PIPELINE_NAME = "RawDataLoadPipeline"
+PARTITION_LIST_DATASET = "SalesPartitionList"
+COPY_STAGING_FOLDER = "adf-staging"
+DEFAULT_BATCH_COUNT = 8
+# Upper bound ADF allows for the batch count of a ForEach
+MAX_BATCH_COUNT = 50
+
+
+@dataclass(frozen=True)
+class ThroughputProfile:
+    """Copy activity settings for loads up to ``max_input_bytes`` of staged data.
+
+    Staged copies first write interim data to the storage account. Partitions are read
+    without partition discovery: the year and month of their Hive-style folders are already
+    in the order date, and the raw table has no columns to map them to.
+    """
+
+    name: str
+    max_input_bytes: int | None
+    data_integration_units: int
+    parallel_copies: int
+    enable_staging: bool = False
+
+
+THROUGHPUT_PROFILES = {
+    profile.name: profile
+    for profile in (
+        ThroughputProfile("small", 256 * 1024**2, data_integration_units=2, parallel_copies=1),
+        ThroughputProfile("bulk", 20 * 1024**3, data_integration_units=8, parallel_copies=8),
+        ThroughputProfile(
+            "backfill",
+            None,
+            data_integration_units=32,
+            parallel_copies=16,
+            enable_staging=True,
+        ),
+    )
+}
+
+
+def select_throughput_profile(input_bytes: int) -> ThroughputProfile:
+    """Return the smallest profile whose size limit fits the input."""
+    for profile in THROUGHPUT_PROFILES.values():
+        if profile.max_input_bytes is None or input_bytes <= profile.max_input_bytes:
+            return profile
+    raise ValueError(f"No throughput profile for {input_bytes} bytes")
+
+
+def list_staged_blobs(
+    container_client: ContainerClient,
+    blob_name: str,
+    staging_format: str = "csv",
+    partition_by: str = "none",
+) -> list[BlobProperties]:
+    """Return every staged blob of the extract: the single blob, or all its partitions."""
+    if partition_by == "none":
+        blob_client = container_client.get_blob_client(staged_blob_name(blob_name, staging_format))
+        return [blob_client.get_blob_properties()]
+    return [
+        blob
+        for blob in container_client.list_blobs(name_starts_with=partition_prefix(blob_name))
+        if blob.name.endswith(f".{staging_format}")
+    ]
+
+
+def list_input_blobs(
+    container_client: ContainerClient,
+    blob_name: str,
+    staging_format: str = "csv",
+    partition_by: str = "none",
+    window: LoadWindow | None = None,
+    include: Collection[str] = (),
+) -> list[BlobProperties]:
+    """Return the blobs the copy will read.
+
+    Incremental copies only read the blobs modified within the load window. Otherwise, for
+    partitioned extracts these are only the partitions in the changed files manifest.
+    Partitions named in ``include`` (e.g. failed ones to retry) are read regardless.
+    """
+    staged_blobs = list_staged_blobs(container_client, blob_name, staging_format, partition_by)
+    if partition_by == "none":
+        return [blob for blob in staged_blobs if not window or window.contains(blob.last_modified)]
+
+    include = set(include)
+    if window:
+
+        def selected(blob: BlobProperties) -> bool:
+            return window.contains(blob.last_modified)
+    else:
+        manifest = container_client.download_blob(changed_files_manifest(blob_name)).readall()
+        changed = set(manifest.decode().splitlines())
+
+        def selected(blob: BlobProperties) -> bool:
+            return blob.name in changed
+
+    return [blob for blob in staged_blobs if selected(blob) or blob.name in include]
+
+
+def staged_input_bytes(
+    container_client: ContainerClient,
+    blob_name: str,
+    staging_format: str = "csv",
+    partition_by: str = "none",
+    window: LoadWindow | None = None,
+) -> int:
+    """Return the size of the blobs the copy will read (see ``list_input_blobs``)."""
+    input_blobs = list_input_blobs(
+        container_client,
+        blob_name,
+        staging_format,
+        partition_by,
+        window,
+    )
+    return sum(blob.size for blob in input_blobs)
 
 
 def create_data_factory_if_not_exists(
     client: DataFactoryManagementClient,
     resource_group: str,
     factory_name: str,
-    location: str = "eastus",
+    location: str = DATA_FACTORY_LOCATION,
 ) -> Factory:
-    """Create a data factory if it doesn't already exist."""
+    """Create a data factory if it doesn't already exist and wait until it is provisioned."""
     try:
         logger.info("Checking if Data Factory %s exists...", factory_name)
         factory = client.factories.get(resource_group, factory_name)
@@ -40,213 +183,514 @@ def create_data_factory_if_not_exists(
         factory_resource = Factory(location=location)
         factory = client.factories.create_or_update(resource_group, factory_name, factory_resource)
         logger.info("Data Factory %s created successfully", factory_name)
-        # Allow time for provisioning
+
+    if factory.provisioning_state and factory.provisioning_state.lower() != "succeeded":
         logger.info("Waiting for Data Factory to be fully provisioned...")
-        time.sleep(30)
+        poll_provisioning(
+            f"Data Factory {factory_name}",
+            lambda: client.factories.get(resource_group, factory_name).provisioning_state,
+        )
 
     return factory
 
 
-def create_blob_linked_service(
-    client: DataFactoryManagementClient,
-    resource_group: str,
-    factory_name: str,
-    azure_details: dict[str, str],
-) -> None:
-    """Create and register an Azure Blob Storage linked service."""
-    logger.info("Creating Azure Blob Storage linked service...")
-
+def build_blob_linked_service(azure_details: dict[str, str]) -> LinkedServiceResource:
+    """Build the Azure Blob Storage linked service."""
     # Use SAS authentication instead of connection string
-    blob_linked_service = LinkedServiceResource(
-        properties={
-            "type": "AzureBlobStorage",
-            "typeProperties": {
-                "sasUri": f"https://{azure_details['storage_account']}.blob.core.windows.net/?{azure_details['sas_token']}",
-            },
-        },
+    sas_uri = (
+        f"https://{azure_details['storage_account']}.blob.core.windows.net/"
+        f"?{azure_details['sas_token']}"
     )
-
-    client.linked_services.create_or_update(
-        resource_group,
-        factory_name,
-        "AzureBlobStorage",
-        blob_linked_service,
+    return LinkedServiceResource.deserialize(
+        {"properties": {"type": "AzureBlobStorage", "typeProperties": {"sasUri": sas_uri}}},
     )
-    logger.info("Azure Blob Storage linked service with SAS created")
 
 
-def create_snowflake_linked_service(
-    client: DataFactoryManagementClient,
-    resource_group: str,
-    factory_name: str,
-    snowflake_details: dict[str, str],
-) -> None:
-    """Create and register a Snowflake V2 linked service."""
-    logger.info("Creating Snowflake V2 linked service...")
-
-    snowflake_linked_service = LinkedServiceResource(
-        properties={
-            "type": "SnowflakeV2",
-            "typeProperties": {
-                "accountIdentifier": snowflake_details["account"],
-                "warehouse": snowflake_details["warehouse"],
-                "database": snowflake_details["database"],
-                "schema": SCHEMA_RAW,
-                "authenticationType": "Basic",
-                "user": snowflake_details["user"],
-                "password": {"type": "SecureString", "value": snowflake_details["password"]},
-            },
-        },
-    )
+class SnowflakeV2SchemaLinkedService(SnowflakeV2LinkedService):
+    """Snowflake V2 linked service with the ``schema`` connection property.
 
-    client.linked_services.create_or_update(
-        resource_group,
-        factory_name,
-        "SnowflakeDB",
-        snowflake_linked_service,
+    The SDK model lacks the property, so a definition built from it would drop the schema
+    and the sink would fall back to the user's default schema.
+    """
+
+    _attribute_map = {  # noqa: RUF012
+        **SnowflakeV2LinkedService._attribute_map,  # noqa: SLF001
+        "schema": {"key": "typeProperties.schema", "type": "object"},
+    }
+
+    def __init__(self, *, schema: str | None = None, **kwargs: object) -> None:
+        super().__init__(**kwargs)
+        self.schema = schema
+
+
+def build_snowflake_linked_service(snowflake_details: dict[str, str]) -> LinkedServiceResource:
+    """Build the Snowflake V2 linked service, connected to the raw schema."""
+    return LinkedServiceResource(
+        properties=SnowflakeV2SchemaLinkedService(
+            account_identifier=snowflake_details["account"],
+            warehouse=snowflake_details["warehouse"],
+            database=snowflake_details["database"],
+            schema=SCHEMA_RAW,
+            authentication_type="Basic",
+            user=snowflake_details["user"],
+            password=SecureString(value=snowflake_details["password"]),
+        ),
     )
-    logger.info("Snowflake V2 linked service created")
 
 
-def create_datasets(
-    client: DataFactoryManagementClient,
-    resource_group: str,
-    factory_name: str,
+def build_datasets(
     azure_details: dict[str, str],
-) -> None:
-    """Create source and target datasets."""
-    logger.info("Creating datasets...")
-
-    # Source dataset (CSV in blob storage)
-    source_dataset = DatasetResource(
-        properties=DelimitedTextDataset(
-            linked_service_name=LinkedServiceReference(
-                reference_name="AzureBlobStorage",
-                type="LinkedServiceReference",
+    staging_format: str = "csv",
+    partition_by: str = "none",
+    *,
+    fan_out: bool = False,
+) -> dict[str, DatasetResource]:
+    """Build the source and target datasets, by name.
+
+    Partitioned sources only name the container; the copy activity selects the partition
+    files with a wildcard folder path. Fan-out pipelines also look up the partition list.
+    """
+    linked_service_name = LinkedServiceReference(
+        reference_name=BLOB_LINKED_SERVICE,
+        type="LinkedServiceReference",
+    )
+    if partition_by == "none":
+        location = AzureBlobStorageLocation(
+            container=azure_details["container_name"],
+            file_name=staged_blob_name(azure_details["blob_name"], staging_format),
+        )
+    else:
+        location = AzureBlobStorageLocation(container=azure_details["container_name"])
+    if staging_format == "parquet":
+        # Source dataset (typed Parquet in blob storage)
+        source_dataset = DatasetResource(
+            properties=ParquetDataset(
+                linked_service_name=linked_service_name,
+                location=location,
             ),
-            location=AzureBlobStorageLocation(
-                container=azure_details["container_name"],
-                file_name=azure_details["blob_name"],
+        )
+    else:
+        # Source dataset (CSV in blob storage)
+        source_dataset = DatasetResource(
+            properties=DelimitedTextDataset(
+                linked_service_name=linked_service_name,
+                location=location,
+                column_delimiter=",",
+                row_delimiter="\n",
             ),
-            column_delimiter=",",
-            row_delimiter="\n",
-        ),
-    )
+        )
 
     # Target dataset (Snowflake raw table)
-    target_dataset = DatasetResource(
-        properties={
-            "type": "SnowflakeV2Table",
-            "linkedServiceName": {"referenceName": "SnowflakeDB", "type": "LinkedServiceReference"},
-            "typeProperties": {"table": RAW_TABLE_NAME, "schema": SCHEMA_RAW},
+    target_dataset = DatasetResource.deserialize(
+        {
+            "properties": {
+                "type": "SnowflakeV2Table",
+                "linkedServiceName": {
+                    "referenceName": SNOWFLAKE_LINKED_SERVICE,
+                    "type": "LinkedServiceReference",
+                },
+                "typeProperties": {"table": RAW_TABLE_NAME, "schema": SCHEMA_RAW},
+            },
         },
     )
-
-    # Register datasets
-    client.datasets.create_or_update(
-        resource_group,
-        factory_name,
-        "SalesCSV",
-        source_dataset,
+    datasets = {SOURCE_DATASETS[staging_format]: source_dataset, TARGET_DATASET: target_dataset}
+    if fan_out:
+        datasets[PARTITION_LIST_DATASET] = DatasetResource(
+            properties=JsonDataset(
+                linked_service_name=linked_service_name,
+                location=AzureBlobStorageLocation(
+                    container=azure_details["container_name"],
+                    file_name=partition_list_blob(azure_details["blob_name"]),
+                ),
+            ),
+        )
+    return datasets
+
+
+def build_copy_source(
+    staging_format: str = "csv",
+    source_glob: str | None = None,
+    file_list_path: str | None = None,
+    *,
+    modified_window: bool = False,
+) -> dict:
+    """Build the copy activity source for the staging format.
+
+    ``source_glob`` is a wildcard folder path (see ``partition_glob``) that makes the copy
+    read every partition file below it instead of the single blob named in the dataset.
+    ``file_list_path`` (``<container>/<blob>``) instead restricts the copy to the files
+    listed in that blob, e.g. the partitions changed by the last upload.
+    ``modified_window`` only reads the blobs last modified within the window passed in the
+    ``windowStart`` and ``windowEnd`` pipeline parameters.
+    """
+    store_settings = {
+        "type": "AzureBlobStorageReadSettings",
+        "enablePartitionDiscovery": False,
+    }
+    if file_list_path:
+        store_settings["fileListPath"] = file_list_path
+    elif source_glob:
+        store_settings["recursive"] = True
+        store_settings["wildcardFolderPath"] = source_glob
+        store_settings["wildcardFileName"] = f"*.{staging_format}"
+    if modified_window:
+        store_settings["modifiedDatetimeStart"] = {
+            "value": "@pipeline().parameters.windowStart",
+            "type": "Expression",
+        }
+        store_settings["modifiedDatetimeEnd"] = {
+            "value": "@pipeline().parameters.windowEnd",
+            "type": "Expression",
+        }
+    if staging_format == "parquet":
+        return {"type": "ParquetSource", "storeSettings": store_settings}
+    return {
+        "type": "DelimitedTextSource",
+        "storeSettings": store_settings,
+        "formatSettings": {
+            "type": "DelimitedTextReadSettings",
+            "skipLineCount": 0,
+        },
+    }
+
+
+def build_column_mappings(staging_format: str = "csv") -> list[dict]:
+    """Map source columns to RAW_SALES_DATA columns.
+
+    The headerless CSV only exposes positional Prop_N columns, while Parquet carries names.
+    """
+    return [
+        {
+            "source": {"name": f"Prop_{position}" if staging_format == "csv" else column},
+            "sink": {"name": column.upper()},
+        }
+        for position, column in enumerate(RAW_COLUMNS.values())
+    ]
+
+
+def build_throughput_settings(
+    profile: ThroughputProfile,
+    staging_path: str | None = None,
+) -> dict:
+    """Build the copy activity type properties that control its throughput.
+
+    ``staging_path`` (``<container>/<folder>``) is where staged copies put interim data.
+    """
+    settings = {
+        "dataIntegrationUnits": profile.data_integration_units,
+        "parallelCopies": profile.parallel_copies,
+        "enableStaging": profile.enable_staging,
+    }
+    if profile.enable_staging:
+        if not staging_path:
+            raise ValueError(f"Throughput profile {profile.name!r} needs a staging path")
+        settings["stagingSettings"] = {
+            "linkedServiceName": {
+                "referenceName": BLOB_LINKED_SERVICE,
+                "type": "LinkedServiceReference",
+            },
+            "path": staging_path,
+        }
+    return settings
+
+
+def _expression(value: str) -> dict[str, str]:
+    return {"value": value, "type": "Expression"}
+
+
+def build_copy_activity(
+    name: str,
+    source: dict,
+    staging_format: str = "csv",
+    profile: ThroughputProfile = THROUGHPUT_PROFILES["small"],
+    staging_path: str | None = None,
+) -> dict:
+    """Build a copy activity from the staged data in ``source`` to the raw table."""
+    return {
+        "name": name,
+        "type": "Copy",
+        "inputs": [
+            {
+                "referenceName": SOURCE_DATASETS[staging_format],
+                "type": "DatasetReference",
+            },
+        ],
+        "outputs": [{"referenceName": TARGET_DATASET, "type": "DatasetReference"}],
+        "typeProperties": {
+            "source": source,
+            "sink": {
+                "type": "SnowflakeV2Sink",
+                "importSettings": {
+                    "type": "SnowflakeImportCopyCommand",
+                    "additionalCopyOptions": {"ON_ERROR": "CONTINUE"},
+                },
+            },
+            "translator": {
+                "type": "TabularTranslator",
+                "mappings": build_column_mappings(staging_format),
+            },
+            **build_throughput_settings(profile, staging_path),
+        },
+    }
+
+
+def build_pipeline(
+    staging_format: str = "csv",
+    source_glob: str | None = None,
+    file_list_path: str | None = None,
+    profile: ThroughputProfile = THROUGHPUT_PROFILES["small"],
+    staging_path: str | None = None,
+    *,
+    incremental: bool = False,
+) -> PipelineResource:
+    """Build the pipeline copying the staged data from Blob Storage to Snowflake.
+
+    An ``incremental`` pipeline only copies the blobs modified within the window given by
+    its ``windowStart`` and ``windowEnd`` run parameters (see ``utils.watermark``).
+    """
+    source = build_copy_source(
+        staging_format,
+        source_glob,
+        file_list_path,
+        modified_window=incremental,
     )
-
-    client.datasets.create_or_update(
-        resource_group,
-        factory_name,
-        "RawSalesTable",
-        target_dataset,
+    copy_activity = build_copy_activity(
+        "CopyToSnowflake",
+        source,
+        staging_format,
+        profile,
+        staging_path,
     )
-
-    logger.info("Datasets created successfully")
+    properties = {"activities": [copy_activity]}
+    if incremental:
+        properties["parameters"] = {
+            "windowStart": {"type": "String", "defaultValue": EPOCH.isoformat()},
+            "windowEnd": {"type": "String"},
+        }
+    return PipelineResource.deserialize({"properties": properties})
+
+
+def build_fan_out_pipeline(
+    staging_format: str = "csv",
+    profile: ThroughputProfile = THROUGHPUT_PROFILES["small"],
+    staging_path: str | None = None,
+    batch_count: int = DEFAULT_BATCH_COUNT,
+) -> PipelineResource:
+    """Build a pipeline that runs one copy per partition, ``batch_count`` at a time.
+
+    A Lookup reads the partition list (see ``utils.partition_status``) and a ForEach copies
+    each listed file with its own copy activity, spreading the copies over the integration
+    runtime. The throughput profile applies to each copy. A Lookup returns at most 5000
+    items, far more than the monthly partitions of the extract.
+    """
+    if not 1 <= batch_count <= MAX_BATCH_COUNT:
+        raise ValueError(f"batch_count must be between 1 and {MAX_BATCH_COUNT}")
+    source = build_copy_source(staging_format)
+    source["storeSettings"]["wildcardFolderPath"] = _expression("@item().folder")
+    source["storeSettings"]["wildcardFileName"] = _expression("@item().file")
+
+    lookup = {
+        "name": "LookupPartitions",
+        "type": "Lookup",
+        "typeProperties": {
+            "source": {
+                "type": "JsonSource",
+                "storeSettings": {"type": "AzureBlobStorageReadSettings"},
+            },
+            "dataset": {"referenceName": PARTITION_LIST_DATASET, "type": "DatasetReference"},
+            "firstRowOnly": False,
+        },
+    }
+    for_each = {
+        "name": "CopyEachPartition",
+        "type": "ForEach",
+        "dependsOn": [{"activity": "LookupPartitions", "dependencyConditions": ["Succeeded"]}],
+        "typeProperties": {
+            "items": _expression("@activity('LookupPartitions').output.value"),
+            "isSequential": False,
+            "batchCount": batch_count,
+            "activities": [
+                build_copy_activity(
+                    "CopyPartition",
+                    source,
+                    staging_format,
+                    profile,
+                    staging_path,
+                ),
+            ],
+        },
+    }
+    return PipelineResource.deserialize({"properties": {"activities": [lookup, for_each]}})
 
 
-def create_and_run_pipeline(
+def run_pipeline(
     client: DataFactoryManagementClient,
     resource_group: str,
     factory_name: str,
+    parameters: dict[str, str] | None = None,
 ) -> str:
-    """Create and run a pipeline to copy data from Blob Storage to Snowflake."""
-    logger.info("Creating copy pipeline...")
-    pipeline = PipelineResource(
-        activities=[
-            {
-                "name": "CopyToSnowflake",
-                "type": "Copy",
-                "inputs": [{"referenceName": "SalesCSV", "type": "DatasetReference"}],
-                "outputs": [{"referenceName": "RawSalesTable", "type": "DatasetReference"}],
-                "typeProperties": {
-                    "source": {
-                        "type": "DelimitedTextSource",
-                        "storeSettings": {
-                            "type": "AzureBlobStorageReadSettings",
-                            "enablePartitionDiscovery": False,
-                        },
-                        "formatSettings": {
-                            "type": "DelimitedTextReadSettings",
-                            "skipLineCount": 0,
-                        },
-                    },
-                    "sink": {
-                        "type": "SnowflakeV2Sink",
-                        "importSettings": {
-                            "type": "SnowflakeImportCopyCommand",
-                            "additionalCopyOptions": {"ON_ERROR": "CONTINUE"},
-                        },
-                    },
-                    "enableStaging": False,
-                    "translator": {
-                        "type": "TabularTranslator",
-                        "mappings": [
-                            {"source": {"name": "Prop_0"}, "sink": {"name": "REGION"}},
-                            {"source": {"name": "Prop_1"}, "sink": {"name": "COUNTRY"}},
-                            {"source": {"name": "Prop_2"}, "sink": {"name": "ITEM_TYPE"}},
-                            {"source": {"name": "Prop_3"}, "sink": {"name": "SALES_CHANNEL"}},
-                            {"source": {"name": "Prop_4"}, "sink": {"name": "ORDER_PRIORITY"}},
-                            {"source": {"name": "Prop_5"}, "sink": {"name": "ORDER_DATE"}},
-                            {"source": {"name": "Prop_6"}, "sink": {"name": "ORDER_ID"}},
-                            {"source": {"name": "Prop_7"}, "sink": {"name": "SHIP_DATE"}},
-                            {"source": {"name": "Prop_8"}, "sink": {"name": "UNITS_SOLD"}},
-                            {"source": {"name": "Prop_9"}, "sink": {"name": "UNIT_PRICE"}},
-                            {"source": {"name": "Prop_10"}, "sink": {"name": "UNIT_COST"}},
-                        ],
-                    },
-                },
-            },
-        ],
-    )
-
-    # Register the pipeline
-    client.pipelines.create_or_update(
-        resource_group,
-        factory_name,
-        "RawDataLoadPipeline",
-        pipeline,
-    )
-    logger.info("Pipeline created successfully")
-
-    # Run the pipeline
+    """Start a run of the copy pipeline; returns the run ID."""
     logger.info("Starting pipeline execution...")
     run_response = client.pipelines.create_run(
         resource_group,
         factory_name,
-        "RawDataLoadPipeline",
+        PIPELINE_NAME,
+        parameters=parameters,
     )
-
     logger.info("Pipeline run ID: %s", run_response.run_id)
     return run_response.run_id
 
 
-def main() -> None:
-    """Main function to create and execute a data loading pipeline."""
+def desired_factory_resources(
+    azure_details: dict[str, str],
+    snowflake_details: dict[str, str],
+    datasets: dict[str, DatasetResource],
+    pipeline: PipelineResource,
+) -> list[FactoryResource]:
+    """Describe every resource of the factory with the resources it references."""
+    linked_services = {
+        BLOB_LINKED_SERVICE: build_blob_linked_service(azure_details),
+        SNOWFLAKE_LINKED_SERVICE: build_snowflake_linked_service(snowflake_details),
+    }
+    resources = [
+        FactoryResource("linked_service", name, definition)
+        for name, definition in linked_services.items()
+    ]
+    for name, dataset in datasets.items():
+        linked_service = dataset.properties.linked_service_name.reference_name
+        resources.append(
+            FactoryResource("dataset", name, dataset, (f"linked_service/{linked_service}",)),
+        )
+    resources.append(
+        FactoryResource(
+            "pipeline",
+            PIPELINE_NAME,
+            pipeline,
+            tuple(f"dataset/{name}" for name in datasets),
+        ),
+    )
+    return resources
+
+
+def get_container_client(azure_details: dict[str, str]) -> ContainerClient:
+    """Return a client of the staging container, authenticated with the SAS token."""
+    return ContainerClient(
+        f"https://{azure_details['storage_account']}.blob.core.windows.net",
+        azure_details["container_name"],
+        credential=azure_details["sas_token"],
+    )
+
+
+def resolve_throughput_profile(input_bytes: Callable[[], int]) -> ThroughputProfile:
+    """Return the configured throughput profile, sized by ``input_bytes()`` if "auto"."""
+    profile_name = config.get_copy_settings()["throughput_profile"]
+    if profile_name in THROUGHPUT_PROFILES:
+        return THROUGHPUT_PROFILES[profile_name]
+    if profile_name != "auto":
+        raise ValueError(f"Unknown throughput profile: {profile_name}")
+
+    size = input_bytes()
+    profile = select_throughput_profile(size)
+    logger.info("Copying %d bytes with the %s profile", size, profile.name)
+    return profile
+
+
+def plan_single_copy(
+    container_client: ContainerClient,
+    blob_name: str,
+    staging_settings: dict[str, str | bool],
+    window: LoadWindow | None,
+    staging_path: str,
+) -> tuple[PipelineResource, list[str]]:
+    """Build the pipeline that copies all input blobs with a single copy activity.
+
+    Partitioned loads only copy the partitions modified within the window or, without a
+    watermark, the partitions changed by the last upload. Returns the pipeline and the
+    blobs it copies.
+    """
+    staging_format = staging_settings["format"]
+    partition_by = staging_settings["partition_by"]
+    input_blobs = list_input_blobs(
+        container_client,
+        blob_name,
+        staging_format,
+        partition_by,
+        window,
+    )
+    profile = resolve_throughput_profile(lambda: sum(blob.size for blob in input_blobs))
+    source_glob = file_list_path = None
+    if partition_by != "none" and window:
+        source_glob = partition_glob(blob_name, partition_by)
+    elif partition_by != "none":
+        container_name = container_client.container_name
+        file_list_path = f"{container_name}/{changed_files_manifest(blob_name)}"
+    pipeline = build_pipeline(
+        staging_format,
+        source_glob,
+        file_list_path,
+        profile,
+        staging_path,
+        incremental=window is not None,
+    )
+    return pipeline, [blob.name for blob in input_blobs]
+
+
+def plan_fan_out_copy(
+    container_client: ContainerClient,
+    blob_name: str,
+    staging_settings: dict[str, str | bool],
+    window: LoadWindow | None,
+    staging_path: str,
+    batch_count: int = DEFAULT_BATCH_COUNT,
+) -> tuple[PipelineResource, list[str]]:
+    """Write the partition list and build the fan-out pipeline copying it.
+
+    The list holds the partitions of the window (or of the last upload) and those whose
+    copy failed before. Returns the pipeline and the listed partitions.
+    """
+    staging_format = staging_settings["format"]
+    retries = failed_partitions(read_partition_status(container_client, blob_name))
+    input_blobs = list_input_blobs(
+        container_client,
+        blob_name,
+        staging_format,
+        staging_settings["partition_by"],
+        window,
+        include=retries,
+    )
+    partitions = [blob.name for blob in input_blobs]
+    write_partition_list(container_client, blob_name, partitions)
+    logger.info("Copying %d partitions (%d retried)", len(partitions), len(retries))
+
+    profile = resolve_throughput_profile(lambda: sum(blob.size for blob in input_blobs))
+    pipeline = build_fan_out_pipeline(
+        staging_format,
+        profile,
+        staging_path,
+        batch_count,
+    )
+    return pipeline, partitions
+
+
+def main() -> PipelineRunReport:
+    """Deploy and execute the data loading pipeline, blocking until the copy has finished.
+
+    Incremental loads only copy the blobs modified since the stored watermark, which is
+    advanced once the copy has succeeded. Fan-out loads copy each partition separately and
+    record the outcome per partition, so failed partitions are retried by the next run.
+    The report lists the staged blobs the run copied.
+    """
     logger.info("Starting the creation of Azure Data Factory pipeline for raw data loading...")
 
     # Get Azure credentials and config
     azure_details = config.get_azure_details()
     snowflake_details = config.get_snowflake_details()
+    copy_settings = config.get_copy_settings()
     credential = get_azure_credential()
 
     resource_group = azure_details["resource_group"]
     factory_name = azure_details["data_factory_name"]
+    blob_name = azure_details["blob_name"]
 
     # Create ADF client
     adf_client = DataFactoryManagementClient(credential, azure_details["subscription_id"])
@@ -254,19 +698,93 @@ def main() -> None:
     # Create Data Factory if it doesn't exist
     create_data_factory_if_not_exists(adf_client, resource_group, factory_name)
 
-    # Create linked services
-    create_blob_linked_service(adf_client, resource_group, factory_name, azure_details)
-    create_snowflake_linked_service(adf_client, resource_group, factory_name, snowflake_details)
-
-    # Create datasets
-    create_datasets(adf_client, resource_group, factory_name, azure_details)
-
-    # Create and run pipeline
-    run_id = create_and_run_pipeline(adf_client, resource_group, factory_name)
+    staging_settings = config.get_staging_settings()
+    staging_format = staging_settings["format"]
+    partition_by = staging_settings["partition_by"]
+    container_name = azure_details["container_name"]
+    staging_path = f"{container_name}/{COPY_STAGING_FOLDER}"
+    container_client = get_container_client(azure_details)
+    fan_out = copy_settings["fan_out"]
+    if fan_out and partition_by == "none":
+        raise ValueError("Fan-out copies need a partitioned extract (PARTITION_BY)")
+    window = None
+    if copy_settings["incremental"]:
+        staged_blobs = list_staged_blobs(container_client, blob_name, staging_format, partition_by)
+        window = next_window(container_client, blob_name, staged_blobs)
+
+    if fan_out:
+        pipeline, partitions = plan_fan_out_copy(
+            container_client,
+            blob_name,
+            staging_settings,
+            window,
+            staging_path,
+            copy_settings["batch_count"],
+        )
+    else:
+        pipeline, partitions = plan_single_copy(
+            container_client,
+            blob_name,
+            staging_settings,
+            window,
+            staging_path,
+        )
+
+    # Deploy the linked services, datasets and pipeline that differ from the deployed ones
+    resources = desired_factory_resources(
+        azure_details,
+        snowflake_details,
+        build_datasets(azure_details, staging_format, partition_by, fan_out=fan_out),
+        pipeline,
+    )
+    state_file = copy_settings["state_file"]
+    deploy_resources(
+        adf_client,
+        resource_group,
+        factory_name,
+        resources,
+        Path(state_file) if state_file else None,
+    )
 
-    logger.info("Data pipeline setup complete!")
+    # Fan-out runs select their partitions through the list instead of the window
+    run_id = run_pipeline(
+        adf_client,
+        resource_group,
+        factory_name,
+        window.parameters() if window and not fan_out else None,
+    )
 
-    return run_id
+    # Wait for the copy so that the transformations only ever see a complete load; a failed
+    # copy raises here, before the watermark could move past data that was not loaded.
+    # Fan-out runs first record which partitions failed, which the next run retries.
+    report = monitor_pipeline_run(
+        adf_client,
+        resource_group,
+        factory_name,
+        run_id,
+        raise_on_failure=not fan_out,
+    )
+    failed = []
+    if fan_out:
+        failed = record_partition_status(
+            container_client,
+            blob_name,
+            partitions,
+            report.copies,
+            run_id,
+        )
+    report.copied_blobs = [name for name in partitions if name not in failed]
+    if window:
+        advance_watermark(container_client, blob_name, window, run_id)
+    if failed or not report.succeeded:
+        raise PipelineRunError(
+            f"Pipeline run {run_id} {report.status}: {len(failed)} partitions failed "
+            "and will be retried by the next run",
+        )
+
+    logger.info("Data pipeline load complete!")
+
+    return report
 
 
 if __name__ == "__main__":
@@ -2,35 +2,85 @@
 This script does the following:
 1. downloads the dataset from
 https://excelbianalytics.com/wp/wp-content/uploads/2017/07/10000-Sales-Records.zip
+in parallel, resumable byte ranges
 2. extracts .csv and removes the .zip file
 3. using Azure Servie Principal automatically creates resource group, storage account,
-and container inside it
-4. uploads the .csv in blob into the created container
+container inside it and the data factory, concurrently where they don't depend on each other
+4. optionally validates and deduplicates the .csv locally (CLEAN_EXTRACT=true), putting
+rejected rows into a quarantine file
+5. uploads the .csv in blob into the created container, either in a single request or
+streamed as concurrently staged blocks (AZURE_UPLOAD_MODE=streaming); with
+AZURE_STAGING_FORMAT=parquet the .csv is first converted to typed Parquet, and with
+PARTITION_BY=year|month it is split by order date into one blob per partition
+
+With AZURE_UPLOAD_MODE=pipelined steps 1, 2 and 5 are fused: the archive is inflated as it
+downloads and the CSV goes straight into the block uploader without touching local disk.
 """
 
+import asyncio
+import base64
+import hashlib
+import io
 import os
+import threading
 import zipfile
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from contextlib import ExitStack, nullcontext
 from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from typing import BinaryIO
+from urllib.parse import parse_qs
 
 import requests
-from azure.identity import ClientSecretCredential
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.storage import StorageManagementClient
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import (
     AccountSasPermissions,
+    BlobBlock,
+    BlobClient,
     BlobServiceClient,
+    ContainerClient,
     ResourceTypes,
     generate_account_sas,
 )
 
 from utils import config
-from utils.azure import get_azure_credential
+from utils.cleaning import clean_extract
+from utils.download import download_file
+from utils.loaded_digests import pending_blobs, read_loaded_digests, record_loaded_digests
 from utils.logger import get_logger
+from utils.provisioning import provision_resources
+from utils.sales_data import (
+    PARTITION_GRANULARITIES,
+    STAGING_FORMATS,
+    changed_files_manifest,
+    convert_csv_to_parquet,
+    partition_extract,
+    partition_prefix,
+    staged_blob_name,
+)
+from utils.streams import ChunkStream, iter_zip_member
 
 logger = get_logger()
 
 FILE_NAME = "10000 Sales Records.csv"
+DATASET_URL = "https://excelbianalytics.com/wp/wp-content/uploads/2017/07/10000-Sales-Records.zip"
+DOWNLOAD_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,"
+    "image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Accept-Encoding": "gzip, deflate, br",
+}
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_MODES = ("single", "streaming", "pipelined")
+DIGEST_METADATA_KEY = "content_sha256"
+DIGEST_CHUNK_SIZE = 1024 * 1024
+SAS_VALIDITY = timedelta(days=10)
+# A stored SAS token is reused until it gets this close to expiring, so that reruns do not
+# change the blob linked service and trigger a redeployment of the data factory
+SAS_RENEWAL_MARGIN = timedelta(days=3)
 
 
 def generate_sas_token(storage_account: str, storage_key: str) -> str:
@@ -43,13 +93,21 @@ def generate_sas_token(storage_account: str, storage_key: str) -> str:
         account_key=storage_key,
         resource_types=ResourceTypes(service=True, container=True, object=True),
         permission=AccountSasPermissions(read=True, write=True, list=True),
-        expiry=datetime.now(tz=UTC) + timedelta(days=10),
+        expiry=datetime.now(tz=UTC) + SAS_VALIDITY,
     )
 
     logger.info("SAS token generated successfully")
     return sas_token
 
 
+def sas_token_expiry(sas_token: str) -> datetime | None:
+    """Return the expiry (``se``) of a SAS token, or None if it has none."""
+    expiry = parse_qs(sas_token).get("se")
+    if not expiry:
+        return None
+    return datetime.fromisoformat(expiry[0])
+
+
 def download_dataset() -> None:
     """Download and extract the sales dataset."""
     if Path(f"data/{FILE_NAME}").exists():
@@ -57,29 +115,13 @@ def download_dataset() -> None:
         return
 
     logger.info("Downloading dataset...")
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-        "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,"
-        "image/webp,image/apng,*/*;q=0.8",
-        "Accept-Language": "en-US,en;q=0.9",
-        "Accept-Encoding": "gzip, deflate, br",
-    }
-
-    response = requests.get(
-        "https://excelbianalytics.com/wp/wp-content/uploads/2017/07/10000-Sales-Records.zip",
-        headers=headers,
-        stream=True,
-        timeout=30,
-    )
-
-    response.raise_for_status()
-
     zip_path = Path("sales-dataset.zip")
-
-    with zip_path.open("wb") as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    download_file(
+        DATASET_URL,
+        zip_path,
+        headers=DOWNLOAD_HEADERS,
+        **config.get_download_settings(),
+    )
 
     with zipfile.ZipFile(zip_path, "r") as zip_ref:
         zip_ref.extractall("data/")
@@ -111,85 +153,413 @@ def add_sas_token_to_dotenv(sas_token: str) -> None:
             f.write(f'AZURE_SAS_TOKEN="{sas_token}"\n')
 
 
-def create_azure_resources(credential: ClientSecretCredential) -> BlobServiceClient:
-    """Create necessary Azure resources if they don't exist."""
+def create_azure_resources() -> BlobServiceClient:
+    """Create necessary Azure resources if they don't exist.
+
+    The resource group, storage account, container and data factory are provisioned
+    concurrently where they don't depend on each other (see ``utils.provisioning``).
+    """
     logger.info("Creating Azure resources...")
 
     azure_details = config.get_azure_details()
-    subscription_id = azure_details["subscription_id"]
-    resource_group = azure_details["resource_group"]
     storage_account = azure_details["storage_account"]
-    container_name = azure_details["container_name"]
+    storage_key = asyncio.run(provision_resources(azure_details))
 
-    resource_client = ResourceManagementClient(credential, subscription_id)
-    if not any(rg.name == resource_group for rg in resource_client.resource_groups.list()):
-        logger.info("Creating resource group %s...", resource_group)
-        resource_client.resource_groups.create_or_update(resource_group, {"location": "uaenorth"})
+    sas_token = azure_details["sas_token"]
+    expiry = sas_token_expiry(sas_token) if sas_token else None
+    if expiry and expiry > datetime.now(tz=UTC) + SAS_RENEWAL_MARGIN:
+        logger.info("Reusing the SAS token valid until %s", expiry)
+    else:
+        sas_token = generate_sas_token(storage_account, storage_key)
+        add_sas_token_to_dotenv(sas_token)
+        os.environ["AZURE_SAS_TOKEN"] = sas_token
 
-    storage_client = StorageManagementClient(credential, subscription_id)
-    if not any(
-        sa.name == storage_account
-        for sa in storage_client.storage_accounts.list_by_resource_group(resource_group)
-    ):
-        logger.info("Creating storage account %s...", storage_account)
-        storage_client.storage_accounts.begin_create(
-            resource_group,
-            storage_account,
-            {"location": "uaenorth", "kind": "StorageV2", "sku": {"name": "Standard_LRS"}},
-        ).result()
-
-    keys = storage_client.storage_accounts.list_keys(resource_group, storage_account)
-    storage_key = keys.keys[0].value
-    sas_token = generate_sas_token(storage_account, storage_key)
-    add_sas_token_to_dotenv(sas_token)
-    os.environ["AZURE_SAS_TOKEN"] = sas_token
-
-    blob_service_client = BlobServiceClient(
+    return BlobServiceClient(
         account_url=f"https://{storage_account}.blob.core.windows.net",
         credential=storage_key,
     )
-    if not any(
-        container.name == container_name for container in blob_service_client.list_containers()
+
+
+def iter_blocks(stream: BinaryIO, block_size: int) -> Iterator[bytes]:
+    """Yield fixed-size blocks from a binary stream; only the last one may be shorter."""
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            return
+        # Network and decompression streams may return short reads, so top the block up
+        while len(block) < block_size:
+            chunk = stream.read(block_size - len(block))
+            if not chunk:
+                break
+            block += chunk
+        yield block
+
+
+def _block_id(index: int) -> str:
+    """Build a block ID; all IDs of one blob must have the same length."""
+    return base64.b64encode(f"{index:010d}".encode()).decode()
+
+
+def upload_blocks(
+    blob_client: BlobClient,
+    blocks: Iterable[bytes],
+    max_workers: int,
+    metadata: dict[str, str] | None = None,
+    *,
+    executor: ThreadPoolExecutor | None = None,
+    slots: threading.Semaphore | None = None,
+) -> int:
+    """Stage blocks concurrently and commit them as the blob content.
+
+    At most ``max_workers`` blocks are held in memory at once: the next block is only read
+    from ``blocks`` after a slot frees up. Uploads of several blobs can share ``executor``
+    and ``slots``, which then bound the blocks in flight across all of them. ``metadata``
+    is read at commit time, after ``blocks`` is exhausted. Returns the number of bytes
+    uploaded.
+    """
+    block_ids: list[str] = []
+    uploaded = 0
+    blocks_iter = iter(blocks)
+    slots = slots or threading.BoundedSemaphore(max_workers)
+
+    with ExitStack() as stack:
+        if executor is None:
+            executor = stack.enter_context(ThreadPoolExecutor(max_workers=max_workers))
+        in_flight: set[Future] = set()
+        while True:
+            slots.acquire()
+            done = {future for future in in_flight if future.done()}
+            in_flight -= done
+            block = None
+            try:
+                for future in done:
+                    future.result()
+                block = next(blocks_iter, None)
+            finally:
+                if block is None:
+                    slots.release()
+            if block is None:
+                break
+
+            block_id = _block_id(len(block_ids))
+            block_ids.append(block_id)
+            uploaded += len(block)
+            future = executor.submit(blob_client.stage_block, block_id, block)
+            future.add_done_callback(lambda _: slots.release())
+            in_flight.add(future)
+
+        for future in wait(in_flight).done:
+            future.result()
+
+    blob_client.commit_block_list(
+        [BlobBlock(block_id=block_id) for block_id in block_ids],
+        metadata=metadata,
+    )
+    logger.debug("Committed %d blocks (%d bytes)", len(block_ids), uploaded)
+    return uploaded
+
+
+def file_digest(path: Path, *, skip_header: bool = False) -> str:
+    """Compute the SHA-256 of the bytes that would be uploaded from a local file."""
+    digest = hashlib.sha256()
+    with path.open("rb") as input_file:
+        if skip_header:
+            input_file.readline()
+        while chunk := input_file.read(DIGEST_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def remote_digest(blob_client: BlobClient) -> str | None:
+    """Return the content digest stored in the blob's metadata, if the blob exists."""
+    try:
+        properties = blob_client.get_blob_properties()
+    except ResourceNotFoundError:
+        return None
+    return properties.metadata.get(DIGEST_METADATA_KEY)
+
+
+def upload_file(
+    blob_client: BlobClient,
+    path: Path,
+    upload_settings: dict[str, str | int | bool],
+    *,
+    skip_header: bool = False,
+    executor: ThreadPoolExecutor | None = None,
+    slots: threading.Semaphore | None = None,
+) -> str:
+    """Upload a local file to a blob in one request or as concurrently staged blocks.
+
+    The SHA-256 of the uploaded bytes is stored in the blob metadata; when the remote
+    digest already matches, the upload is skipped unless AZURE_UPLOAD_FORCE is set.
+    ``executor`` and ``slots`` are shared with other uploads (see ``upload_blocks``); a
+    single-request upload takes one slot. Returns the digest of the blob content.
+    """
+    digest = file_digest(path, skip_header=skip_header)
+    if not upload_settings.get("force") and remote_digest(blob_client) == digest:
+        logger.info("Blob '%s' is unchanged, skipping upload", blob_client.blob_name)
+        return digest
+
+    metadata = {DIGEST_METADATA_KEY: digest}
+    with path.open("rb") as input_file:
+        if skip_header:
+            input_file.readline()
+
+        if upload_settings["mode"] in ("streaming", "pipelined"):
+            upload_blocks(
+                blob_client,
+                iter_blocks(input_file, upload_settings["block_size"]),
+                upload_settings["max_workers"],
+                metadata,
+                executor=executor,
+                slots=slots,
+            )
+        else:
+            with slots or nullcontext():
+                blob_client.upload_blob(input_file.read(), overwrite=True, metadata=metadata)
+    return digest
+
+
+def cleaned_path(source: Path) -> Path:
+    """Return where the cleaned copy of the extract is written."""
+    return source.with_name(f"{source.stem}.clean.csv")
+
+
+def clean_dataset(source: Path) -> Path:
+    """Validate and deduplicate the extract; returns the path of the cleaned copy."""
+    cleaned = cleaned_path(source)
+    clean_extract(source, cleaned, source.with_name(f"{source.stem}.quarantine.csv"))
+    return cleaned
+
+
+def upload_partitions(
+    container_client: ContainerClient,
+    source: Path,
+    blob_name: str,
+    staging_settings: dict[str, str],
+    upload_settings: dict[str, str | int | bool],
+) -> list[str]:
+    """Split the dataset by order date and upload the changed partition files concurrently.
+
+    Partitions land under a Hive-style layout next to the configured blob name, e.g.
+    ``10000 Sales Records/year=2014/month=02/part-00000.csv``. The names of the partitions
+    pending load (see ``utils.loaded_digests``) are written to a manifest blob that the ADF
+    copy reads as its file list, so loaded partitions are not copied again. Returns the
+    pending blob names.
+    """
+    files = partition_extract(
+        source,
+        source.parent / "partitions",
+        staging_settings["partition_by"],
+        staging_settings["format"],
+        staging_settings["parquet_compression"],
+    )
+    prefix = partition_prefix(blob_name)
+    blob_names = {folder: f"{prefix}/{folder}/{path.name}" for folder, path in files.items()}
+
+    # The partitions share one block pool, and the slots bound the blocks in memory across
+    # all of them, rather than max_workers blocks per partition
+    max_workers = upload_settings["max_workers"]
+    slots = threading.BoundedSemaphore(max_workers)
+    with (
+        ThreadPoolExecutor(max_workers=max_workers) as block_executor,
+        ThreadPoolExecutor(max_workers=max_workers) as executor,
     ):
-        logger.info("Creating container %s...", container_name)
-        blob_service_client.create_container(container_name)
+        futures = [
+            executor.submit(
+                upload_file,
+                container_client.get_blob_client(blob_names[folder]),
+                path,
+                upload_settings,
+                executor=block_executor,
+                slots=slots,
+            )
+            for folder, path in files.items()
+        ]
+        digests = {blob_names[folder]: future.result() for folder, future in zip(files, futures)}
+    pending = pending_blobs(
+        digests,
+        read_loaded_digests(container_client, blob_name),
+        force=bool(upload_settings.get("force")),
+    )
 
-    return blob_service_client
+    manifest_client = container_client.get_blob_client(changed_files_manifest(blob_name))
+    manifest_client.upload_blob("\n".join(pending), overwrite=True)
+
+    logger.info(
+        "%d of %d partitions under '%s' are pending load",
+        len(pending),
+        len(files),
+        prefix,
+    )
+    return pending
 
 
-def upload_to_blob(blob_service_client: BlobServiceClient) -> None:
-    """Upload the dataset to Azure Blob Storage."""
+def upload_to_blob(blob_service_client: BlobServiceClient) -> list[str]:
+    """Upload the dataset to Azure Blob Storage; returns the blob names pending load."""
     logger.info("Uploading dataset to Azure Blob...")
 
     azure_details = config.get_azure_details()
+    upload_settings = config.get_upload_settings()
+    staging_settings = config.get_staging_settings()
+    staging_format = staging_settings["format"]
     container_name = azure_details["container_name"]
-    blob_name = azure_details["blob_name"]
+    blob_name = staged_blob_name(azure_details["blob_name"], staging_format)
     container_client = blob_service_client.get_container_client(container_name)
-    blob_client = container_client.get_blob_client(blob_name)
+
+    upload_mode = upload_settings["mode"]
+    if upload_mode not in UPLOAD_MODES:
+        raise ValueError(f"Unknown upload mode: {upload_mode}")
+    if staging_format not in STAGING_FORMATS:
+        raise ValueError(f"Unknown staging format: {staging_format}")
+    if staging_settings["partition_by"] not in PARTITION_GRANULARITIES:
+        raise ValueError(f"Unknown partition granularity: {staging_settings['partition_by']}")
 
     data_dir = Path("data")
     data_dir.mkdir(parents=True, exist_ok=True)
-    with (data_dir / FILE_NAME).open("r", encoding="utf-8") as input_file:
-        next(input_file)  # skipping header line for simplicity of loading into Snowflake later
+    source = data_dir / FILE_NAME
+    if staging_settings.get("clean"):
+        source = clean_dataset(source)
+
+    if staging_settings["partition_by"] != "none":
+        return upload_partitions(
+            container_client,
+            source,
+            azure_details["blob_name"],
+            staging_settings,
+            upload_settings,
+        )
 
-        content = input_file.read()
-        blob_client.upload_blob(content, overwrite=True)
+    blob_client = container_client.get_blob_client(blob_name)
+    if staging_format == "parquet":
+        parquet_path = data_dir / Path(FILE_NAME).with_suffix(".parquet").name
+        rows = convert_csv_to_parquet(
+            source,
+            parquet_path,
+            staging_settings["parquet_compression"],
+        )
+        logger.info("Converted %d rows to Parquet at %s", rows, parquet_path)
+        digest = upload_file(blob_client, parquet_path, upload_settings)
+    else:
+        # skipping header line for simplicity of loading into Snowflake later
+        digest = upload_file(
+            blob_client,
+            source,
+            upload_settings,
+            skip_header=True,
+        )
 
     logger.info(
-        "File '%s' uploaded to '%s' in container '%s'",
+        "File '%s' staged as '%s' in container '%s'",
         FILE_NAME,
         blob_name,
         container_name,
     )
+    return pending_blobs(
+        {blob_name: digest},
+        read_loaded_digests(container_client, azure_details["blob_name"]),
+        force=bool(upload_settings.get("force")),
+    )
+
 
+def _hash_blocks(
+    blocks: Iterable[bytes],
+    metadata: dict[str, str],
+) -> Iterator[bytes]:
+    """Pass blocks through, storing their SHA-256 in ``metadata`` once they are exhausted."""
+    digest = hashlib.sha256()
+    for block in blocks:
+        digest.update(block)
+        yield block
+    metadata[DIGEST_METADATA_KEY] = digest.hexdigest()
+
+
+def stream_dataset_to_blob(blob_service_client: BlobServiceClient) -> list[str]:
+    """Download, inflate and upload the dataset in one pass, without local files.
+
+    The HTTP response is inflated chunk by chunk and the CSV member is fed into the block
+    uploader, so the download overlaps with the block uploads already in flight. The digest
+    is only known once the stream ends, so the blob is always rewritten; the return value
+    (the blob name, or nothing if identical content was already loaded) still lets later
+    stages skip.
+    """
+    logger.info("Streaming dataset from %s to Azure Blob...", DATASET_URL)
+    staging_settings = config.get_staging_settings()
+    if staging_settings["format"] != "csv" or staging_settings["partition_by"] != "none":
+        raise ValueError("Pipelined upload only supports unpartitioned csv staging")
+    if staging_settings.get("clean"):
+        raise ValueError("Pipelined upload cannot clean the extract, it never reaches disk")
+
+    azure_details = config.get_azure_details()
+    upload_settings = config.get_upload_settings()
+    container_name = azure_details["container_name"]
+    blob_name = azure_details["blob_name"]
+    container_client = blob_service_client.get_container_client(container_name)
+    blob_client = container_client.get_blob_client(blob_name)
+    metadata: dict[str, str] = {}
+
+    with requests.get(
+        DATASET_URL,
+        headers=DOWNLOAD_HEADERS,
+        stream=True,
+        timeout=30,
+    ) as response:
+        response.raise_for_status()
+        member_chunks = iter_zip_member(
+            response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE),
+            FILE_NAME,
+        )
+        with io.BufferedReader(ChunkStream(member_chunks)) as csv_stream:
+            csv_stream.readline()  # skipping header line, as in upload_to_blob
+            uploaded = upload_blocks(
+                blob_client,
+                _hash_blocks(iter_blocks(csv_stream, upload_settings["block_size"]), metadata),
+                upload_settings["max_workers"],
+                metadata,
+            )
 
-def main() -> None:
-    """Main function to orchestrate the workflow."""
-    download_dataset()
-    credential = get_azure_credential()
-    blob_service_client = create_azure_resources(credential)
-    upload_to_blob(blob_service_client)
+    logger.info(
+        "Streamed '%s' (%d bytes) to '%s' in container '%s'",
+        FILE_NAME,
+        uploaded,
+        blob_name,
+        container_name,
+    )
+    return pending_blobs(
+        {blob_name: metadata[DIGEST_METADATA_KEY]},
+        read_loaded_digests(container_client, blob_name),
+        force=bool(upload_settings.get("force")),
+    )
+
+
+def mark_loaded(blob_names: list[str]) -> None:
+    """Record the staged blobs as loaded, once the load and the transformations succeeded.
+
+    Later runs then skip the blobs until their content changes. The digests are read back
+    from the blobs' metadata.
+    """
+    azure_details = config.get_azure_details()
+    container_client = ContainerClient(
+        f"https://{azure_details['storage_account']}.blob.core.windows.net",
+        azure_details["container_name"],
+        credential=azure_details["sas_token"],
+    )
+    digests = {name: remote_digest(container_client.get_blob_client(name)) for name in blob_names}
+    record_loaded_digests(container_client, azure_details["blob_name"], digests)
+
+
+def main() -> list[str]:
+    """Main function to orchestrate the workflow; returns the blob names pending load."""
+    pipelined = config.get_upload_settings()["mode"] == "pipelined"
+    if not pipelined:
+        download_dataset()
+    blob_service_client = create_azure_resources()
+    if pipelined:
+        pending = stream_dataset_to_blob(blob_service_client)
+    else:
+        pending = upload_to_blob(blob_service_client)
     logger.info("Upload process completed successfully.")
+    return pending
 
 
 if __name__ == "__main__":
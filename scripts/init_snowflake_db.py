@@ -1,10 +1,11 @@
-from pathlib import Path
-
 import snowflake.connector
 from dotenv import load_dotenv
 
 from utils import config
 from utils.logger import get_logger
+from utils.migrations import MigrationError, MigrationReport, apply_migrations
+from utils.snowflake_session import session
+from utils.sql_script import ApplyReport, apply_statements, log_apply_report, split_statements
 
 logger = get_logger()
 
@@ -16,41 +17,37 @@ SCHEMA_RAW = "RAW"
 def execute_sql_statements(
     cursor: snowflake.connector.cursor.SnowflakeCursor,
     sql_script: str,
-) -> None:
-    """Execute SQL statements from a script."""
-    statements = [stmt.strip() for stmt in sql_script.split(";") if stmt.strip()]
-    for stmt in statements:
-        logger.info("Running:\n%s\n---", stmt)
-        try:
-            cursor.execute(stmt)
-        except snowflake.connector.errors.ProgrammingError:
-            logger.exception("Error executing SQL statement: %s", stmt)
-
+) -> ApplyReport:
+    """Execute the statements of a script in as few round trips as possible.
 
-def main() -> None:
-    snowflake_credentials = config.get_snowflake_details()
+    Statements that fail are logged and reported, and the remaining ones still run.
+    """
+    report = apply_statements(cursor, split_statements(sql_script))
+    log_apply_report(report)
+    return report
 
-    conn = snowflake.connector.connect(**snowflake_credentials)
-    cursor = conn.cursor()
 
-    database = snowflake_credentials["database"]
-    cursor.execute(f"CREATE DATABASE IF NOT EXISTS {database}")
-    cursor.execute(f"USE DATABASE {database}")
+def main() -> MigrationReport:
+    """Apply the new and changed schema migrations; a no-op run is one metadata query.
 
-    # Create the raw schema
-    cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA_RAW}")
+    Raises ``MigrationError`` if a migration failed or could not be recorded, so the
+    pipeline does not load into a schema that is not fully migrated.
+    """
+    database = config.get_snowflake_details()["database"]
 
-    # Set up raw schema with a single table
-    cursor.execute(f"USE SCHEMA {SCHEMA_RAW}")
-    with Path("db_schema/raw_schema.sql").open() as sql_file:
-        raw_sql = sql_file.read()
-        execute_sql_statements(cursor, raw_sql)
+    with session("pipeline") as conn, conn.cursor() as cursor:
+        # Creates the database and the raw schema with its single table on the first run
+        report = apply_migrations(cursor, database, SCHEMA_RAW)
 
     # Normalized and analytics schema will be created by dbt later
 
-    cursor.close()
-    conn.close()
+    if not report.succeeded:
+        raise MigrationError(
+            f"Schema migrations failed (failed: {report.failed}, skipped: {report.skipped}, "
+            f"not recorded: {report.unrecorded})",
+        )
     logger.info("Snowflake database initialization completed successfully")
+    return report
 
 
 if __name__ == "__main__":
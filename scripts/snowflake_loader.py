@@ -0,0 +1,97 @@
+"""
+This script loads the staged extract straight into Snowflake, bypassing ADF:
+1. collects the local files the upload step staged: the extract (or its cleaned copy), its
+Parquet conversion, or the partitions that changed
+2. PUTs them to an internal stage in parallel, auto-compressing CSV files
+3. loads them with COPY INTO raw_sales_data and reports the rows loaded and rejected per file
+
+With SNOWFLAKE_LOADER_BACKEND=local the load runs against an offline stand-in that stages
+into a local folder and loads into SQLite.
+"""
+
+from pathlib import Path, PurePosixPath
+
+from scripts.azure_blob_upload import FILE_NAME, cleaned_path
+from utils import config
+from utils.bulk_load import (
+    LoadReport,
+    LocalBackend,
+    SnowflakeBackend,
+    load_files,
+    select_file_format,
+)
+from utils.logger import get_logger
+from utils.sales_data import partition_glob, partition_prefix
+from utils.snowflake_session import session
+
+logger = get_logger()
+
+DATA_DIR = Path("data")
+LOADER_BACKENDS = ("snowflake", "local")
+
+
+def local_staged_files(
+    staging_settings: dict[str, str | bool],
+    blob_name: str,
+    changed_blobs: list[str] | None = None,
+    data_dir: Path = DATA_DIR,
+) -> list[tuple[str, Path]]:
+    """Return the local files the upload step staged, each with its folder on the stage.
+
+    For partitioned extracts these are the partition files, only those of
+    ``changed_blobs`` if given, in the Hive-style folders of their blobs.
+    """
+    staging_format = staging_settings["format"]
+    partition_by = staging_settings["partition_by"]
+    if partition_by == "none":
+        if staging_format == "parquet":
+            return [("", data_dir / Path(FILE_NAME).with_suffix(".parquet").name)]
+        source = data_dir / FILE_NAME
+        return [("", cleaned_path(source) if staging_settings.get("clean") else source)]
+
+    prefix = partition_prefix(blob_name)
+    partitions_dir = data_dir / "partitions"
+    if changed_blobs is None:
+        folders = PurePosixPath(partition_glob(blob_name, partition_by)).relative_to(prefix)
+        paths = sorted(partitions_dir.glob(f"{folders}/part-*.{staging_format}"))
+    else:
+        paths = [partitions_dir / PurePosixPath(name).relative_to(prefix) for name in changed_blobs]
+    return [(path.parent.relative_to(partitions_dir).as_posix(), path) for path in paths]
+
+
+def main(changed_blobs: list[str] | None = None) -> LoadReport:
+    """Load the staged extract into Snowflake with PUT and COPY INTO.
+
+    ``changed_blobs`` restricts a partitioned load to the partitions that changed; without
+    it every partition is staged, and COPY skips the ones it has already loaded.
+    """
+    logger.info("Starting the direct load of the extract into Snowflake...")
+
+    azure_details = config.get_azure_details()
+    staging_settings = config.get_staging_settings()
+    load_settings = config.get_load_settings()
+    backend_name = load_settings["backend"]
+    if backend_name not in LOADER_BACKENDS:
+        raise ValueError(f"Unknown loader backend: {backend_name}")
+
+    files = local_staged_files(staging_settings, azure_details["blob_name"], changed_blobs)
+    file_format = select_file_format(staging_settings["format"], staging_settings["partition_by"])
+    load_options = {
+        "on_error": load_settings["on_error"],
+        "max_workers": load_settings["put_workers"],
+    }
+
+    if backend_name == "local":
+        backend = LocalBackend(Path(load_settings["local_root"]))
+        report = load_files(backend, files, file_format, **load_options)
+    else:
+        # The loader preset switches the pooled session to the raw schema
+        with session("loader") as conn:
+            report = load_files(SnowflakeBackend(conn), files, file_format, **load_options)
+
+    logger.info("Direct load complete!")
+    return report
+
+
+if __name__ == "__main__":
+    main()
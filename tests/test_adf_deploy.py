@@ -0,0 +1,172 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from azure.mgmt.datafactory.models import DatasetResource, LinkedServiceResource, PipelineResource
+
+from utils.adf_deploy import (
+    FactoryResource,
+    deploy_resources,
+    plan_deployment,
+    read_deployed_digests,
+)
+
+
+def _linked_service(name, url="https://example.com"):
+    definition = LinkedServiceResource.deserialize(
+        {"properties": {"type": "AzureBlobStorage", "typeProperties": {"sasUri": url}}},
+    )
+    return FactoryResource("linked_service", name, definition)
+
+
+def _dataset(name, linked_service):
+    definition = DatasetResource.deserialize(
+        {
+            "properties": {
+                "type": "Json",
+                "linkedServiceName": {
+                    "referenceName": linked_service,
+                    "type": "LinkedServiceReference",
+                },
+            },
+        },
+    )
+    return FactoryResource("dataset", name, definition, (f"linked_service/{linked_service}",))
+
+
+def _pipeline(name, datasets, description="copy"):
+    definition = PipelineResource.deserialize(
+        {"properties": {"description": description, "activities": []}},
+    )
+    return FactoryResource("pipeline", name, definition, tuple(f"dataset/{d}" for d in datasets))
+
+
+@pytest.fixture
+def resources():
+    """Fixture for a factory with two linked services, two datasets and a pipeline."""
+    return [
+        _linked_service("Blob"),
+        _linked_service("Other", "https://other.example.com"),
+        _dataset("Source", "Blob"),
+        _dataset("Target", "Other"),
+        _pipeline("Copy", ["Source", "Target"]),
+    ]
+
+
+def _pushed(client):
+    return [
+        f"{kind}/{call.args[2]}"
+        for kind, operations in [
+            ("linked_service", client.linked_services),
+            ("dataset", client.datasets),
+            ("pipeline", client.pipelines),
+        ]
+        for call in operations.create_or_update.call_args_list
+    ]
+
+
+class TestPlanDeployment:
+    """Tests for diffing the desired resources against the deployed ones."""
+
+    def test_digest_ignores_annotations(self):
+        """Test that the digest covers the definition but not the annotation carrying it."""
+        resource = _linked_service("Blob")
+        annotated = LinkedServiceResource.deserialize(resource.body())
+        annotated.properties.annotations = ["sha256:abc"]
+
+        assert FactoryResource("linked_service", "Blob", annotated).digest() == resource.digest()
+        assert _linked_service("Blob", "https://changed.com").digest() != resource.digest()
+
+    def test_cold_deployment_in_dependency_order(self, resources):
+        """Test that everything is pushed, linked services first and the pipeline last."""
+        plan = plan_deployment(resources, {})
+
+        assert [[r.key for r in stage] for stage in plan.stages] == [
+            ["linked_service/Blob", "linked_service/Other"],
+            ["dataset/Source", "dataset/Target"],
+            ["pipeline/Copy"],
+        ]
+
+    def test_only_changed_resources(self, resources):
+        """Test that only resources whose digest differs are planned."""
+        deployed = {resource.key: resource.digest() for resource in resources}
+        resources[-1] = _pipeline("Copy", ["Source", "Target"], "copy with more DIUs")
+
+        plan = plan_deployment(resources, deployed)
+
+        assert plan.changed == ["pipeline/Copy"]
+        assert len(plan.unchanged) == 4
+
+    def test_dependency_cycle(self):
+        """Test that a dependency cycle is rejected."""
+        first = _dataset("First", "Second")
+        second = FactoryResource(
+            "linked_service",
+            "Second",
+            _linked_service("Second").definition,
+            ("dataset/First",),
+        )
+
+        with pytest.raises(ValueError, match="cycle"):
+            plan_deployment([first, second], {})
+
+
+class TestDeployResources:
+    """Tests for pushing the planned resources."""
+
+    def test_warm_rerun_makes_no_writes(self, resources, tmp_path):
+        """Test that a second deployment with the state file neither writes nor reads."""
+        client = MagicMock()
+        state_path = tmp_path / "adf_state.json"
+
+        deploy_resources(client, "test-rg", "test-df", resources, state_path)
+        assert len(_pushed(client)) == 5
+        client.reset_mock()
+
+        plan = deploy_resources(client, "test-rg", "test-df", resources, state_path)
+
+        assert plan.changed == []
+        assert _pushed(client) == []
+        client.pipelines.list_by_factory.assert_not_called()
+
+    def test_state_of_another_factory_is_ignored(self, resources, tmp_path):
+        """Test that a state file recorded for another factory falls back to the factory."""
+        state_path = tmp_path / "adf_state.json"
+        deploy_resources(MagicMock(), "test-rg", "other-df", resources, state_path)
+        client = MagicMock()
+        for operations in (client.linked_services, client.datasets, client.pipelines):
+            operations.list_by_factory.return_value = []
+
+        deploy_resources(client, "test-rg", "test-df", resources, state_path)
+
+        client.pipelines.list_by_factory.assert_called_once_with("test-rg", "test-df")
+        assert len(_pushed(client)) == 5
+
+    def test_pushed_resources_carry_their_digest(self, resources):
+        """Test that deployed resources are annotated so the factory can be diffed later."""
+        client = MagicMock()
+        deploy_resources(client, "test-rg", "test-df", resources)
+
+        # The factory lists back what was pushed
+        for operations in (client.linked_services, client.datasets, client.pipelines):
+            pushed = []
+            for call in operations.create_or_update.call_args_list:
+                item = call.args[3]
+                item.name = call.args[2]
+                pushed.append(item)
+            operations.list_by_factory.return_value = pushed
+
+        deployed = read_deployed_digests(client, "test-rg", "test-df")
+
+        assert deployed == {resource.key: resource.digest() for resource in resources}
+        assert plan_deployment(resources, deployed).changed == []
+
+    def test_independent_resources_pushed_concurrently(self, resources):
+        """Test that resources of the same stage are in flight at the same time."""
+        client = MagicMock()
+        both_in_flight = threading.Barrier(2, timeout=5)
+        client.linked_services.create_or_update.side_effect = lambda *_: both_in_flight.wait()
+
+        deploy_resources(client, "test-rg", "test-df", resources[:2])
+
+        assert client.linked_services.create_or_update.call_count == 2
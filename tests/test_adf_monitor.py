@@ -0,0 +1,164 @@
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from azure.mgmt.datafactory.models import ActivityRun, PipelineRun
+
+from utils.adf_monitor import (
+    CopyActivityMetrics,
+    PipelineRunError,
+    monitor_pipeline_run,
+    wait_for_pipeline_run,
+)
+
+COPY_OUTPUT = {
+    "dataRead": 1_048_576,
+    "dataWritten": 524_288,
+    "filesRead": 2,
+    "rowsRead": 1000,
+    "rowsCopied": 990,
+    "rowsSkipped": 10,
+    "copyDuration": 12,
+    "throughput": 85.3,
+    "usedDataIntegrationUnits": 4,
+    "usedParallelCopies": 2,
+    "errors": [],
+    "executionDetails": [
+        {
+            "status": "Succeeded",
+            "detailedDurations": {
+                "queuingDuration": 3,
+                "timeToFirstByte": 1,
+                "transferDuration": 8,
+            },
+        },
+    ],
+}
+
+
+def _pipeline_run(status, message=""):
+    run = PipelineRun()
+    # Read-only attributes, only set by the service
+    run.run_id = "test-run-id"
+    run.pipeline_name = "RawDataLoadPipeline"
+    run.status = status
+    run.message = message
+    run.run_start = datetime(2024, 1, 1, tzinfo=UTC)
+    run.run_end = datetime(2024, 1, 1, 0, 1, tzinfo=UTC)
+    run.duration_in_ms = 60_000
+    return run
+
+
+def _activity_run(name, activity_type, output):
+    activity_run = ActivityRun()
+    activity_run.activity_name = name
+    activity_run.activity_type = activity_type
+    activity_run.status = "Succeeded"
+    activity_run.output = output
+    return activity_run
+
+
+@pytest.fixture
+def mock_adf_client():
+    """Fixture for an ADF client whose run succeeds after being queued and in progress."""
+    client = MagicMock()
+    client.pipeline_runs.get.side_effect = [
+        _pipeline_run("Queued"),
+        _pipeline_run("Queued"),
+        _pipeline_run("InProgress"),
+        _pipeline_run("Succeeded"),
+    ]
+    client.activity_runs.query_by_pipeline_run.return_value.value = [
+        _activity_run("CopyToSnowflake", "Copy", COPY_OUTPUT),
+        _activity_run("LookupWatermark", "Lookup", {"firstRow": {}}),
+    ]
+    client.activity_runs.query_by_pipeline_run.return_value.continuation_token = None
+    return client
+
+
+@pytest.fixture
+def no_sleep():
+    """Fixture that records poll delays instead of sleeping."""
+    with patch("utils.adf_monitor.time.sleep") as mock_sleep:
+        yield mock_sleep
+
+
+class TestWaitForPipelineRun:
+    """Tests for polling a pipeline run until it finishes."""
+
+    def test_backoff_resets_on_status_change(self, mock_adf_client, no_sleep):
+        """Test that polling slows down while queued and speeds up once the copy starts."""
+        run, polls = wait_for_pipeline_run(mock_adf_client, "test-rg", "test-df", "test-run-id")
+
+        assert run.status == "Succeeded"
+        assert polls == 4
+        assert [call.args[0] for call in no_sleep.call_args_list] == [2.0, 4.0, 2.0]
+
+    @pytest.mark.usefixtures("no_sleep")
+    def test_timeout(self):
+        """Test that a run that never finishes raises once the maximum wait is exceeded."""
+        client = MagicMock()
+        client.pipeline_runs.get.return_value = _pipeline_run("InProgress")
+
+        with pytest.raises(PipelineRunError, match="still InProgress"):
+            wait_for_pipeline_run(client, "test-rg", "test-df", "test-run-id", max_wait=1)
+
+
+class TestMonitorPipelineRun:
+    """Tests for the run report."""
+
+    @pytest.mark.usefixtures("no_sleep")
+    def test_report_copy_metrics(self, mock_adf_client):
+        """Test that the report carries the metrics of the copy activities only."""
+        report = monitor_pipeline_run(mock_adf_client, "test-rg", "test-df", "test-run-id")
+
+        assert report.succeeded
+        assert report.duration == 60
+        assert len(report.copies) == 1
+        copy = report.copies[0]
+        assert copy == CopyActivityMetrics(
+            activity_name="CopyToSnowflake",
+            status="Succeeded",
+            rows_read=1000,
+            rows_copied=990,
+            rows_skipped=10,
+            files_read=2,
+            data_read=1_048_576,
+            data_written=524_288,
+            throughput_kbps=85.3,
+            data_integration_units=4,
+            parallel_copies=2,
+            copy_duration=12,
+            queue_duration=3,
+            transfer_duration=8,
+            time_to_first_byte=1,
+        )
+        assert report.rows_copied == 990
+        assert report.to_dict()["copies"][0]["rows_skipped"] == 10
+
+    @pytest.mark.usefixtures("no_sleep")
+    def test_failed_run_raises(self):
+        """Test that a failed run raises, so that the transformations do not start."""
+        client = MagicMock()
+        client.pipeline_runs.get.return_value = _pipeline_run("Failed", "Sink unreachable")
+        client.activity_runs.query_by_pipeline_run.return_value.value = []
+        client.activity_runs.query_by_pipeline_run.return_value.continuation_token = None
+
+        with pytest.raises(PipelineRunError, match="Failed: Sink unreachable"):
+            monitor_pipeline_run(client, "test-rg", "test-df", "test-run-id")
+
+    def test_fan_out_copies_report_source_path(self):
+        """Test that each iteration of a fan-out copy is identified by the file it copied."""
+        activity_run = _activity_run("CopyPartition", "Copy", COPY_OUTPUT)
+        activity_run.input = {
+            "source": {
+                "storeSettings": {
+                    "wildcardFolderPath": "test-blob/year=2014",
+                    "wildcardFileName": "part-00000.csv",
+                },
+            },
+        }
+
+        copy = CopyActivityMetrics.from_activity_run(activity_run)
+
+        assert copy.source_path == "test-blob/year=2014/part-00000.csv"
@@ -1,17 +1,29 @@
+import json
+from datetime import UTC, datetime
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 from azure.core.exceptions import ResourceNotFoundError
-from azure.mgmt.datafactory.models import Factory
+from azure.mgmt.datafactory.models import Factory, ParquetDataset
 
 from scripts.adf_pipeline_creator import (
-    create_and_run_pipeline,
-    create_blob_linked_service,
+    THROUGHPUT_PROFILES,
+    build_blob_linked_service,
+    build_datasets,
+    build_fan_out_pipeline,
+    build_pipeline,
+    build_snowflake_linked_service,
     create_data_factory_if_not_exists,
-    create_datasets,
-    create_snowflake_linked_service,
+    desired_factory_resources,
     main,
+    run_pipeline,
+    select_throughput_profile,
+    staged_input_bytes,
 )
+from utils.adf_deploy import deploy_resources
+from utils.adf_monitor import CopyActivityMetrics, PipelineRunError, PipelineRunReport
+from utils.watermark import LoadWindow
 
 
 @pytest.fixture
@@ -52,14 +64,7 @@ def mock_adf_client():
     client.factories.get = MagicMock()
     client.factories.create_or_update = MagicMock(return_value=Factory(name="test-df"))
 
-    # Mock linked_services operations
-    client.linked_services.create_or_update = MagicMock()
-
-    # Mock datasets operations
-    client.datasets.create_or_update = MagicMock()
-
-    # Mock pipelines operations
-    client.pipelines.create_or_update = MagicMock()
+    # Mock pipeline runs
     run_response = MagicMock()
     run_response.run_id = "test-run-id"
     client.pipelines.create_run = MagicMock(return_value=run_response)
@@ -81,6 +86,11 @@ def mock_storage_client():
     return client
 
 
+def _copy_activity(pipeline):
+    """Return the REST definition of the copy activity of a single-copy pipeline."""
+    return pipeline.serialize()["properties"]["activities"][0]
+
+
 class TestDataFactoryCreation:
     """Tests for data factory creation functionality."""
 
@@ -110,7 +120,7 @@ class TestDataFactoryCreation:
         mock_adf_client.factories.create_or_update.return_value = mock_factory
 
         # Execute
-        with patch("time.sleep") as mock_sleep:  # Don't actually sleep in tests
+        with patch("utils.provisioning.time.sleep") as mock_sleep:
             result = create_data_factory_if_not_exists(
                 mock_adf_client,
                 "test-rg",
@@ -121,107 +131,306 @@ class TestDataFactoryCreation:
         # Assert
         mock_adf_client.factories.get.assert_called_once_with("test-rg", "test-df")
         mock_adf_client.factories.create_or_update.assert_called_once()
-        mock_sleep.assert_called_once_with(30)
+        mock_sleep.assert_not_called()
         assert result == mock_factory
 
+    def test_create_data_factory_waits_for_provisioning(self, mock_adf_client):
+        """Test that a factory still provisioning is polled with backoff until it succeeds."""
+        # Setup
+        factories = [Factory(location="eastus") for _ in range(3)]
+        for factory, state in zip(factories, ["Provisioning", "Provisioning", "Succeeded"]):
+            factory.provisioning_state = state  # read-only, only set by the service
+        mock_adf_client.factories.get.side_effect = [
+            ResourceNotFoundError("Not found"),
+            *factories[1:],
+        ]
+        mock_adf_client.factories.create_or_update.return_value = factories[0]
+
+        # Execute
+        with patch("utils.provisioning.time.sleep") as mock_sleep:
+            create_data_factory_if_not_exists(mock_adf_client, "test-rg", "test-df")
+
+        # Assert
+        assert mock_adf_client.factories.get.call_count == 3
+        assert [call.args[0] for call in mock_sleep.call_args_list] == [1.0]
+
 
 class TestLinkedServices:
-    """Tests for linked services creation functionality."""
+    """Tests for the linked service definitions."""
 
-    def test_create_blob_linked_service(self, mock_adf_client, mock_azure_details):
-        """Test creation of blob storage linked service."""
-        # Make sure mock_azure_details contains the sas_token
-        mock_azure_details["sas_token"] = "test-sas-token"  # noqa: S105
+    def test_blob_linked_service(self, mock_azure_details):
+        """Test that blob storage is reached with the SAS token."""
+        linked_service = build_blob_linked_service(mock_azure_details)
 
-        # Execute
-        create_blob_linked_service(
-            mock_adf_client,
-            mock_azure_details["resource_group"],
-            mock_azure_details["data_factory_name"],
-            mock_azure_details,
+        assert linked_service.properties.sas_uri == (
+            "https://teststorage.blob.core.windows.net/?test-sas-token"
         )
 
-        # Assert
-        mock_adf_client.linked_services.create_or_update.assert_called_once()
+    def test_snowflake_linked_service(self, mock_snowflake_details):
+        """Test that the Snowflake V2 linked service connects to the raw schema."""
+        linked_service = build_snowflake_linked_service(mock_snowflake_details)
 
-    def test_create_snowflake_linked_service(self, mock_adf_client, mock_snowflake_details):
-        """Test creation of Snowflake linked service."""
-        # Execute
-        create_snowflake_linked_service(
-            mock_adf_client,
-            "test-rg",
-            "test-df",
+        type_properties = linked_service.serialize()["properties"]["typeProperties"]
+        assert type_properties["accountIdentifier"] == "test-account"
+        assert type_properties["database"] == "TEST_DB"
+        assert type_properties["warehouse"] == "TEST_WH"
+        # Without a schema the sink would fall back to the user's default schema
+        assert type_properties["schema"] == "RAW"
+
+    def test_snowflake_schema_is_deployed(
+        self,
+        mock_adf_client,
+        mock_azure_details,
+        mock_snowflake_details,
+    ):
+        """Test that the schema survives the deployment of the linked service."""
+        resources = desired_factory_resources(
+            mock_azure_details,
             mock_snowflake_details,
+            {},
+            build_pipeline(),
         )
 
-        # Assert
-        mock_adf_client.linked_services.create_or_update.assert_called_once()
-        # Here you could additionally check the args of the call to verify the service
-        # was created with correct parameters
+        deploy_resources(mock_adf_client, "test-rg", "test-df", resources[1:2])
+
+        pushed = mock_adf_client.linked_services.create_or_update.call_args[0][3]
+        assert pushed.serialize()["properties"]["typeProperties"]["schema"] == "RAW"
 
 
 class TestDatasets:
-    """Tests for dataset creation functionality."""
+    """Tests for the dataset definitions."""
 
-    def test_create_datasets(self, mock_adf_client, mock_azure_details):
-        """Test creation of source and target datasets."""
-        # Execute
-        create_datasets(
-            mock_adf_client,
-            mock_azure_details["resource_group"],
-            mock_azure_details["data_factory_name"],
-            mock_azure_details,
-        )
+    def test_csv_datasets(self, mock_azure_details):
+        """Test that the CSV source and the raw table are defined."""
+        datasets = build_datasets(mock_azure_details)
 
-        # Assert
-        assert mock_adf_client.datasets.create_or_update.call_count == 2
-        # First call should create SalesCSV dataset
-        first_call_args = mock_adf_client.datasets.create_or_update.call_args_list[0][0]
-        assert first_call_args[2] == "SalesCSV"
+        assert list(datasets) == ["SalesCSV", "RawSalesTable"]
+        assert datasets["SalesCSV"].properties.location.file_name == "test-blob.csv"
+
+    def test_parquet_dataset(self, mock_azure_details):
+        """Test that Parquet staging defines a Parquet source dataset."""
+        datasets = build_datasets(mock_azure_details, "parquet")
+
+        properties = datasets["SalesParquet"].properties
+        assert isinstance(properties, ParquetDataset)
+        assert properties.location.file_name == "test-blob.parquet"
+
+    def test_partitioned_dataset(self, mock_azure_details):
+        """Test that a partitioned source dataset only points at the container."""
+        datasets = build_datasets(mock_azure_details, "csv", "month")
 
-        # Second call should create RawSalesTable dataset
-        second_call_args = mock_adf_client.datasets.create_or_update.call_args_list[1][0]
-        assert second_call_args[2] == "RawSalesTable"
+        location = datasets["SalesCSV"].properties.location
+        assert location.container == "test-container"
+        assert location.file_name is None
+
+    def test_fan_out_lists_partitions(self, mock_azure_details):
+        """Test that fan-out copies also define the dataset of the partition list."""
+        datasets = build_datasets(mock_azure_details, "csv", "month", fan_out=True)
+
+        location = datasets["SalesPartitionList"].properties.location
+        assert location.file_name == "test-blob/_partition_list.json"
 
 
 class TestPipeline:
-    """Tests for pipeline creation and execution."""
+    """Tests for the copy pipeline and its runs."""
 
-    def test_create_and_run_pipeline(self, mock_adf_client):
-        """Test creation and execution of the copy pipeline."""
-        # Execute
-        run_id = create_and_run_pipeline(
-            mock_adf_client,
+    def test_run_pipeline(self, mock_adf_client):
+        """Test that a run of the copy pipeline is started with its parameters."""
+        run_id = run_pipeline(mock_adf_client, "test-rg", "test-df", {"windowEnd": "2024"})
+
+        mock_adf_client.pipelines.create_run.assert_called_once_with(
             "test-rg",
             "test-df",
+            "RawDataLoadPipeline",
+            parameters={"windowEnd": "2024"},
         )
-
-        # Assert
-        mock_adf_client.pipelines.create_or_update.assert_called_once()
-        mock_adf_client.pipelines.create_run.assert_called_once()
         assert run_id == "test-run-id"
 
+    def test_csv_pipeline_uses_positional_columns(self):
+        """Test that the CSV copy maps positional Prop_N columns."""
+        copy_properties = _copy_activity(build_pipeline())["typeProperties"]
+
+        assert copy_properties["source"]["type"] == "DelimitedTextSource"
+        assert copy_properties["translator"]["mappings"][0] == {
+            "source": {"name": "Prop_0"},
+            "sink": {"name": "REGION"},
+        }
+
+    def test_parquet_pipeline_maps_by_name(self):
+        """Test that the Parquet copy reads a Parquet source and maps columns by name."""
+        activity = _copy_activity(build_pipeline("parquet"))
+
+        assert activity["inputs"][0]["referenceName"] == "SalesParquet"
+        assert activity["typeProperties"]["source"]["type"] == "ParquetSource"
+        mappings = activity["typeProperties"]["translator"]["mappings"]
+        assert len(mappings) == 11
+        assert {"source": {"name": "unit_cost"}, "sink": {"name": "UNIT_COST"}} in mappings
+
+    def test_partitioned_pipeline_reads_wildcard_folders(self):
+        """Test that a partitioned source reads every partition file below the prefix."""
+        pipeline = build_pipeline("csv", "test-blob/year=*/month=*")
+
+        store_settings = _copy_activity(pipeline)["typeProperties"]["source"]["storeSettings"]
+        assert store_settings["recursive"] is True
+        assert store_settings["wildcardFolderPath"] == "test-blob/year=*/month=*"
+        assert store_settings["wildcardFileName"] == "*.csv"
+
+    def test_pipeline_reads_changed_file_list(self):
+        """Test that a file list restricts the copy to the listed partitions."""
+        pipeline = build_pipeline(file_list_path="test-container/test-blob/_changed_files.txt")
+
+        store_settings = _copy_activity(pipeline)["typeProperties"]["source"]["storeSettings"]
+        assert store_settings["fileListPath"] == "test-container/test-blob/_changed_files.txt"
+        assert "wildcardFolderPath" not in store_settings
+
+
+class TestFanOutPipeline:
+    """Tests for the pipeline copying each partition separately."""
+
+    def test_for_each_copies_listed_partitions(self):
+        """Test that a ForEach copies each partition of the looked up list, in batches."""
+        pipeline = build_fan_out_pipeline(
+            "parquet",
+            THROUGHPUT_PROFILES["bulk"],
+            batch_count=4,
+        )
+
+        lookup, for_each = pipeline.serialize()["properties"]["activities"]
+        assert lookup["typeProperties"]["dataset"]["referenceName"] == "SalesPartitionList"
+        assert lookup["typeProperties"]["firstRowOnly"] is False
+        assert for_each["dependsOn"][0]["activity"] == "LookupPartitions"
+        for_each_properties = for_each["typeProperties"]
+        assert for_each_properties["isSequential"] is False
+        assert for_each_properties["batchCount"] == 4
+        assert for_each_properties["items"]["value"] == (
+            "@activity('LookupPartitions').output.value"
+        )
+        copy_properties = for_each_properties["activities"][0]["typeProperties"]
+        assert copy_properties["dataIntegrationUnits"] == 8
+        store_settings = copy_properties["source"]["storeSettings"]
+        assert store_settings["wildcardFolderPath"]["value"] == "@item().folder"
+        assert store_settings["wildcardFileName"]["value"] == "@item().file"
+
+    @pytest.mark.parametrize("batch_count", [0, 51])
+    def test_batch_count_bounds(self, batch_count):
+        """Test that a batch count outside the range ADF accepts is rejected."""
+        with pytest.raises(ValueError, match="batch_count"):
+            build_fan_out_pipeline(batch_count=batch_count)
+
+
+class TestThroughputProfiles:
+    """Tests for sizing the copy activity."""
+
+    @pytest.mark.parametrize(
+        ("input_bytes", "expected"),
+        [(0, "small"), (256 * 1024**2, "small"), (1024**3, "bulk"), (50 * 1024**3, "backfill")],
+    )
+    def test_select_by_input_size(self, input_bytes, expected):
+        """Test that the smallest profile fitting the input is selected."""
+        assert select_throughput_profile(input_bytes).name == expected
+
+    def test_default_profile_copies_directly(self):
+        """Test that a small copy uses few DIUs and no staging or partition discovery."""
+        pipeline = build_pipeline()
+
+        copy_properties = _copy_activity(pipeline)["typeProperties"]
+        assert copy_properties["dataIntegrationUnits"] == 2
+        assert copy_properties["parallelCopies"] == 1
+        assert copy_properties["enableStaging"] is False
+        assert "stagingSettings" not in copy_properties
+        store_settings = copy_properties["source"]["storeSettings"]
+        assert store_settings["enablePartitionDiscovery"] is False
+        assert "partitionRootPath" not in store_settings
+
+    def test_backfill_profile_stages_through_blob(self):
+        """Test that a backfill copy is staged through blob without partition discovery."""
+        pipeline = build_pipeline(
+            "parquet",
+            file_list_path="test-container/test-blob/_changed_files.txt",
+            profile=THROUGHPUT_PROFILES["backfill"],
+            staging_path="test-container/adf-staging",
+        )
+
+        copy_properties = _copy_activity(pipeline)["typeProperties"]
+        assert copy_properties["dataIntegrationUnits"] == 32
+        assert copy_properties["parallelCopies"] == 16
+        assert copy_properties["enableStaging"] is True
+        assert copy_properties["stagingSettings"] == {
+            "linkedServiceName": {
+                "referenceName": "AzureBlobStorage",
+                "type": "LinkedServiceReference",
+            },
+            "path": "test-container/adf-staging",
+        }
+        store_settings = copy_properties["source"]["storeSettings"]
+        assert store_settings["enablePartitionDiscovery"] is False
+        assert "partitionRootPath" not in store_settings
+
+    def test_staged_profile_needs_staging_path(self):
+        """Test that a staged copy without a staging path is rejected."""
+        with pytest.raises(ValueError, match="staging path"):
+            build_pipeline(profile=THROUGHPUT_PROFILES["backfill"])
+
+    def test_partitioned_input_size_counts_changed_files(self):
+        """Test that only the partitions listed in the manifest count toward the input size."""
+        container_client = MagicMock()
+        container_client.download_blob.return_value.readall.return_value = (
+            b"test-blob/year=2014/part-00000.csv\ntest-blob/year=2015/part-00000.csv"
+        )
+        blobs = []
+        for year, size in [(2013, 100), (2014, 200), (2015, 300)]:
+            blob = MagicMock(size=size)
+            blob.name = f"test-blob/year={year}/part-00000.csv"
+            blobs.append(blob)
+        container_client.list_blobs.return_value = blobs
+
+        input_bytes = staged_input_bytes(container_client, "test-blob.csv", "csv", "year")
+
+        container_client.download_blob.assert_called_once_with("test-blob/_changed_files.txt")
+        container_client.list_blobs.assert_called_once_with(name_starts_with="test-blob")
+        assert input_bytes == 500
+
+    def test_incremental_input_size_counts_modified_files(self):
+        """Test that an incremental copy is sized by the partition files modified in its window."""
+        container_client = MagicMock()
+        blobs = []
+        for name, day in [
+            ("test-blob/year=2014/part-00000.csv", 1),
+            ("test-blob/year=2015/part-00000.csv", 10),
+            ("test-blob/_watermark.json", 10),
+        ]:
+            blob = MagicMock(size=100, last_modified=datetime(2024, 1, day, tzinfo=UTC))
+            blob.name = name
+            blobs.append(blob)
+        container_client.list_blobs.return_value = blobs
+        window = LoadWindow(datetime(2024, 1, 5, tzinfo=UTC), datetime(2024, 1, 20, tzinfo=UTC))
+
+        input_bytes = staged_input_bytes(container_client, "test-blob.csv", "csv", "year", window)
+
+        container_client.download_blob.assert_not_called()
+        assert input_bytes == 100
+
 
 class TestMainFunction:
     """Tests for the main function."""
 
     @patch("scripts.adf_pipeline_creator.config")
+    @patch("scripts.adf_pipeline_creator.monitor_pipeline_run")
     @patch("scripts.adf_pipeline_creator.get_azure_credential")
     @patch("scripts.adf_pipeline_creator.DataFactoryManagementClient")
     @patch("scripts.adf_pipeline_creator.create_data_factory_if_not_exists")
-    @patch("scripts.adf_pipeline_creator.create_blob_linked_service")
-    @patch("scripts.adf_pipeline_creator.create_snowflake_linked_service")
-    @patch("scripts.adf_pipeline_creator.create_datasets")
-    @patch("scripts.adf_pipeline_creator.create_and_run_pipeline")
+    @patch("scripts.adf_pipeline_creator.deploy_resources")
+    @patch("scripts.adf_pipeline_creator.run_pipeline")
+    @patch("scripts.adf_pipeline_creator.get_container_client")
     def test_main_function_orchestration(
         self,
-        mock_create_pipeline,
-        mock_create_datasets,
-        mock_create_snowflake,
-        mock_create_blob,
+        mock_get_container_client,
+        mock_run_pipeline,
+        mock_deploy,
         mock_create_df,
         mock_adf_client_class,
         mock_get_cred,
+        mock_monitor,
         mock_config,
         mock_azure_details,
         mock_snowflake_details,
@@ -230,11 +439,21 @@ class TestMainFunction:
         # Setup
         mock_config.get_azure_details.return_value = mock_azure_details
         mock_config.get_snowflake_details.return_value = mock_snowflake_details
+        mock_config.get_staging_settings.return_value = {"format": "csv", "partition_by": "none"}
+        mock_config.get_copy_settings.return_value = {
+            "throughput_profile": "bulk",
+            "state_file": "data/adf_state.json",
+            "incremental": False,
+            "fan_out": False,
+            "batch_count": 8,
+        }
         mock_credential = MagicMock()
         mock_get_cred.return_value = mock_credential
         mock_adf_client = MagicMock()
         mock_adf_client_class.return_value = mock_adf_client
-        mock_create_pipeline.return_value = "test-run-id"
+        mock_run_pipeline.return_value = "test-run-id"
+        blob_client = mock_get_container_client.return_value.get_blob_client.return_value
+        blob_client.get_blob_properties.return_value.name = "test-blob.csv"
 
         # Execute
         result = main()
@@ -252,8 +471,221 @@ class TestMainFunction:
             mock_azure_details["resource_group"],
             mock_azure_details["data_factory_name"],
         )
-        mock_create_blob.assert_called_once()
-        mock_create_snowflake.assert_called_once()
-        mock_create_datasets.assert_called_once()
-        mock_create_pipeline.assert_called_once()
-        assert result == "test-run-id"
+        _, _, _, resources, state_path = mock_deploy.call_args[0]
+        assert [resource.key for resource in resources] == [
+            "linked_service/AzureBlobStorage",
+            "linked_service/SnowflakeDB",
+            "dataset/SalesCSV",
+            "dataset/RawSalesTable",
+            "pipeline/RawDataLoadPipeline",
+        ]
+        assert resources[-1].depends_on == ("dataset/SalesCSV", "dataset/RawSalesTable")
+        copy_properties = resources[-1].body()["properties"]["activities"][0]["typeProperties"]
+        assert copy_properties["dataIntegrationUnits"] == 8
+        assert state_path == Path("data/adf_state.json")
+        mock_run_pipeline.assert_called_once_with(
+            mock_adf_client,
+            mock_azure_details["resource_group"],
+            mock_azure_details["data_factory_name"],
+            None,
+        )
+        mock_monitor.assert_called_once_with(
+            mock_adf_client,
+            mock_azure_details["resource_group"],
+            mock_azure_details["data_factory_name"],
+            "test-run-id",
+            raise_on_failure=True,
+        )
+        assert result == mock_monitor.return_value
+        assert result.copied_blobs == ["test-blob.csv"]
+
+    @pytest.mark.parametrize("copy_succeeds", [True, False])
+    @patch("scripts.adf_pipeline_creator.config")
+    @patch("scripts.adf_pipeline_creator.get_azure_credential")
+    @patch("scripts.adf_pipeline_creator.DataFactoryManagementClient")
+    @patch("scripts.adf_pipeline_creator.create_data_factory_if_not_exists")
+    @patch("scripts.adf_pipeline_creator.deploy_resources")
+    @patch("scripts.adf_pipeline_creator.run_pipeline")
+    @patch("scripts.adf_pipeline_creator.monitor_pipeline_run")
+    @patch("scripts.adf_pipeline_creator.get_container_client")
+    @patch("scripts.adf_pipeline_creator.next_window")
+    @patch("scripts.adf_pipeline_creator.advance_watermark")
+    def test_main_incremental(
+        self,
+        mock_advance,
+        mock_next_window,
+        mock_get_container_client,
+        mock_monitor,
+        mock_run_pipeline,
+        mock_deploy,
+        mock_create_df,
+        mock_adf_client_class,
+        mock_get_cred,
+        mock_config,
+        copy_succeeds,
+        mock_azure_details,
+        mock_snowflake_details,
+    ):
+        """Test that the window is passed to the run and the watermark only moves on success.
+
+        A blob staged after the window's end is not reported as copied.
+        """
+        # Setup
+        mock_config.get_azure_details.return_value = mock_azure_details
+        mock_config.get_snowflake_details.return_value = mock_snowflake_details
+        mock_config.get_staging_settings.return_value = {"format": "csv", "partition_by": "month"}
+        mock_config.get_copy_settings.return_value = {
+            "throughput_profile": "small",
+            "state_file": "",
+            "incremental": True,
+            "fan_out": False,
+            "batch_count": 8,
+        }
+        window = LoadWindow(None, datetime(2024, 1, 1, tzinfo=UTC))
+        mock_next_window.return_value = window
+        container_client = mock_get_container_client.return_value
+        blobs = []
+        for month, modified in [(1, datetime(2023, 12, 1, tzinfo=UTC)), (2, window.end)]:
+            blob = MagicMock(size=100, last_modified=modified)
+            blob.name = f"test-blob/year=2015/month=0{month}/part-00000.csv"
+            blobs.append(blob)
+        container_client.list_blobs.return_value = blobs
+        mock_run_pipeline.return_value = "test-run-id"
+        if not copy_succeeds:
+            mock_monitor.side_effect = PipelineRunError("Pipeline run test-run-id Failed")
+
+        # Execute
+        if copy_succeeds:
+            main()
+        else:
+            with pytest.raises(PipelineRunError):
+                main()
+
+        # Assert
+        mock_get_cred.assert_called_once()
+        mock_adf_client_class.assert_called_once()
+        mock_create_df.assert_called_once()
+        assert mock_run_pipeline.call_args[0][3] == window.parameters()
+        pipeline = mock_deploy.call_args[0][3][-1]
+        properties = pipeline.body()["properties"]
+        assert set(properties["parameters"]) == {"windowStart", "windowEnd"}
+        store_settings = properties["activities"][0]["typeProperties"]["source"]["storeSettings"]
+        assert store_settings["wildcardFolderPath"] == "test-blob/year=*/month=*"
+        assert "fileListPath" not in store_settings
+        mock_next_window.assert_called_once_with(container_client, "test-blob.csv", blobs)
+        if copy_succeeds:
+            mock_advance.assert_called_once_with(
+                container_client,
+                "test-blob.csv",
+                window,
+                "test-run-id",
+            )
+            assert mock_monitor.return_value.copied_blobs == [blobs[0].name]
+        else:
+            mock_advance.assert_not_called()
+
+    @patch("scripts.adf_pipeline_creator.config")
+    @patch("scripts.adf_pipeline_creator.get_azure_credential")
+    @patch("scripts.adf_pipeline_creator.DataFactoryManagementClient")
+    @patch("scripts.adf_pipeline_creator.create_data_factory_if_not_exists")
+    @patch("scripts.adf_pipeline_creator.deploy_resources")
+    @patch("scripts.adf_pipeline_creator.run_pipeline")
+    @patch("scripts.adf_pipeline_creator.monitor_pipeline_run")
+    @patch("scripts.adf_pipeline_creator.get_container_client")
+    @patch("scripts.adf_pipeline_creator.next_window")
+    @patch("scripts.adf_pipeline_creator.advance_watermark")
+    def test_main_fan_out(
+        self,
+        mock_advance,
+        mock_next_window,
+        mock_get_container_client,
+        mock_monitor,
+        mock_run_pipeline,
+        mock_deploy,
+        mock_create_df,
+        mock_adf_client_class,
+        mock_get_cred,
+        mock_config,
+        mock_azure_details,
+        mock_snowflake_details,
+    ):
+        """Test that failed partitions are recorded and raise, while the watermark advances."""
+        # Setup
+        mock_config.get_azure_details.return_value = mock_azure_details
+        mock_config.get_snowflake_details.return_value = mock_snowflake_details
+        mock_config.get_staging_settings.return_value = {"format": "csv", "partition_by": "year"}
+        mock_config.get_copy_settings.return_value = {
+            "throughput_profile": "small",
+            "state_file": "",
+            "incremental": True,
+            "fan_out": True,
+            "batch_count": 4,
+        }
+        window = LoadWindow(None, datetime(2024, 1, 1, tzinfo=UTC))
+        mock_next_window.return_value = window
+        container_client = mock_get_container_client.return_value
+        # A partition that failed in the previous run is retried although not modified
+        container_client.download_blob.return_value.readall.return_value = (
+            b'{"test-blob/year=2013/part-00000.csv": {"status": "Failed"}}'
+        )
+        blobs = []
+        for year, day in [(2013, 1), (2014, 1), (2015, 2)]:
+            blob = MagicMock(size=100, last_modified=datetime(2023, 1, day, tzinfo=UTC))
+            blob.name = f"test-blob/year={year}/part-00000.csv"
+            blobs.append(blob)
+        blobs[0].last_modified = datetime(2024, 6, 1, tzinfo=UTC)
+        container_client.list_blobs.return_value = blobs
+        mock_run_pipeline.return_value = "test-run-id"
+        mock_monitor.return_value = PipelineRunReport(
+            run_id="test-run-id",
+            pipeline_name="RawDataLoadPipeline",
+            status="Failed",
+            message="Activity failed",
+            duration=60,
+            wait_seconds=61,
+            polls=5,
+            copies=[
+                CopyActivityMetrics(
+                    "CopyPartition",
+                    "Succeeded",
+                    source_path=f"test-blob/year={year}/part-00000.csv",
+                )
+                for year in (2013, 2014)
+            ]
+            + [
+                CopyActivityMetrics(
+                    "CopyPartition",
+                    "Failed",
+                    source_path="test-blob/year=2015/part-00000.csv",
+                ),
+            ],
+        )
+
+        # Execute
+        with pytest.raises(PipelineRunError, match="1 partitions failed"):
+            main()
+
+        # Assert
+        mock_get_cred.assert_called_once()
+        mock_adf_client_class.assert_called_once()
+        mock_create_df.assert_called_once()
+        uploads = {
+            call.args[0]: call.args[1] for call in container_client.upload_blob.call_args_list
+        }
+        assert json.loads(uploads["test-blob/_partition_list.json"]) == [
+            {"folder": f"test-blob/year={year}", "file": "part-00000.csv"}
+            for year in (2013, 2014, 2015)
+        ]
+        status = json.loads(uploads["test-blob/_partition_status.json"])
+        assert status["test-blob/year=2013/part-00000.csv"]["status"] == "Succeeded"
+        assert status["test-blob/year=2015/part-00000.csv"]["status"] == "Failed"
+        resources = mock_deploy.call_args[0][3]
+        assert "dataset/SalesPartitionList" in [resource.key for resource in resources]
+        assert mock_run_pipeline.call_args[0][3] is None
+        assert mock_monitor.call_args.kwargs == {"raise_on_failure": False}
+        mock_advance.assert_called_once_with(
+            container_client,
+            "test-blob.csv",
+            window,
+            "test-run-id",
+        )
@@ -1,8 +1,18 @@
-from unittest.mock import MagicMock, mock_open, patch
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import uuid
+import zipfile
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, mock_open, patch
 
 import pytest
 import requests
-from azure.identity import ClientSecretCredential
+from azure.core.exceptions import ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient
 
 from scripts.azure_blob_upload import (
@@ -10,11 +20,19 @@ from scripts.azure_blob_upload import (
     create_azure_resources,
     download_dataset,
     generate_sas_token,
+    iter_blocks,
     main,
+    mark_loaded,
+    stream_dataset_to_blob,
+    upload_blocks,
     upload_to_blob,
 )
 
 
+def _raise(error: Exception):
+    raise error
+
+
 @pytest.fixture
 def mock_azure_details():
     """Fixture for Azure configuration details."""
@@ -27,6 +45,7 @@ def mock_azure_details():
         "client_id": "test-client-id",
         "client_secret": "test-secret",
         "tenant_id": "test-tenant",
+        "sas_token": None,
     }
 
 
@@ -38,6 +57,8 @@ def mock_blob_service_client():
     # Setup container client mock
     container_client = MagicMock()
     client.get_container_client.return_value = container_client
+    # Nothing was loaded yet
+    container_client.download_blob.side_effect = ResourceNotFoundError("Not found")
 
     # Setup blob client mock
     blob_client = MagicMock()
@@ -46,41 +67,30 @@ def mock_blob_service_client():
     return client
 
 
-@pytest.fixture
-def mock_credential():
-    """Fixture for Azure credential."""
-    return MagicMock(spec=ClientSecretCredential)
-
-
 class TestDownloadDataset:
     """Tests for download_dataset function."""
 
     @patch("scripts.azure_blob_upload.Path.exists")
-    @patch("scripts.azure_blob_upload.requests.get")
-    @patch("scripts.azure_blob_upload.Path.open", new_callable=mock_open)
+    @patch("scripts.azure_blob_upload.download_file")
     @patch("scripts.azure_blob_upload.zipfile.ZipFile")
     @patch("scripts.azure_blob_upload.Path.unlink")
     def test_download_dataset_when_not_exist(
         self,
         mock_unlink,
         mock_zipfile,
-        mock_file,
-        mock_get,
+        mock_download_file,
         mock_exists,
     ):
         """Test downloading the dataset when it doesn't exist locally."""
         # Setup
         mock_exists.return_value = False
-        mock_response = MagicMock(spec=requests.Response)
-        mock_response.iter_content.return_value = [b"test data"]
-        mock_get.return_value = mock_response
 
         # Execute
         download_dataset()
 
         # Assert
-        mock_get.assert_called_once()
-        mock_file.assert_called()
+        mock_download_file.assert_called_once()
+        assert mock_download_file.call_args[0][1] == Path("sales-dataset.zip")
         mock_zipfile.assert_called_once()
         mock_unlink.assert_called_once()
 
@@ -97,12 +107,12 @@ class TestDownloadDataset:
         mock_exists.assert_called_once()
 
     @patch("scripts.azure_blob_upload.Path.exists")
-    @patch("scripts.azure_blob_upload.requests.get")
-    def test_download_dataset_http_error(self, mock_get, mock_exists):
+    @patch("scripts.azure_blob_upload.download_file")
+    def test_download_dataset_http_error(self, mock_download_file, mock_exists):
         """Test handling HTTP error during download."""
         # Setup
         mock_exists.return_value = False
-        mock_get.side_effect = requests.exceptions.HTTPError("404 Client Error")
+        mock_download_file.side_effect = requests.exceptions.HTTPError("404 Client Error")
 
         # Execute & Assert
         with pytest.raises(requests.exceptions.HTTPError):
@@ -172,134 +182,86 @@ class TestAzureResourceCreation:
     """Tests for Azure resource creation functionality."""
 
     @patch("scripts.azure_blob_upload.config.get_azure_details")
-    @patch("scripts.azure_blob_upload.ResourceManagementClient")
-    @patch("scripts.azure_blob_upload.StorageManagementClient")
+    @patch("scripts.azure_blob_upload.provision_resources", new_callable=AsyncMock)
     @patch("scripts.azure_blob_upload.generate_sas_token")
     @patch("scripts.azure_blob_upload.add_sas_token_to_dotenv")
     @patch("scripts.azure_blob_upload.BlobServiceClient")
     @patch("os.environ")
-    def test_create_azure_resources_all_new(
+    def test_create_azure_resources(
         self,
         mock_environ,
         mock_blob_client_class,
         mock_add_sas,
         mock_generate_sas,
-        mock_storage_client_class,
-        mock_resource_client_class,
+        mock_provision,
         mock_get_azure_details,
         mock_azure_details,
-        mock_credential,
         mock_blob_service_client,
     ):
-        """Test creating all Azure resources when none exist."""
+        """Test that resources are provisioned and a SAS token is stored for ADF."""
         # Setup
         mock_get_azure_details.return_value = mock_azure_details
-
-        # Resource group doesn't exist
-        mock_resource_client = MagicMock()
-        mock_resource_client.resource_groups.list.return_value = []
-        mock_resource_client_class.return_value = mock_resource_client
-
-        # Storage account doesn't exist
-        mock_storage_client = MagicMock()
-        mock_storage_client.storage_accounts.list_by_resource_group.return_value = []
-        mock_storage_keys = MagicMock()
-        mock_storage_keys.keys = [MagicMock()]
-        mock_storage_keys.keys[0].value = "test-key"
-        mock_storage_client.storage_accounts.list_keys.return_value = mock_storage_keys
-        mock_storage_client_class.return_value = mock_storage_client
-
-        # SAS token
+        mock_provision.return_value = "test-key"
         mock_generate_sas.return_value = "test-sas-token"
-
-        # Container doesn't exist
         mock_blob_client_class.return_value = mock_blob_service_client
-        mock_blob_service_client.list_containers.return_value = []
 
         # Execute
-        result = create_azure_resources(mock_credential)
+        result = create_azure_resources()
 
         # Assert
-        mock_resource_client.resource_groups.create_or_update.assert_called_once()
-        mock_storage_client.storage_accounts.begin_create.assert_called_once()
+        mock_provision.assert_awaited_once_with(mock_azure_details)
         mock_generate_sas.assert_called_once_with(
             mock_azure_details["storage_account"],
             "test-key",
         )
         mock_add_sas.assert_called_once_with("test-sas-token")
         mock_environ.__setitem__.assert_called_once_with("AZURE_SAS_TOKEN", "test-sas-token")
-        mock_blob_service_client.create_container.assert_called_once_with(
-            mock_azure_details["container_name"],
+        mock_blob_client_class.assert_called_once_with(
+            account_url="https://teststorage.blob.core.windows.net",
+            credential="test-key",
         )
         assert result == mock_blob_service_client
 
     @patch("scripts.azure_blob_upload.config.get_azure_details")
-    @patch("scripts.azure_blob_upload.ResourceManagementClient")
-    @patch("scripts.azure_blob_upload.StorageManagementClient")
+    @patch("scripts.azure_blob_upload.provision_resources", new_callable=AsyncMock)
     @patch("scripts.azure_blob_upload.generate_sas_token")
+    @patch("scripts.azure_blob_upload.add_sas_token_to_dotenv")
     @patch("scripts.azure_blob_upload.BlobServiceClient")
-    def test_create_azure_resources_all_exist(
+    def test_create_azure_resources_reuses_sas_token(
         self,
         mock_blob_client_class,
+        mock_add_sas,
         mock_generate_sas,
-        mock_storage_client_class,
-        mock_resource_client_class,
+        mock_provision,
         mock_get_azure_details,
         mock_azure_details,
-        mock_credential,
-        mock_blob_service_client,
     ):
-        """Test when all Azure resources already exist."""
+        """Test that a stored SAS token far from expiring is reused instead of regenerated."""
         # Setup
+        expiry = (datetime.now(tz=UTC) + timedelta(days=9)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        mock_azure_details["sas_token"] = f"sv=2021-08-06&se={expiry}&sig=test"
         mock_get_azure_details.return_value = mock_azure_details
-
-        # Resource group exists
-        mock_resource_group = MagicMock()
-        mock_resource_group.name = mock_azure_details["resource_group"]
-        mock_resource_client = MagicMock()
-        mock_resource_client.resource_groups.list.return_value = [mock_resource_group]
-        mock_resource_client_class.return_value = mock_resource_client
-
-        # Storage account exists
-        mock_storage_account = MagicMock()
-        mock_storage_account.name = mock_azure_details["storage_account"]
-        mock_storage_client = MagicMock()
-        mock_storage_client.storage_accounts.list_by_resource_group.return_value = [
-            mock_storage_account,
-        ]
-        mock_storage_keys = MagicMock()
-        mock_storage_keys.keys = [MagicMock()]
-        mock_storage_keys.keys[0].value = "test-key"
-        mock_storage_client.storage_accounts.list_keys.return_value = mock_storage_keys
-        mock_storage_client_class.return_value = mock_storage_client
-
-        # SAS token
-        mock_generate_sas.return_value = "test-sas-token"
-
-        # Container exists
-        mock_blob_client_class.return_value = mock_blob_service_client
-        mock_container = MagicMock()
-        mock_container.name = mock_azure_details["container_name"]
-        mock_blob_service_client.list_containers.return_value = [mock_container]
+        mock_provision.return_value = "test-key"
 
         # Execute
-        result = create_azure_resources(mock_credential)
+        create_azure_resources()
 
         # Assert
-        mock_resource_client.resource_groups.create_or_update.assert_not_called()
-        mock_storage_client.storage_accounts.begin_create.assert_not_called()
-        mock_blob_service_client.create_container.assert_not_called()
-        assert result == mock_blob_service_client
+        mock_generate_sas.assert_not_called()
+        mock_add_sas.assert_not_called()
+        mock_blob_client_class.assert_called_once()
 
 
 class TestBlobUpload:
     """Tests for blob upload functionality."""
 
     @patch("scripts.azure_blob_upload.config.get_azure_details")
+    @patch("scripts.azure_blob_upload.file_digest")
     @patch("scripts.azure_blob_upload.Path")
     def test_upload_to_blob(
         self,
         mock_path_class,
+        mock_file_digest,
         mock_get_azure_details,
         mock_azure_details,
         mock_blob_service_client,
@@ -307,6 +269,7 @@ class TestBlobUpload:
         """Test uploading a file to Azure Blob Storage."""
         # Setup
         mock_get_azure_details.return_value = mock_azure_details
+        mock_file_digest.return_value = "test-digest"
 
         # Mock file handling
         mock_path_instance = MagicMock()
@@ -329,28 +292,505 @@ class TestBlobUpload:
         container_client.get_blob_client.assert_called_once_with(
             mock_azure_details["blob_name"],
         )
-        blob_client.upload_blob.assert_called_once_with("csv content", overwrite=True)
+        blob_client.upload_blob.assert_called_once_with(
+            "csv content",
+            overwrite=True,
+            metadata={"content_sha256": "test-digest"},
+        )
+
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_skips_unchanged(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that unchanged content is neither uploaded nor loaded again once loaded."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {"mode": "single", "force": False}
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "10000 Sales Records.csv").write_bytes(b"Region\nAsia\n")
+        digest = hashlib.sha256(b"Asia\n").hexdigest()
+        container_client = mock_blob_service_client.get_container_client.return_value
+        container_client.download_blob.side_effect = None
+        container_client.download_blob.return_value.readall.return_value = json.dumps(
+            {mock_azure_details["blob_name"]: digest},
+        )
+        blob_client = container_client.get_blob_client(mock_azure_details["blob_name"])
+        blob_client.get_blob_properties.return_value.metadata = {"content_sha256": digest}
+
+        pending = upload_to_blob(mock_blob_service_client)
+
+        assert pending == []
+        blob_client.upload_blob.assert_not_called()
+
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_reloads_after_failed_load(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that a blob stays pending on reruns until its load is recorded as succeeded."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {"mode": "single", "force": False}
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "10000 Sales Records.csv").write_bytes(b"Region\nAsia\n")
+        blobs: dict[str, bytes] = {}
+        container_client = mock_blob_service_client.get_container_client.return_value
+        container_client.download_blob.side_effect = lambda name: (
+            MagicMock(readall=MagicMock(return_value=blobs[name]))
+            if name in blobs
+            else _raise(ResourceNotFoundError("Not found"))
+        )
+        container_client.upload_blob.side_effect = lambda name, data, **_: blobs.update(
+            {name: data},
+        )
+        blob_client = container_client.get_blob_client(mock_azure_details["blob_name"])
+        blob_client.get_blob_properties.side_effect = ResourceNotFoundError("Not found")
+
+        # The first run uploads the blob, then its load fails, so nothing is recorded
+        assert upload_to_blob(mock_blob_service_client) == [mock_azure_details["blob_name"]]
+        blob_client.get_blob_properties.side_effect = None
+        blob_client.get_blob_properties.return_value.metadata = {
+            "content_sha256": hashlib.sha256(b"Asia\n").hexdigest(),
+        }
+
+        # The rerun skips the identical upload but must load the blob again
+        assert upload_to_blob(mock_blob_service_client) == [mock_azure_details["blob_name"]]
+        blob_client.upload_blob.assert_called_once()
+
+        with patch("scripts.azure_blob_upload.ContainerClient", return_value=container_client):
+            mark_loaded([mock_azure_details["blob_name"]])
+
+        assert upload_to_blob(mock_blob_service_client) == []
+
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_uploads_new_blob(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that a missing blob is uploaded and reported as pending load."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {"mode": "single", "force": False}
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "10000 Sales Records.csv").write_bytes(b"Region\nAsia\n")
+        blob_client = mock_blob_service_client.get_container_client.return_value.get_blob_client(
+            mock_azure_details["blob_name"],
+        )
+        blob_client.get_blob_properties.side_effect = ResourceNotFoundError("Not found")
+
+        pending = upload_to_blob(mock_blob_service_client)
+
+        assert pending == [mock_azure_details["blob_name"]]
+        blob_client.upload_blob.assert_called_once_with(
+            b"Asia\n",
+            overwrite=True,
+            metadata={"content_sha256": hashlib.sha256(b"Asia\n").hexdigest()},
+        )
+
+
+class TestStreamingUpload:
+    """Tests for the streaming block upload."""
+
+    def test_iter_blocks_fixed_size(self):
+        """Test that blocks have the requested size except the last one."""
+        blocks = list(iter_blocks(io.BytesIO(b"abcdefghij"), 4))
+
+        assert blocks == [b"abcd", b"efgh", b"ij"]
+
+    def test_iter_blocks_tops_up_short_reads(self):
+        """Test that short reads from the stream are merged into full blocks."""
+        stream = MagicMock()
+        stream.read.side_effect = [b"ab", b"cd", b"ef", b"", b""]
+
+        blocks = list(iter_blocks(stream, 4))
+
+        assert blocks == [b"abcd", b"ef"]
+
+    def test_upload_blocks_commits_in_order(self):
+        """Test that blocks are staged and committed in their original order."""
+        blob_client = MagicMock()
+
+        uploaded = upload_blocks(blob_client, [b"aa", b"bb", b"c"], max_workers=2)
+
+        assert uploaded == 5
+        assert blob_client.stage_block.call_count == 3
+        staged = {call.args[0]: call.args[1] for call in blob_client.stage_block.call_args_list}
+        committed = blob_client.commit_block_list.call_args[0][0]
+        assert [staged[block.id] for block in committed] == [b"aa", b"bb", b"c"]
+        assert len({len(block.id) for block in committed}) == 1
+
+    def test_upload_blocks_propagates_errors(self):
+        """Test that a failed block stage aborts the upload without committing."""
+        blob_client = MagicMock()
+        blob_client.stage_block.side_effect = RuntimeError("stage failed")
+
+        with pytest.raises(RuntimeError):
+            upload_blocks(blob_client, [b"aa", b"bb"], max_workers=1)
+
+        blob_client.commit_block_list.assert_not_called()
+
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_streaming_skips_header(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that streaming mode drops the header line and uploads the rest in blocks."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {
+            "mode": "streaming",
+            "block_size": 8,
+            "max_workers": 2,
+        }
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "10000 Sales Records.csv").write_bytes(
+            b"Region,Country\nAsia,Japan\nEurope,France\n",
+        )
+        blob_client = mock_blob_service_client.get_container_client.return_value.get_blob_client(
+            mock_azure_details["blob_name"],
+        )
+
+        upload_to_blob(mock_blob_service_client)
+
+        staged = b"".join(call.args[1] for call in blob_client.stage_block.call_args_list)
+        assert staged == b"Asia,Japan\nEurope,France\n"
+        blob_client.commit_block_list.assert_called_once()
+        blob_client.upload_blob.assert_not_called()
+
+    @patch("scripts.azure_blob_upload.config.get_staging_settings")
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_parquet(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_get_staging_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that Parquet staging converts the CSV and uploads it under a .parquet name."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {"mode": "single"}
+        mock_get_staging_settings.return_value = {
+            "format": "parquet",
+            "parquet_compression": "snappy",
+            "partition_by": "none",
+        }
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "10000 Sales Records.csv").write_text(
+            "Region,Country,Item Type,Sales Channel,Order Priority,Order Date,Order ID,"
+            "Ship Date,Units Sold,Unit Price,Unit Cost\n"
+            "Asia,Japan,Cereal,Online,H,1/2/2015,1,1/9/2015,10,205.7,117.11\n",
+        )
+        container_client = mock_blob_service_client.get_container_client.return_value
+
+        upload_to_blob(mock_blob_service_client)
+
+        container_client.get_blob_client.assert_called_once_with("test-blob.parquet")
+        uploaded = container_client.get_blob_client.return_value.upload_blob.call_args[0][0]
+        assert uploaded.startswith(b"PAR1")
+        assert (tmp_path / "data" / "10000 Sales Records.parquet").exists()
+
+    @patch("scripts.azure_blob_upload.config.get_staging_settings")
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_partitioned(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_get_staging_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that each month partition is uploaded under the Hive-style prefix."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {"mode": "single", "max_workers": 2}
+        mock_get_staging_settings.return_value = {
+            "format": "csv",
+            "parquet_compression": "snappy",
+            "partition_by": "month",
+        }
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "10000 Sales Records.csv").write_text(
+            "Region,Country,Item Type,Sales Channel,Order Priority,Order Date,Order ID,"
+            "Ship Date,Units Sold,Unit Price,Unit Cost\n"
+            "Asia,Japan,Cereal,Online,H,1/2/2015,1,1/9/2015,10,205.7,117.11\n"
+            "Asia,Japan,Cereal,Online,H,3/2/2014,2,3/9/2014,10,205.7,117.11\n",
+        )
+        container_client = mock_blob_service_client.get_container_client.return_value
+
+        upload_to_blob(mock_blob_service_client)
+
+        blob_names = {call.args[0] for call in container_client.get_blob_client.call_args_list}
+        assert blob_names == {
+            "test-blob/year=2014/month=03/part-00000.csv",
+            "test-blob/year=2015/month=01/part-00000.csv",
+            "test-blob/_changed_files.txt",
+        }
+        upload_calls = container_client.get_blob_client.return_value.upload_blob.call_args_list
+        assert len(upload_calls) == 3
+        assert upload_calls[-1].args[0] == (
+            "test-blob/year=2014/month=03/part-00000.csv\n"
+            "test-blob/year=2015/month=01/part-00000.csv"
+        )
+
+    @patch("scripts.azure_blob_upload.config.get_staging_settings")
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_partitioned_bounds_blocks_in_flight(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_get_staging_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that max_workers bounds the blocks in flight across all partitions."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {
+            "mode": "streaming",
+            "block_size": 16,
+            "max_workers": 2,
+        }
+        mock_get_staging_settings.return_value = {
+            "format": "csv",
+            "parquet_compression": "snappy",
+            "partition_by": "month",
+        }
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        rows = [
+            f"Asia,Japan,Cereal,Online,H,{month}/2/2015,{month}{day},{month}/9/2015,10,205.7,117.11\n"
+            for month in range(1, 5)
+            for day in range(10)
+        ]
+        (tmp_path / "data" / "10000 Sales Records.csv").write_text(
+            "Region,Country,Item Type,Sales Channel,Order Priority,Order Date,Order ID,"
+            "Ship Date,Units Sold,Unit Price,Unit Cost\n" + "".join(rows),
+        )
+        lock = threading.Lock()
+        in_flight = peak = 0
+
+        def stage_block(_block_id, _block):
+            nonlocal in_flight, peak
+            with lock:
+                in_flight += 1
+                peak = max(peak, in_flight)
+            time.sleep(0.005)
+            with lock:
+                in_flight -= 1
+
+        blob_client = mock_blob_service_client.get_container_client.return_value.get_blob_client(
+            mock_azure_details["blob_name"],
+        )
+        blob_client.stage_block.side_effect = stage_block
+
+        upload_to_blob(mock_blob_service_client)
+
+        assert blob_client.commit_block_list.call_count == 4
+        assert blob_client.stage_block.call_count > 4 * 2
+        assert peak <= 2
+
+    @patch("scripts.azure_blob_upload.config.get_staging_settings")
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_cleaned(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_get_staging_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+        tmp_path,
+        monkeypatch,
+    ):
+        """Test that the cleaned extract is uploaded and rejected rows are quarantined."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {"mode": "single"}
+        mock_get_staging_settings.return_value = {
+            "format": "csv",
+            "parquet_compression": "snappy",
+            "partition_by": "none",
+            "clean": True,
+        }
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "data").mkdir()
+        (tmp_path / "data" / "10000 Sales Records.csv").write_text(
+            "Region,Country,Item Type,Sales Channel,Order Priority,Order Date,Order ID,"
+            "Ship Date,Units Sold,Unit Price,Unit Cost\n"
+            "Asia,Japan,Cereal,Online,H,1/2/2015,1,1/9/2015,10,205.7,117.11\n"
+            "Asia,Japan,Cereal,Online,H,1/2/2015,1,1/9/2015,10,205.7,117.11\n"
+            "Asia,Japan,Cereal,Online,H,1/2/2015,2,1/9/2015,ten,205.7,117.11\n",
+        )
+        blob_client = mock_blob_service_client.get_container_client.return_value.get_blob_client(
+            mock_azure_details["blob_name"],
+        )
+
+        upload_to_blob(mock_blob_service_client)
+
+        uploaded = blob_client.upload_blob.call_args[0][0]
+        assert uploaded == (
+            b'"Asia","Japan","Cereal","Online","H","01/02/2015",1,"01/09/2015",10,205.7,117.11\n'
+        )
+        quarantine = (tmp_path / "data" / "10000 Sales Records.quarantine.csv").read_text()
+        assert quarantine.count("\n") == 3
+
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    def test_upload_to_blob_unknown_mode(
+        self,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+    ):
+        """Test that an unknown upload mode is rejected."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {"mode": "bogus"}
+
+        with pytest.raises(ValueError, match="Unknown upload mode"):
+            upload_to_blob(mock_blob_service_client)
+
+    @pytest.mark.skipif(
+        not os.getenv("AZURITE_CONNECTION_STRING"),
+        reason="AZURITE_CONNECTION_STRING is not set",
+    )
+    def test_upload_blocks_against_azurite(self):
+        """Test a real block upload against a local Azurite emulator."""
+        service_client = BlobServiceClient.from_connection_string(
+            os.environ["AZURITE_CONNECTION_STRING"],
+        )
+        container_client = service_client.get_container_client(f"test-{uuid.uuid4().hex}")
+        container_client.create_container()
+        try:
+            blob_client = container_client.get_blob_client("blocks.csv")
+            payload = os.urandom(3 * 1024 * 1024 + 17)
+
+            upload_blocks(blob_client, iter_blocks(io.BytesIO(payload), 1024 * 1024), 4)
+
+            assert blob_client.download_blob().readall() == payload
+        finally:
+            container_client.delete_container()
+
+
+class TestPipelinedIngest:
+    """Tests for streaming the dataset archive straight into blob storage."""
+
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.config.get_azure_details")
+    @patch("scripts.azure_blob_upload.requests.get")
+    def test_stream_dataset_to_blob(
+        self,
+        mock_get,
+        mock_get_azure_details,
+        mock_get_upload_settings,
+        mock_azure_details,
+        mock_blob_service_client,
+    ):
+        """Test that the CSV member is inflated and uploaded without its header."""
+        mock_get_azure_details.return_value = mock_azure_details
+        mock_get_upload_settings.return_value = {
+            "mode": "pipelined",
+            "block_size": 64,
+            "max_workers": 2,
+        }
+        rows = b"Asia,Japan\n" * 50
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.writestr("10000 Sales Records.csv", b"Region,Country\n" + rows)
+        payload = archive.getvalue()
+        mock_response = mock_get.return_value.__enter__.return_value
+        mock_response.iter_content.return_value = [
+            payload[i : i + 100] for i in range(0, len(payload), 100)
+        ]
+        blob_client = mock_blob_service_client.get_container_client.return_value.get_blob_client(
+            mock_azure_details["blob_name"],
+        )
+
+        stream_dataset_to_blob(mock_blob_service_client)
+
+        mock_response.raise_for_status.assert_called_once()
+        staged = b"".join(call.args[1] for call in blob_client.stage_block.call_args_list)
+        assert staged == rows
+        blob_client.commit_block_list.assert_called_once()
+        assert blob_client.commit_block_list.call_args.kwargs["metadata"] == {
+            "content_sha256": hashlib.sha256(rows).hexdigest(),
+        }
+
+    @patch("scripts.azure_blob_upload.config.get_upload_settings")
+    @patch("scripts.azure_blob_upload.download_dataset")
+    @patch("scripts.azure_blob_upload.create_azure_resources")
+    @patch("scripts.azure_blob_upload.upload_to_blob")
+    @patch("scripts.azure_blob_upload.stream_dataset_to_blob")
+    def test_main_pipelined_skips_local_download(
+        self,
+        mock_stream,
+        mock_upload,
+        mock_create_resources,
+        mock_download,
+        mock_get_upload_settings,
+        mock_blob_service_client,
+    ):
+        """Test that pipelined mode neither downloads locally nor uploads a local file."""
+        mock_get_upload_settings.return_value = {"mode": "pipelined"}
+        mock_create_resources.return_value = mock_blob_service_client
+
+        main()
+
+        mock_download.assert_not_called()
+        mock_create_resources.assert_called_once_with()
+        mock_upload.assert_not_called()
+        mock_stream.assert_called_once_with(mock_blob_service_client)
 
 
 class TestMainFunction:
     """Tests for the main function."""
 
     @patch("scripts.azure_blob_upload.download_dataset")
-    @patch("scripts.azure_blob_upload.get_azure_credential")
     @patch("scripts.azure_blob_upload.create_azure_resources")
     @patch("scripts.azure_blob_upload.upload_to_blob")
     def test_main_function_orchestration(
         self,
         mock_upload,
         mock_create_resources,
-        mock_get_credential,
         mock_download,
-        mock_credential,
         mock_blob_service_client,
     ):
         """Test that main function orchestrates all the steps correctly."""
         # Setup
-        mock_get_credential.return_value = mock_credential
         mock_create_resources.return_value = mock_blob_service_client
 
         # Execute
@@ -358,6 +798,5 @@ class TestMainFunction:
 
         # Assert
         mock_download.assert_called_once()
-        mock_get_credential.assert_called_once()
-        mock_create_resources.assert_called_once_with(mock_credential)
+        mock_create_resources.assert_called_once_with()
         mock_upload.assert_called_once_with(mock_blob_service_client)
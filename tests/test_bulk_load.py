@@ -0,0 +1,188 @@
+import sqlite3
+from unittest.mock import MagicMock
+
+import pytest
+
+from utils.bulk_load import (
+    FILE_FORMATS,
+    NO_FILES_STATUS,
+    LoadError,
+    LocalBackend,
+    SnowflakeBackend,
+    load_files,
+    parse_copy_results,
+    select_file_format,
+    stamp_loaded_rows,
+)
+from utils.sales_data import partition_extract
+
+SOURCE_CSV = (
+    "Region,Country,Item Type,Sales Channel,Order Priority,Order Date,Order ID,Ship Date,"
+    "Units Sold,Unit Price,Unit Cost,Total Revenue,Total Cost,Total Profit\n"
+    "Sub-Saharan Africa,Chad,Office Supplies,Online,L,1/27/2011,292494523,2/12/2011,"
+    "4484,651.21,524.96,2920025.64,2353920.64,566105.00\n"
+    "Europe,Latvia,Beverages,Online,C,12/28/2015,361825549,1/23/2016,"
+    "1075,47.45,31.79,51008.75,34174.25,16834.50\n"
+    "Europe,Latvia,Cereal,Offline,M,12/3/2015,361825550,12/9/2015,"
+    "12,205.70,117.11,2468.40,1405.32,1063.08\n"
+)
+INVALID_ROW = "Europe,Latvia,Cereal,Offline,M,31/31/2015,361825551,12/9/2015,12,1.0,1.0,1,1,1\n"
+
+
+@pytest.fixture
+def source_csv(tmp_path):
+    """Fixture for a small source extract with the original header."""
+    path = tmp_path / "sales.csv"
+    path.write_text(SOURCE_CSV)
+    return path
+
+
+@pytest.fixture
+def backend(tmp_path):
+    """Fixture for the local stand-in backend."""
+    return LocalBackend(tmp_path / "snowflake")
+
+
+def _table_rows(backend):
+    with sqlite3.connect(backend.database) as db:
+        return db.execute("SELECT order_id, order_date FROM raw_sales_data ORDER BY 1").fetchall()
+
+
+class TestLocalLoad:
+    """Tests for staging and loading files with the local stand-in."""
+
+    def test_load_source_csv(self, backend, source_csv):
+        """Test that the extract loads with its header skipped and dates parsed."""
+        report = load_files(backend, [("", source_csv)], FILE_FORMATS["csv"])
+
+        assert report.succeeded
+        assert report.staged == 1
+        assert report.rows_copied == 3
+        assert report.files[0].file == "sales_stage/sales.csv.gz"
+        assert _table_rows(backend)[0] == (292494523, "2011-01-27")
+
+    @pytest.mark.parametrize("staging_format", ["csv", "parquet"])
+    def test_load_partitions(self, backend, source_csv, tmp_path, staging_format):
+        """Test that partitions load from their own folders and are not loaded twice."""
+        partitions = partition_extract(source_csv, tmp_path / "partitions", "year", staging_format)
+        files = sorted(partitions.items())
+        file_format = select_file_format(staging_format, "year")
+
+        report = load_files(backend, files, file_format, max_workers=2)
+        reloaded = load_files(backend, files, file_format)
+
+        assert [result.rows_loaded for result in report.files] == [1, 2]
+        assert report.files[1].file.startswith("sales_stage/year=2015/part-00000")
+        assert reloaded.files == []
+        assert [row[0] for row in _table_rows(backend)] == [292494523, 361825549, 361825550]
+
+    def test_rejected_rows_continue(self, backend, source_csv):
+        """Test that with CONTINUE the valid rows load and the first error is reported."""
+        with source_csv.open("a") as extract:
+            extract.write(INVALID_ROW)
+
+        report = load_files(backend, [("", source_csv)], FILE_FORMATS["csv"])
+
+        result = report.files[0]
+        assert result.status == "PARTIALLY_LOADED"
+        assert report.rows_copied == 3
+        assert report.rows_skipped == 1
+        assert result.first_error_line == 5
+        assert result.first_error_column == '"RAW_SALES_DATA"["ORDER_DATE"]'
+
+    def test_rejected_rows_skip_file(self, backend, source_csv):
+        """Test that with SKIP_FILE a file with errors fails the load and loads nothing."""
+        with source_csv.open("a") as extract:
+            extract.write(INVALID_ROW)
+
+        with pytest.raises(LoadError, match=r"sales\.csv\.gz"):
+            load_files(backend, [("", source_csv)], FILE_FORMATS["csv"], on_error="SKIP_FILE")
+
+        assert _table_rows(backend) == []
+
+    def test_unknown_on_error(self, backend, source_csv):
+        """Test that an unknown ON_ERROR option is rejected before anything is staged."""
+        with pytest.raises(ValueError, match="ON_ERROR"):
+            load_files(backend, [("", source_csv)], FILE_FORMATS["csv"], on_error="IGNORE")
+
+        assert not backend.root.exists()
+
+
+class TestSnowflakeBackend:
+    """Tests for the statements run against Snowflake."""
+
+    def test_copy_statement(self):
+        """Test that COPY INTO names the staged files, file format and error handling."""
+        connection = MagicMock()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.description = [("file",), ("status",), ("rows_parsed",), ("rows_loaded",)]
+        cursor.fetchall.return_value = [
+            ("sales_stage/year=2014/part-00000.parquet", "LOADED", 2, 2),
+        ]
+
+        rows = SnowflakeBackend(connection).copy_into(
+            "raw_sales_data",
+            "SALES_STAGE",
+            ["year=2014/part-00000.parquet"],
+            FILE_FORMATS["parquet"],
+            "CONTINUE",
+        )
+
+        cursor.execute.assert_called_once_with(
+            "COPY INTO raw_sales_data FROM @SALES_STAGE FILES = ('year=2014/part-00000.parquet') "
+            "FILE_FORMAT = (FORMAT_NAME = SALES_PARQUET) ON_ERROR = CONTINUE "
+            "MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE",
+        )
+        assert parse_copy_results(rows)[0].rows_loaded == 2
+
+    def test_csv_copy_names_raw_columns(self):
+        """Test that a CSV COPY loads the raw columns by position, leaving the load timestamp."""
+        connection = MagicMock()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.description = [("status",)]
+        cursor.fetchall.return_value = [(NO_FILES_STATUS,)]
+
+        SnowflakeBackend(connection).copy_into(
+            "raw_sales_data",
+            "SALES_STAGE",
+            ["sales.csv.gz"],
+            FILE_FORMATS["csv"],
+            "CONTINUE",
+        )
+
+        statement = cursor.execute.call_args[0][0]
+        assert statement.startswith(
+            "COPY INTO raw_sales_data (region, country, item_type, sales_channel, "
+            "order_priority, order_date, order_id, ship_date, units_sold, unit_price, unit_cost) "
+            "FROM (SELECT $1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11 FROM @SALES_STAGE) ",
+        )
+        assert "loaded_at" not in statement
+
+    def test_stamp_loaded_rows(self):
+        """Test that only the rows without a load timestamp are stamped."""
+        cursor = MagicMock()
+        cursor.rowcount = 3
+
+        assert stamp_loaded_rows(cursor) == 3
+        cursor.execute.assert_called_once_with(
+            "UPDATE raw_sales_data SET loaded_at = CURRENT_TIMESTAMP() WHERE loaded_at IS NULL",
+        )
+
+    def test_put_statement(self, tmp_path):
+        """Test that files are PUT to their stage folder with auto-compression."""
+        connection = MagicMock()
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.description = [("source",), ("target",), ("status",)]
+        cursor.fetchall.return_value = [("part-00000.csv", "part-00000.csv.gz", "UPLOADED")]
+        path = tmp_path / "part-00000.csv"
+
+        row = SnowflakeBackend(connection).put(path, "SALES_STAGE/year=2014")
+
+        statement = cursor.execute.call_args[0][0]
+        assert statement.startswith(f"PUT 'file://{path.as_posix()}' '@SALES_STAGE/year=2014'")
+        assert "AUTO_COMPRESS = TRUE" in statement
+        assert row["target"] == "part-00000.csv.gz"
+
+    def test_no_files_processed(self):
+        """Test that the single status row of a COPY without new files parses to no results."""
+        assert parse_copy_results([{"status": NO_FILES_STATUS}]) == []
@@ -0,0 +1,121 @@
+import csv
+
+import pytest
+
+from utils import cleaning
+from utils.cleaning import clean_extract
+from utils.sales_data import open_sales_csv, to_raw_batch
+
+HEADER = (
+    "Region,Country,Item Type,Sales Channel,Order Priority,Order Date,Order ID,Ship Date,"
+    "Units Sold,Unit Price,Unit Cost,Total Revenue,Total Cost,Total Profit\n"
+)
+ROWS = [
+    "Europe,Latvia,Beverages,Online,C,12/28/2015,1,1/23/2016,1075,47.45,31.79,1,1,1",
+    "Europe,Latvia,Cereal,Offline,M,12/3/2015,1,12/9/2015,12,205.70,117.11,1,1,1",
+    "Asia,Japan,Meat,Online,H,2/1/2014,2,2/5/2014, 7 ,421.89,364.69,1,1,1",
+    "Asia,Japan,Meat,Online,H,2/1/2014,2,2/9/2014,8,421.89,364.69,1,1,1",
+    "Asia,,Meat,Online,H,13/45/2014,3,2/5/2014,7,abc,364.69,1,1,1",
+    "Asia,Japan,Meat,Online,H,1/1/2013,2,2/5/2013,7,421.89,n/a,1,1,1",
+    "Asia,Japan",
+]
+
+
+@pytest.fixture
+def dirty_csv(tmp_path):
+    """Fixture for an extract with duplicates, invalid values and a malformed line."""
+    path = tmp_path / "sales.csv"
+    path.write_text(HEADER + "\n".join(ROWS) + "\n")
+    return path
+
+
+def _read_quarantine(path):
+    with path.open(newline="") as quarantine_file:
+        return list(csv.DictReader(quarantine_file))
+
+
+class TestCleanExtract:
+    """Tests for the local cleaning and deduplication stage."""
+
+    def test_keeps_earliest_order(self, dirty_csv, tmp_path):
+        """Test that each order ID keeps its earliest row, ties going to the first in file."""
+        destination = tmp_path / "clean.csv"
+
+        report = clean_extract(dirty_csv, destination, tmp_path / "quarantine.csv")
+
+        table = to_raw_batch(next(iter(open_sales_csv(destination))))
+        rows = {row["order_id"]: row for row in table.to_pylist()}
+        assert sorted(rows) == [1, 2]
+        assert rows[1]["item_type"] == "Cereal"
+        assert rows[2]["ship_date"].isoformat() == "2014-02-05"
+        assert rows[2]["units_sold"] == 7
+        assert report.rows_read == 7
+        assert report.rows_written == 2
+        assert report.duplicates == 2
+        assert report.rejected == 3
+
+    def test_quarantine_reasons(self, dirty_csv, tmp_path):
+        """Test that rejected rows keep their original text and list every problem."""
+        quarantine = tmp_path / "quarantine.csv"
+
+        clean_extract(dirty_csv, tmp_path / "clean.csv", quarantine)
+
+        reasons = {row["row_index"]: row["reason"] for row in _read_quarantine(quarantine)}
+        assert reasons["0"] == "duplicate order_id"
+        assert reasons["3"] == "duplicate order_id"
+        assert reasons["4"] == "missing country; invalid order_date; invalid unit_price"
+        assert reasons["5"] == "invalid unit_cost"
+        assert reasons[""].startswith("malformed line 8: expected 14 fields, got 2")
+        assert "1" not in reasons
+        assert "2" not in reasons
+
+    def test_invalid_row_does_not_win(self, tmp_path):
+        """Test that an earlier but invalid row does not displace a valid duplicate."""
+        source = tmp_path / "sales.csv"
+        source.write_text(HEADER + ROWS[5] + "\n" + ROWS[2] + "\n")
+        destination = tmp_path / "clean.csv"
+
+        report = clean_extract(source, destination, tmp_path / "quarantine.csv")
+
+        assert report.rows_written == 1
+        assert report.duplicates == 0
+
+    def test_streams_in_batches(self, dirty_csv, tmp_path, monkeypatch):
+        """Test that duplicates across batches and compaction give the same result."""
+        monkeypatch.setattr(cleaning, "CSV_BLOCK_SIZE", 200)
+        monkeypatch.setattr(cleaning, "COMPACT_THRESHOLD", 0)
+        destination = tmp_path / "clean.csv"
+
+        report = clean_extract(dirty_csv, destination, tmp_path / "quarantine.csv")
+
+        assert report.rows_written == 2
+        assert report.duplicates == 2
+
+    def test_nothing_valid(self, tmp_path):
+        """Test that an extract without valid rows still yields a CSV with a header."""
+        source = tmp_path / "sales.csv"
+        source.write_text(HEADER + ROWS[4] + "\n")
+        destination = tmp_path / "clean.csv"
+
+        report = clean_extract(source, destination, tmp_path / "quarantine.csv")
+
+        assert report.rows_written == 0
+        assert destination.read_text().startswith('"Region","Country"')
+
+    def test_empty_batch(self, dirty_csv, tmp_path, monkeypatch):
+        """Test that an empty batch from the reader is counted as nothing rejected."""
+        expected = clean_extract(dirty_csv, tmp_path / "clean.csv", tmp_path / "quarantine.csv")
+        open_csv = cleaning.pa_csv.open_csv
+
+        def with_empty_batches(*args, **kwargs):
+            for text_batch in open_csv(*args, **kwargs):
+                yield text_batch.slice(0, 0)
+                yield text_batch
+
+        monkeypatch.setattr(cleaning.pa_csv, "open_csv", with_empty_batches)
+
+        report = clean_extract(dirty_csv, tmp_path / "clean.csv", tmp_path / "quarantine.csv")
+
+        assert report.rows_written == expected.rows_written
+        assert report.rejected == expected.rejected
+        assert report.duplicates == expected.duplicates
@@ -0,0 +1,182 @@
+import json
+import os
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from utils.download import DownloadError, download_file
+
+PAYLOAD = os.urandom(100_000)
+SEGMENT_SIZE = 16_384
+
+
+class _RangeHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD with optional byte range support."""
+
+    server: "_RangeServer"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_headers(self, status, length, content_range=None):
+        self.send_response(status)
+        if length is not None:
+            self.send_header("Content-Length", str(length))
+        self.send_header("ETag", self.server.etag)
+        if self.server.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if content_range:
+            self.send_header("Content-Range", content_range)
+        self.end_headers()
+
+    def do_HEAD(self):  # noqa: N802
+        self._send_headers(HTTPStatus.OK, len(PAYLOAD))
+
+    def do_GET(self):  # noqa: N802
+        match = re.fullmatch(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+        if_range = self.headers.get("If-Range")
+        if not self.server.accept_ranges or not match or if_range not in (None, self.server.etag):
+            if self.server.cut_short:
+                # The body ends when the connection closes, halfway through
+                self._send_headers(HTTPStatus.OK, None)
+                self.wfile.write(PAYLOAD[: len(PAYLOAD) // 2])
+                return
+            self._send_headers(HTTPStatus.OK, len(PAYLOAD))
+            self.wfile.write(PAYLOAD)
+            return
+
+        start, end = int(match.group(1)), int(match.group(2))
+        with self.server.lock:
+            self.server.requested.append(start)
+        if start in self.server.failing:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self._send_headers(
+            HTTPStatus.PARTIAL_CONTENT,
+            end - start + 1,
+            f"bytes {start}-{end}/{len(PAYLOAD)}",
+        )
+        self.wfile.write(PAYLOAD[start : end + 1])
+
+
+class _RangeServer(ThreadingHTTPServer):
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _RangeHandler)
+        self.accept_ranges = True
+        self.cut_short = False
+        self.etag = '"v1"'
+        self.failing = set()
+        self.requested = []
+        self.lock = threading.Lock()
+
+
+@pytest.fixture
+def http_server():
+    """Fixture for a local HTTP server that supports Range requests."""
+    server = _RangeServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/sales.zip"
+
+
+class TestDownloadFile:
+    """Tests for the parallel ranged downloader."""
+
+    def test_parallel_download(self, http_server, tmp_path):
+        """Test that all segments are fetched and assembled in order."""
+        destination = tmp_path / "sales.zip"
+
+        report = download_file(
+            _url(http_server),
+            destination,
+            segment_size=SEGMENT_SIZE,
+            max_workers=4,
+        )
+
+        assert destination.read_bytes() == PAYLOAD
+        assert report.segments == 7
+        assert report.downloaded == len(PAYLOAD)
+        assert report.resumed == 0
+        assert report.throughput > 0
+        assert not (tmp_path / "sales.zip.part").exists()
+        assert not (tmp_path / "sales.zip.progress.json").exists()
+
+    def test_resume_after_failure(self, http_server, tmp_path):
+        """Test that a rerun only fetches the segments that failed before."""
+        destination = tmp_path / "sales.zip"
+        http_server.failing = {SEGMENT_SIZE * 2}
+
+        with pytest.raises(DownloadError, match="rerun to resume"):
+            download_file(_url(http_server), destination, segment_size=SEGMENT_SIZE)
+
+        progress = json.loads((tmp_path / "sales.zip.progress.json").read_text())
+        assert SEGMENT_SIZE * 2 not in progress["completed"]
+        assert len(progress["completed"]) == 6
+
+        http_server.failing = set()
+        http_server.requested = []
+        report = download_file(_url(http_server), destination, segment_size=SEGMENT_SIZE)
+
+        assert destination.read_bytes() == PAYLOAD
+        assert http_server.requested == [SEGMENT_SIZE * 2]
+        assert report.resumed == len(PAYLOAD) - SEGMENT_SIZE
+
+    def test_restart_when_etag_changes(self, http_server, tmp_path):
+        """Test that progress recorded for another version of the file is discarded."""
+        destination = tmp_path / "sales.zip"
+        http_server.failing = {0}
+        with pytest.raises(DownloadError):
+            download_file(_url(http_server), destination, segment_size=SEGMENT_SIZE)
+
+        http_server.failing = set()
+        http_server.etag = '"v2"'
+        report = download_file(_url(http_server), destination, segment_size=SEGMENT_SIZE)
+
+        assert destination.read_bytes() == PAYLOAD
+        assert report.resumed == 0
+
+    def test_server_without_ranges(self, http_server, tmp_path):
+        """Test the single-stream fallback for servers without range support."""
+        destination = tmp_path / "sales.zip"
+        http_server.accept_ranges = False
+
+        report = download_file(_url(http_server), destination, segment_size=SEGMENT_SIZE)
+
+        assert destination.read_bytes() == PAYLOAD
+        assert report.segments == 1
+
+    def test_stream_cut_short(self, http_server, tmp_path):
+        """Test that a single stream shorter than the probed size is not accepted."""
+        destination = tmp_path / "sales.zip"
+        http_server.accept_ranges = False
+        http_server.cut_short = True
+
+        with pytest.raises(DownloadError, match="incomplete"):
+            download_file(_url(http_server), destination, segment_size=SEGMENT_SIZE)
+
+        assert not destination.exists()
+
+    @pytest.mark.parametrize(
+        "error",
+        [requests.exceptions.RetryError("Max retries exceeded"), requests.ConnectionError()],
+    )
+    def test_failed_probe_falls_back(self, http_server, tmp_path, error):
+        """Test that a HEAD request failing without a response falls back to a plain GET."""
+        destination = tmp_path / "sales.zip"
+
+        with patch.object(requests.Session, "head", side_effect=error):
+            report = download_file(_url(http_server), destination, segment_size=SEGMENT_SIZE)
+
+        assert destination.read_bytes() == PAYLOAD
+        assert report.segments == 1
@@ -1,9 +1,11 @@
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
 import pytest
 import snowflake.connector
 
 from scripts.init_snowflake_db import SCHEMA_RAW, execute_sql_statements, main
+from utils.migrations import MigrationError, MigrationReport
+from utils.sql_script import apply_statements, split_statements
 
 
 @pytest.fixture
@@ -36,17 +38,21 @@ class TestExecuteSqlStatements:
     """Tests for the execute_sql_statements function."""
 
     def test_execute_sql_statements_success(self, mock_cursor):
-        """Test successful SQL statement execution."""
+        """Test that the statements of a script run as one multi-statement request."""
         # Setup
         sql_script = "CREATE TABLE test_table (id INT);\nCREATE TABLE another_table (name VARCHAR);"
 
         # Execute
-        execute_sql_statements(mock_cursor, sql_script)
+        report = execute_sql_statements(mock_cursor, sql_script)
 
         # Assert
-        assert mock_cursor.execute.call_count == 2
-        mock_cursor.execute.assert_any_call("CREATE TABLE test_table (id INT)")
-        mock_cursor.execute.assert_any_call("CREATE TABLE another_table (name VARCHAR)")
+        mock_cursor.execute.assert_any_call(
+            "CREATE TABLE test_table (id INT);\nCREATE TABLE another_table (name VARCHAR)",
+            num_statements=2,
+        )
+        assert [result.status for result in report.results] == ["SUCCESS", "SUCCESS"]
+        # The batch and the query history lookup for the statement timings
+        assert report.round_trips == 2
 
     def test_execute_sql_statements_with_empty_statements(self, mock_cursor):
         """Test SQL execution with empty statements that should be skipped."""
@@ -56,37 +62,164 @@ class TestExecuteSqlStatements:
         )
 
         # Execute
-        execute_sql_statements(mock_cursor, sql_script)
+        report = execute_sql_statements(mock_cursor, sql_script)
 
         # Assert
-        assert mock_cursor.execute.call_count == 2
+        assert len(report.results) == 2
+        assert mock_cursor.execute.call_args_list[0].kwargs == {"num_statements": 2}
 
     def test_execute_sql_statements_error_handling(self, mock_cursor):
-        """Test error handling during SQL execution."""
+        """Test that the query history attributes the error of a batch to its statement."""
         # Setup
         sql_script = "CREATE TABLE test_table (id INT);\nINVALID SQL STATEMENT;"
         mock_cursor.execute.side_effect = [
-            None,  # First call succeeds
-            snowflake.connector.errors.ProgrammingError("Invalid SQL"),  # Second call fails
+            snowflake.connector.errors.ProgrammingError("Invalid SQL"),  # The batch fails
+            None,  # Query history of the batch
+            None,  # Query history for the timings
+        ]
+        mock_cursor.fetchall.side_effect = [
+            [
+                ("CREATE TABLE test_table (id INT);\nINVALID SQL STATEMENT", "q0", 9, "FAILED"),
+                ("CREATE TABLE test_table (id INT)", "q1", 5, "SUCCESS"),
+                ("INVALID SQL STATEMENT", "q2", 1, "FAILED_WITH_ERROR"),
+            ],
+            [],
+        ]
+
+        # Execute
+        report = execute_sql_statements(mock_cursor, sql_script)
+
+        # Assert - neither statement runs again
+        assert mock_cursor.execute.call_count == 3
+        assert [result.status for result in report.results] == ["SUCCESS", "FAILED"]
+        (failed,) = report.failed
+        assert failed.statement.line == 2
+        assert "Invalid SQL" in failed.error
+
+    def test_failed_batch_resumes_after_failed_statement(self, mock_cursor):
+        """Test that statements before the failure are not re-run, and those after it are."""
+        # Setup
+        sql_script = "INSERT INTO audit VALUES (1);\nINVALID;\nCREATE TABLE c (id INT);"
+        mock_cursor.execute.side_effect = [
+            snowflake.connector.errors.ProgrammingError("Invalid SQL"),  # The batch fails
+            None,  # Query history of the batch
+            None,  # The statement after the failed one
+            None,  # Query history for the timings
+        ]
+        mock_cursor.fetchall.side_effect = [
+            [
+                ("INSERT INTO audit VALUES (1)", "earlier", 3, "SUCCESS"),
+                (
+                    "INSERT INTO audit VALUES (1);\nINVALID;\nCREATE TABLE c (id INT)",
+                    "q0",
+                    9,
+                    "FAILED_WITH_ERROR",
+                ),
+                ("INSERT INTO audit VALUES (1)", "q1", 5, "SUCCESS"),
+                ("INVALID", "q2", 1, "FAILED_WITH_ERROR"),
+            ],
+            [],
+        ]
+
+        # Execute
+        report = execute_sql_statements(mock_cursor, sql_script)
+
+        # Assert - the INSERT ran once, in the batch, and the CREATE TABLE was sent again
+        executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert "INSERT INTO audit VALUES (1)" not in executed
+        assert executed[2] == "CREATE TABLE c (id INT)"
+        assert [result.status for result in report.results] == ["SUCCESS", "FAILED", "SUCCESS"]
+        assert report.round_trips == 4
+
+    def test_failed_batch_without_history(self, mock_cursor):
+        """Test that a failed batch missing from the history is reported, not re-run."""
+        # Setup
+        mock_cursor.execute.side_effect = [
+            snowflake.connector.errors.ProgrammingError("Invalid SQL"),  # The batch fails
+            None,  # Query history of the batch
+            None,  # Query history for the timings
         ]
+        mock_cursor.fetchall.return_value = []
 
         # Execute
-        execute_sql_statements(mock_cursor, sql_script)
+        report = execute_sql_statements(mock_cursor, "INSERT INTO audit VALUES (1);\nINVALID;")
 
-        # Assert - should continue despite the error
-        assert mock_cursor.execute.call_count == 2
+        # Assert
+        assert mock_cursor.execute.call_count == 3
+        assert len(report.failed) == 2
+
+    def test_statement_timings_from_query_history(self, mock_cursor):
+        """Test that each statement gets its server-side time from the query history."""
+        # Setup
+        sql_script = "CREATE TABLE a (id INT);\nCREATE TABLE b (id INT);"
+        mock_cursor.fetchall.return_value = [
+            ("CREATE TABLE a (id INT);\nCREATE TABLE b (id INT)", "parent-id", 900, "SUCCESS"),
+            ("CREATE TABLE a (id INT)", "query-a", 250, "SUCCESS"),
+            ("CREATE TABLE b (id INT)", "query-b", 500, "SUCCESS"),
+        ]
+
+        # Execute
+        report = execute_sql_statements(mock_cursor, sql_script)
+
+        # Assert
+        assert [(result.query_id, result.elapsed) for result in report.results] == [
+            ("query-a", 0.25),
+            ("query-b", 0.5),
+        ]
+
+
+class TestSplitStatements:
+    """Tests for tokenizing a script into statements."""
+
+    def test_semicolons_in_literals_and_comments(self):
+        """Test that semicolons only end statements outside literals, bodies and comments."""
+        sql_script = (
+            "-- Setup; not a statement\n"
+            "CREATE TABLE t (note VARCHAR DEFAULT 'a;b', \"odd;name\" INT);\n"
+            "/* block; comment */\n"
+            "CREATE FUNCTION f() RETURNS INT AS $$ SELECT 1; $$;\n"
+            "INSERT INTO t VALUES ('it''s; fine', 1); // trailing; comment\n"
+        )
+
+        statements = split_statements(sql_script)
+
+        assert [statement.text for statement in statements] == [
+            "CREATE TABLE t (note VARCHAR DEFAULT 'a;b', \"odd;name\" INT)",
+            "CREATE FUNCTION f() RETURNS INT AS $$ SELECT 1; $$",
+            "INSERT INTO t VALUES ('it''s; fine', 1)",
+        ]
+        assert [statement.line for statement in statements] == [2, 4, 5]
+
+    def test_unterminated_literal(self):
+        """Test that a literal that is never closed is rejected rather than swallowing the rest."""
+        with pytest.raises(ValueError, match="Unterminated"):
+            split_statements("SELECT 'oops;\nSELECT 1;")
+
+    def test_unbatchable_statements_run_alone(self, mock_cursor):
+        """Test that PUT runs on its own, between batches of the other statements."""
+        statements = split_statements(
+            "CREATE STAGE s; CREATE TABLE t (id INT); PUT file:///tmp/x @s; SELECT 1;",
+        )
+
+        report = apply_statements(mock_cursor, statements)
+
+        calls = mock_cursor.execute.call_args_list
+        assert calls[0].kwargs == {"num_statements": 2}
+        assert calls[1].args == ("PUT file:///tmp/x @s",)
+        assert calls[2].args == ("SELECT 1",)
+        assert report.round_trips == 4
 
 
 class TestMainFunction:
     """Tests for the main function."""
 
     @patch("scripts.init_snowflake_db.config.get_snowflake_details")
-    @patch("scripts.init_snowflake_db.snowflake.connector.connect")
-    @patch("scripts.init_snowflake_db.Path")
+    @patch("scripts.init_snowflake_db.session")
+    @patch("scripts.init_snowflake_db.apply_migrations")
     def test_main_function_flow(
         self,
-        mock_path,
-        mock_connect,
+        mock_apply_migrations,
+        mock_session,
         mock_get_snowflake_details,
         mock_snowflake_credentials,
         mock_cursor,
@@ -95,84 +228,73 @@ class TestMainFunction:
         """Test the main function's overall flow."""
         # Setup
         mock_get_snowflake_details.return_value = mock_snowflake_credentials
-        mock_connect.return_value = mock_connection
-        mock_connection.cursor.return_value = mock_cursor
-
-        # Mock the SQL file opening and reading
-        mock_sql_content = "CREATE TABLE RAW_SALES_DATA (ID INT, DATA VARCHAR);"
-        mock_file = MagicMock()
-        mock_file.__enter__.return_value.read.return_value = mock_sql_content
-        mock_path_instance = MagicMock()
-        mock_path_instance.open.return_value = mock_file
-        mock_path.return_value = mock_path_instance
+        mock_session.return_value.__enter__.return_value = mock_connection
+        mock_connection.cursor.return_value.__enter__.return_value = mock_cursor
+        mock_apply_migrations.return_value = MigrationReport(applied=[1])
 
         # Execute
-        main()
+        result = main()
 
         # Assert
         mock_get_snowflake_details.assert_called_once()
-        mock_connect.assert_called_once_with(**mock_snowflake_credentials)
+        mock_session.assert_called_once_with("pipeline")
         mock_connection.cursor.assert_called_once()
 
-        # Check database and schema creation
-        mock_cursor.execute.assert_any_call(
-            f"CREATE DATABASE IF NOT EXISTS {mock_snowflake_credentials['database']}",
+        # Check that the migrations are applied to the raw schema
+        mock_apply_migrations.assert_called_once_with(
+            mock_cursor,
+            mock_snowflake_credentials["database"],
+            SCHEMA_RAW,
         )
-        mock_cursor.execute.assert_any_call(
-            f"USE DATABASE {mock_snowflake_credentials['database']}",
-        )
-        mock_cursor.execute.assert_any_call(f"CREATE SCHEMA IF NOT EXISTS {SCHEMA_RAW}")
-        mock_cursor.execute.assert_any_call(f"USE SCHEMA {SCHEMA_RAW}")
-
-        # Verify SQL file was processed
-        mock_path.assert_called_once_with("db_schema/raw_schema.sql")
-        mock_path_instance.open.assert_called_once()
+        assert result == mock_apply_migrations.return_value
 
-        # Verify cleanup
-        mock_cursor.close.assert_called_once()
-        mock_connection.close.assert_called_once()
+        # Verify cleanup: the cursor is closed and the connection returned to the pool
+        mock_connection.cursor.return_value.__exit__.assert_called_once()
+        mock_session.return_value.__exit__.assert_called_once()
+        mock_connection.close.assert_not_called()
 
     @patch("scripts.init_snowflake_db.config.get_snowflake_details")
-    @patch("scripts.init_snowflake_db.snowflake.connector.connect")
-    @patch(
-        "builtins.open",
-        new_callable=mock_open,
-        read_data="CREATE TABLE RAW_SALES_DATA (ID INT);",
+    @patch("scripts.init_snowflake_db.session")
+    @patch("scripts.init_snowflake_db.apply_migrations")
+    @pytest.mark.parametrize(
+        "report",
+        [
+            MigrationReport(failed=[1], skipped=[2]),
+            MigrationReport(applied=[1], unrecorded=[1]),
+        ],
     )
-    def test_main_with_actual_file_mocking(
+    def test_failed_migrations_raise(
         self,
-        mock_file_open,
-        mock_connect,
+        mock_apply_migrations,
+        mock_session,
         mock_get_snowflake_details,
+        report,
         mock_snowflake_credentials,
-        mock_cursor,
-        mock_connection,
     ):
-        """Test main function with a different approach to mocking the file."""
-        # Setup
+        """Test that a failed or unrecorded migration fails the initialization."""
         mock_get_snowflake_details.return_value = mock_snowflake_credentials
-        mock_connect.return_value = mock_connection
-        mock_connection.cursor.return_value = mock_cursor
+        mock_apply_migrations.return_value = report
 
-        # Execute
-        with patch("pathlib.Path.open", mock_file_open):
+        with pytest.raises(MigrationError, match="Schema migrations failed"):
             main()
 
-        # Assert
-        mock_cursor.execute.assert_any_call("CREATE TABLE RAW_SALES_DATA (ID INT)")
+        # The connection is back in the pool before the error is raised
+        mock_session.return_value.__exit__.assert_called_once()
 
     @patch("scripts.init_snowflake_db.config.get_snowflake_details")
-    @patch("scripts.init_snowflake_db.snowflake.connector.connect")
+    @patch("scripts.init_snowflake_db.session")
     def test_connection_error_handling(
         self,
-        mock_connect,
+        mock_session,
         mock_get_snowflake_details,
         mock_snowflake_credentials,
     ):
         """Test error handling when connection fails."""
         # Setup
         mock_get_snowflake_details.return_value = mock_snowflake_credentials
-        mock_connect.side_effect = snowflake.connector.errors.DatabaseError("Connection failed")
+        mock_session.return_value.__enter__.side_effect = snowflake.connector.errors.DatabaseError(
+            "Connection failed",
+        )
 
         # Execute & Assert
         with pytest.raises(snowflake.connector.errors.DatabaseError):
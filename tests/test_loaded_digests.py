@@ -0,0 +1,39 @@
+import json
+from unittest.mock import MagicMock
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from utils.loaded_digests import pending_blobs, read_loaded_digests, record_loaded_digests
+
+
+class TestLoadedDigests:
+    """Tests for the record of the blobs loaded successfully."""
+
+    def test_pending_blobs(self):
+        """Test that new and changed blobs are pending, and every blob with force."""
+        digests = {"a.csv": "1", "b.csv": "2", "c.csv": "3"}
+        loaded = {"a.csv": "1", "b.csv": "old"}
+
+        assert pending_blobs(digests, loaded) == ["b.csv", "c.csv"]
+        assert pending_blobs(digests, loaded, force=True) == ["a.csv", "b.csv", "c.csv"]
+
+    def test_read_missing_record(self):
+        """Test that nothing counts as loaded before the first successful load."""
+        container_client = MagicMock()
+        container_client.download_blob.side_effect = ResourceNotFoundError("Not found")
+
+        assert read_loaded_digests(container_client, "test-blob.csv") == {}
+
+    def test_record_merges(self):
+        """Test that recorded digests are merged into those of earlier loads."""
+        container_client = MagicMock()
+        container_client.download_blob.return_value.readall.return_value = json.dumps(
+            {"a.csv": "1", "b.csv": "old"},
+        )
+
+        record_loaded_digests(container_client, "test-blob.csv", {"b.csv": "2", "c.csv": None})
+
+        container_client.download_blob.assert_called_once_with("test-blob/_loaded_digests.json")
+        name, content = container_client.upload_blob.call_args[0]
+        assert name == "test-blob/_loaded_digests.json"
+        assert json.loads(content) == {"a.csv": "1", "b.csv": "2"}
@@ -0,0 +1,110 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import main
+from utils.adf_monitor import PipelineRunError
+
+
+@pytest.fixture
+def pipeline_steps():
+    """Fixture patching every step of the pipeline, with one blob pending load."""
+    with (
+        patch(
+            "main.config.get_load_settings",
+            return_value={"loader": "adf", "backend": "snowflake"},
+        ) as load_settings,
+        patch(
+            "main.config.get_upload_settings",
+            return_value={"mode": "single"},
+        ) as upload_settings,
+        patch("main.azure_blob_upload") as upload,
+        patch("main.init_snowflake_db"),
+        patch("main.adf_pipeline_creator") as adf,
+        patch("main.snowflake_loader") as direct,
+        patch("main.snowflake_session"),
+        patch("main.stamp_loaded_rows", return_value=1) as stamp,
+        patch("main.run_dbt", return_value=True) as run_dbt,
+    ):
+        upload.main.return_value = ["test-blob.csv"]
+        adf.main.return_value.copied_blobs = ["test-blob.csv"]
+        yield SimpleNamespace(
+            load_settings=load_settings,
+            upload_settings=upload_settings,
+            upload=upload,
+            adf=adf,
+            direct=direct,
+            stamp=stamp,
+            run_dbt=run_dbt,
+        )
+
+
+class TestMain:
+    """Tests for the pipeline entry point."""
+
+    def test_records_load(self, pipeline_steps):
+        """Test that the blobs are recorded as loaded once the load and dbt succeeded."""
+        main.main()
+
+        pipeline_steps.stamp.assert_called_once()
+        pipeline_steps.upload.mark_loaded.assert_called_once_with(["test-blob.csv"])
+
+    def test_records_only_copied_blobs(self, pipeline_steps):
+        """Test that blobs staged after the copy's window stay pending."""
+        pipeline_steps.upload.main.return_value = [
+            "test-blob/year=2014.csv",
+            "test-blob/year=2015.csv",
+        ]
+        pipeline_steps.adf.main.return_value.copied_blobs = ["test-blob/year=2014.csv"]
+
+        main.main()
+
+        pipeline_steps.upload.mark_loaded.assert_called_once_with(["test-blob/year=2014.csv"])
+
+    def test_failed_load_not_recorded(self, pipeline_steps):
+        """Test that a failed load leaves the blobs pending, so the next run reloads them."""
+        pipeline_steps.adf.main.side_effect = PipelineRunError("copy failed")
+
+        with pytest.raises(PipelineRunError):
+            main.main()
+
+        pipeline_steps.run_dbt.assert_not_called()
+        pipeline_steps.upload.mark_loaded.assert_not_called()
+
+    def test_failed_dbt_not_recorded(self, pipeline_steps):
+        """Test that failed transformations leave the blobs pending as well."""
+        pipeline_steps.run_dbt.return_value = False
+
+        with pytest.raises(main.PipelineError):
+            main.main()
+
+        pipeline_steps.upload.mark_loaded.assert_not_called()
+
+    def test_skips_loaded(self, pipeline_steps):
+        """Test that the load is skipped only when every blob was already loaded."""
+        pipeline_steps.upload.main.return_value = []
+
+        main.main()
+
+        pipeline_steps.adf.main.assert_not_called()
+        pipeline_steps.run_dbt.assert_not_called()
+
+    def test_direct_load_of_pipelined_upload_rejected(self, pipeline_steps):
+        """Test that the direct loader is rejected before anything is uploaded."""
+        pipeline_steps.load_settings.return_value = {"loader": "direct", "backend": "local"}
+        pipeline_steps.upload_settings.return_value = {"mode": "pipelined"}
+
+        with pytest.raises(ValueError, match="pipelined"):
+            main.main()
+
+        pipeline_steps.upload.main.assert_not_called()
+
+    def test_local_backend_not_stamped(self, pipeline_steps):
+        """Test that a direct load into the local backend does not stamp rows in Snowflake."""
+        pipeline_steps.load_settings.return_value = {"loader": "direct", "backend": "local"}
+
+        main.main()
+
+        pipeline_steps.direct.main.assert_called_once_with(["test-blob.csv"])
+        pipeline_steps.stamp.assert_not_called()
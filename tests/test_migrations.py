@@ -0,0 +1,208 @@
+from unittest.mock import MagicMock
+
+import pytest
+import snowflake.connector
+
+from utils.migrations import (
+    apply_migrations,
+    discover_migrations,
+    fingerprint_query,
+    owned_tables,
+    setup_statements,
+)
+
+CREATE_TABLE = "CREATE TABLE IF NOT EXISTS raw_sales_data (order_id INTEGER);\n"
+ADD_COLUMN = "ALTER TABLE raw_sales_data ADD COLUMN IF NOT EXISTS loaded_at TIMESTAMP_LTZ;\n"
+
+
+@pytest.fixture
+def migrations_dir(tmp_path):
+    """Fixture for a directory with two migration scripts."""
+    (tmp_path / "V001__create_raw_sales_data.sql").write_text(CREATE_TABLE)
+    (tmp_path / "V002__add_loaded_at.sql").write_text(ADD_COLUMN)
+    return tmp_path
+
+
+def _failed_batch_history(migrations_dir, failed):
+    """Return the query history of the first-run batch, failed at statement ``failed``."""
+    statements = setup_statements("TEST_DB", "RAW") + [
+        statement
+        for migration in discover_migrations(migrations_dir)
+        for statement in migration.statements
+    ]
+    request = ";\n".join(statement.text for statement in statements)
+    return [(request, "request", 0, "FAILED_WITH_ERROR")] + [
+        (statement.text, f"query-{index}", 0, "SUCCESS" if index < failed else "FAILED")
+        for index, statement in enumerate(statements[: failed + 1])
+    ]
+
+
+def _ledger_cursor(rows):
+    """Return a cursor whose ledger query returns the given rows, and no query history."""
+    cursor = MagicMock()
+    cursor.fetchall.side_effect = [rows, [], []]
+    return cursor
+
+
+class TestDiscoverMigrations:
+    """Tests for reading the migration scripts."""
+
+    def test_ordered_by_version(self, migrations_dir):
+        """Test that scripts are ordered by version and checksummed by content."""
+        (migrations_dir / "V010__later.sql").write_text("SELECT 1;")
+
+        migrations = discover_migrations(migrations_dir)
+
+        assert [migration.version for migration in migrations] == [1, 2, 10]
+        assert migrations[0].description == "create raw sales data"
+        # Line endings and trailing whitespace do not change the checksum
+        (migrations_dir / "V001__create_raw_sales_data.sql").write_text(
+            CREATE_TABLE.replace("\n", "  \r\n"),
+        )
+        assert discover_migrations(migrations_dir)[0].checksum == migrations[0].checksum
+
+    def test_owned_tables(self, migrations_dir):
+        """Test that the fingerprint only covers the tables the scripts create or alter."""
+        (migrations_dir / "V003__replace_stage.sql").write_text(
+            "-- ALTER TABLE in a comment\nCREATE OR REPLACE TABLE raw.load_audit (id INT);",
+        )
+
+        tables = owned_tables(discover_migrations(migrations_dir))
+
+        assert tables == ["LOAD_AUDIT", "RAW_SALES_DATA"]
+        query = fingerprint_query("TEST_DB", "raw", tables)
+        assert "table_schema = 'RAW' AND table_name IN ('LOAD_AUDIT', 'RAW_SALES_DATA')" in query
+
+    def test_duplicate_version(self, migrations_dir):
+        """Test that two scripts with the same version are rejected."""
+        (migrations_dir / "V1__duplicate.sql").write_text("SELECT 1;")
+
+        with pytest.raises(ValueError, match="Duplicate migration version 1"):
+            discover_migrations(migrations_dir)
+
+
+class TestApplyMigrations:
+    """Tests for applying the pending migrations."""
+
+    def test_first_run_bootstraps_and_applies_all(self, migrations_dir):
+        """Test that without a ledger the schema and ledger are created and all scripts run."""
+        cursor = MagicMock()
+        cursor.execute.side_effect = [
+            snowflake.connector.errors.ProgrammingError("Object does not exist"),
+            None,  # Setup and migrations
+            None,  # Query history
+            None,  # Ledger records
+            None,  # Query history
+        ]
+
+        report = apply_migrations(cursor, "TEST_DB", "RAW", migrations_dir)
+
+        batch = cursor.execute.call_args_list[1]
+        assert batch.args[0].startswith("CREATE DATABASE IF NOT EXISTS TEST_DB;")
+        assert "CREATE TABLE IF NOT EXISTS SCHEMA_MIGRATIONS" in batch.args[0]
+        assert batch.args[0].endswith(ADD_COLUMN.strip().rstrip(";"))
+        assert batch.kwargs == {"num_statements": 7}
+        records = cursor.execute.call_args_list[3].args[0]
+        assert "DELETE FROM TEST_DB.RAW.SCHEMA_MIGRATIONS WHERE version IN (1, 2)" in records
+        assert "(2, 'add loaded at', " in records
+        assert report.applied == [1, 2]
+        assert report.round_trips == 5
+
+    def test_unchanged_is_a_single_query(self, migrations_dir):
+        """Test that a repeat run without changes only reads the ledger."""
+        migrations = discover_migrations(migrations_dir)
+        cursor = _ledger_cursor(
+            [(migration.version, migration.checksum, "42", "42") for migration in migrations],
+        )
+
+        report = apply_migrations(cursor, "TEST_DB", "RAW", migrations_dir)
+
+        cursor.execute.assert_called_once()
+        assert "HASH_AGG" in cursor.execute.call_args[0][0]
+        assert report.applied == []
+        assert report.unchanged == 2
+        assert not report.drifted
+        assert report.round_trips == 1
+
+    def test_changed_script_is_reapplied(self, migrations_dir):
+        """Test that only the script whose checksum changed is applied again."""
+        migrations = discover_migrations(migrations_dir)
+        cursor = _ledger_cursor([(1, migrations[0].checksum, "42", "42"), (2, "stale", "42", "42")])
+
+        report = apply_migrations(cursor, "TEST_DB", "RAW", migrations_dir)
+
+        batch = cursor.execute.call_args_list[1].args[0]
+        assert "CREATE TABLE IF NOT EXISTS raw_sales_data" not in batch
+        assert "ALTER TABLE raw_sales_data" in batch
+        assert report.applied == [2]
+        assert report.unchanged == 1
+
+    def test_failed_migration_is_not_recorded(self, migrations_dir):
+        """Test that a migration whose statement failed is left for the next run."""
+        cursor = MagicMock()
+        cursor.execute.side_effect = [
+            snowflake.connector.errors.ProgrammingError("Object does not exist"),
+            snowflake.connector.errors.ProgrammingError("Invalid column"),  # The batch
+            None,  # Query history of the batch
+            None,  # Query history for the timings
+            None,  # Ledger records
+            None,  # Query history
+        ]
+        cursor.fetchall.side_effect = [_failed_batch_history(migrations_dir, 6), [], []]
+
+        report = apply_migrations(cursor, "TEST_DB", "RAW", migrations_dir)
+
+        assert report.applied == [1]
+        assert report.failed == [2]
+        assert not report.succeeded
+        records = cursor.execute.call_args_list[4].args[0]
+        assert "WHERE version IN (1)" in records
+
+    def test_failure_stops_later_migrations(self, migrations_dir):
+        """Test that the migrations after a failed one are neither applied nor recorded."""
+        cursor = MagicMock()
+        cursor.execute.side_effect = [
+            snowflake.connector.errors.ProgrammingError("Object does not exist"),
+            snowflake.connector.errors.ProgrammingError("Invalid column"),  # The batch
+            None,  # Query history of the batch
+            None,  # Query history for the timings
+        ]
+        cursor.fetchall.side_effect = [_failed_batch_history(migrations_dir, 5), []]
+
+        report = apply_migrations(cursor, "TEST_DB", "RAW", migrations_dir)
+
+        # V002 is neither sent again nor recorded
+        assert cursor.execute.call_count == 4
+        assert (report.applied, report.failed, report.skipped) == ([], [1], [2])
+
+    def test_unrecorded_migrations(self, migrations_dir):
+        """Test that migrations whose ledger records failed are reported as unrecorded."""
+        cursor = MagicMock()
+        cursor.execute.side_effect = [
+            snowflake.connector.errors.ProgrammingError("Object does not exist"),
+            None,  # Setup and migrations
+            None,  # Query history
+            snowflake.connector.errors.ProgrammingError("Insufficient privileges"),  # Records
+            None,  # Query history of the records, which does not show them
+            None,  # Query history for the timings
+        ]
+
+        report = apply_migrations(cursor, "TEST_DB", "RAW", migrations_dir)
+
+        assert report.applied == [1, 2]
+        assert report.unrecorded == [1, 2]
+        assert not report.succeeded
+
+    def test_drift_is_reported(self, migrations_dir):
+        """Test that a schema changed outside the migrations is reported as drift."""
+        migrations = discover_migrations(migrations_dir)
+        cursor = _ledger_cursor(
+            [(migration.version, migration.checksum, "42", "43") for migration in migrations]
+            + [(3, "removed", "42", "43")],
+        )
+
+        report = apply_migrations(cursor, "TEST_DB", "RAW", migrations_dir)
+
+        cursor.execute.assert_called_once()
+        assert report.drifted
+        assert report.missing == [3]
@@ -0,0 +1,89 @@
+import json
+from unittest.mock import MagicMock
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from utils.adf_monitor import CopyActivityMetrics
+from utils.partition_status import (
+    failed_partitions,
+    read_partition_status,
+    record_partition_status,
+    write_partition_list,
+)
+
+PARTITIONS = [
+    "test-blob/year=2014/month=01/part-00000.csv",
+    "test-blob/year=2014/month=02/part-00000.csv",
+    "test-blob/year=2014/month=03/part-00000.csv",
+]
+
+
+class TestPartitionStatus:
+    """Tests for the partition list and status of fan-out copies."""
+
+    def test_write_partition_list(self):
+        """Test that each partition is listed as the folder and file a copy reads."""
+        container_client = MagicMock()
+
+        write_partition_list(container_client, "test-blob.csv", PARTITIONS[:1])
+
+        name, content = container_client.upload_blob.call_args[0]
+        assert name == "test-blob/_partition_list.json"
+        assert json.loads(content) == [
+            {"folder": "test-blob/year=2014/month=01", "file": "part-00000.csv"},
+        ]
+
+    def test_record_status(self):
+        """Test that failed and never started copies are recorded as failed partitions."""
+        container_client = MagicMock()
+        container_client.download_blob.side_effect = ResourceNotFoundError("Not found")
+        copies = [
+            CopyActivityMetrics("CopyPartition", "Succeeded", PARTITIONS[0], rows_copied=10),
+            CopyActivityMetrics("CopyPartition", "Failed", PARTITIONS[1]),
+        ]
+
+        failed = record_partition_status(
+            container_client,
+            "test-blob.csv",
+            PARTITIONS,
+            copies,
+            "run-1",
+        )
+
+        assert failed == PARTITIONS[1:]
+        name, content = container_client.upload_blob.call_args[0]
+        assert name == "test-blob/_partition_status.json"
+        status = json.loads(content)
+        assert status[PARTITIONS[0]] == {
+            "status": "Succeeded",
+            "run_id": "run-1",
+            "rows_copied": 10,
+        }
+        assert status[PARTITIONS[2]]["status"] == "NotRun"
+
+    def test_retry_clears_failures(self):
+        """Test that a successful retry replaces the failure of an earlier run."""
+        container_client = MagicMock()
+        container_client.download_blob.return_value.readall.return_value = json.dumps(
+            {
+                PARTITIONS[0]: {"status": "Succeeded", "run_id": "run-1", "rows_copied": 10},
+                PARTITIONS[1]: {"status": "Failed", "run_id": "run-1", "rows_copied": 0},
+            },
+        ).encode()
+        assert failed_partitions(read_partition_status(container_client, "test-blob.csv")) == [
+            PARTITIONS[1],
+        ]
+
+        failed = record_partition_status(
+            container_client,
+            "test-blob.csv",
+            PARTITIONS[1:2],
+            [CopyActivityMetrics("CopyPartition", "Succeeded", PARTITIONS[1])],
+            "run-2",
+        )
+
+        assert failed == []
+        status = json.loads(container_client.upload_blob.call_args[0][1])
+        assert failed_partitions(status) == []
+        assert status[PARTITIONS[0]]["run_id"] == "run-1"
+        assert status[PARTITIONS[1]]["run_id"] == "run-2"
@@ -0,0 +1,230 @@
+import asyncio
+from itertools import islice
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from azure.core.exceptions import ResourceNotFoundError
+
+from utils.provisioning import (
+    ProvisioningError,
+    backoff_delays,
+    ensure_container,
+    ensure_data_factory,
+    ensure_resource_group,
+    ensure_storage_account,
+    provision_resources,
+    wait_for_provisioning,
+)
+
+
+@pytest.fixture
+def mock_azure_details():
+    """Fixture for Azure configuration details."""
+    return {
+        "subscription_id": "test-subscription",
+        "resource_group": "test-rg",
+        "storage_account": "teststorage",
+        "container_name": "test-container",
+        "data_factory_name": "test-df",
+    }
+
+
+def _resource(provisioning_state=None):
+    resource = MagicMock()
+    resource.provisioning_state = provisioning_state
+    return resource
+
+
+@pytest.fixture
+def no_sleep():
+    """Fixture that records backoff delays instead of sleeping."""
+    with patch("utils.provisioning.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        yield mock_sleep
+
+
+class TestPolling:
+    """Tests for provisioning state polling."""
+
+    def test_backoff_delays(self):
+        """Test that delays double up to the cap."""
+        assert list(islice(backoff_delays(1, 5), 5)) == [1, 2, 4, 5, 5]
+
+    def test_waits_until_succeeded(self, no_sleep):
+        """Test that polling stops at the first succeeded state."""
+        fetch_state = AsyncMock(side_effect=["Creating", "Creating", "Succeeded"])
+
+        asyncio.run(wait_for_provisioning("test", fetch_state))
+
+        assert fetch_state.await_count == 3
+        assert [call.args[0] for call in no_sleep.await_args_list] == [1.0, 2.0]
+
+    @pytest.mark.usefixtures("no_sleep")
+    def test_failed_state(self):
+        """Test that a failed provisioning state raises instead of polling on."""
+        fetch_state = AsyncMock(side_effect=["Creating", "Failed"])
+
+        with pytest.raises(ProvisioningError, match="failed"):
+            asyncio.run(wait_for_provisioning("test", fetch_state))
+
+    def test_timeout(self):
+        """Test that a resource stuck provisioning raises after the maximum wait."""
+        fetch_state = AsyncMock(return_value="Creating")
+
+        with pytest.raises(ProvisioningError, match="not provisioned"):
+            asyncio.run(wait_for_provisioning("test", fetch_state, max_wait=0.01))
+
+
+class TestEnsureResources:
+    """Tests for the point lookups and creates of each resource."""
+
+    def test_resource_group_exists(self):
+        """Test that an existing resource group is found with a single HEAD request."""
+        client = MagicMock()
+        client.resource_groups.check_existence = AsyncMock(return_value=True)
+        client.resource_groups.create_or_update = AsyncMock()
+
+        asyncio.run(ensure_resource_group(client, "test-rg"))
+
+        client.resource_groups.check_existence.assert_awaited_once_with("test-rg")
+        client.resource_groups.create_or_update.assert_not_awaited()
+
+    def test_resource_group_missing(self):
+        """Test that a missing resource group is created."""
+        client = MagicMock()
+        client.resource_groups.check_existence = AsyncMock(return_value=False)
+        client.resource_groups.create_or_update = AsyncMock()
+
+        asyncio.run(ensure_resource_group(client, "test-rg", "westus"))
+
+        client.resource_groups.create_or_update.assert_awaited_once_with(
+            "test-rg",
+            {"location": "westus"},
+        )
+
+    def test_storage_account_missing(self):
+        """Test that a missing storage account is created and its poller awaited."""
+        client = MagicMock()
+        client.storage_accounts.get_properties = AsyncMock(
+            side_effect=ResourceNotFoundError("Not found"),
+        )
+        poller = MagicMock()
+        poller.result = AsyncMock()
+        client.storage_accounts.begin_create = AsyncMock(return_value=poller)
+
+        asyncio.run(ensure_storage_account(client, "test-rg", "teststorage"))
+
+        client.storage_accounts.begin_create.assert_awaited_once()
+        poller.result.assert_awaited_once()
+
+    def test_storage_account_still_creating(self, no_sleep):
+        """Test that an existing account that is still being created is polled until ready."""
+        client = MagicMock()
+        client.storage_accounts.get_properties = AsyncMock(
+            side_effect=[_resource("Creating"), _resource("ResolvingDNS"), _resource("Succeeded")],
+        )
+        client.storage_accounts.begin_create = AsyncMock()
+
+        asyncio.run(ensure_storage_account(client, "test-rg", "teststorage"))
+
+        assert client.storage_accounts.get_properties.await_count == 3
+        client.storage_accounts.begin_create.assert_not_awaited()
+        assert no_sleep.await_count == 1
+
+    def test_container_missing(self):
+        """Test that a missing container is created through the management plane."""
+        client = MagicMock()
+        client.blob_containers.get = AsyncMock(side_effect=ResourceNotFoundError("Not found"))
+        client.blob_containers.create = AsyncMock()
+
+        asyncio.run(ensure_container(client, "test-rg", "teststorage", "test-container"))
+
+        client.blob_containers.create.assert_awaited_once_with(
+            "test-rg",
+            "teststorage",
+            "test-container",
+            {},
+        )
+
+    def test_data_factory_created(self, no_sleep):
+        """Test that a new data factory is polled instead of waiting a fixed time."""
+        client = MagicMock()
+        client.factories.get = AsyncMock(
+            side_effect=[ResourceNotFoundError("Not found"), _resource("Succeeded")],
+        )
+        client.factories.create_or_update = AsyncMock(return_value=_resource("Provisioning"))
+
+        asyncio.run(ensure_data_factory(client, "test-rg", "test-df"))
+
+        client.factories.create_or_update.assert_awaited_once()
+        assert client.factories.get.await_count == 2
+        no_sleep.assert_not_awaited()
+
+
+class TestProvisionResources:
+    """Tests for the concurrent provisioning of all resources."""
+
+    @patch("utils.provisioning.get_async_azure_credential")
+    @patch("utils.provisioning.DataFactoryManagementClient")
+    @patch("utils.provisioning.StorageManagementClient")
+    @patch("utils.provisioning.ResourceManagementClient")
+    def test_storage_and_factory_run_concurrently(
+        self,
+        mock_resource_client_class,
+        mock_storage_client_class,
+        mock_adf_client_class,
+        mock_get_credential,
+        mock_azure_details,
+    ):
+        """Test that the data factory is created while the storage account provisions."""
+        resource_client = mock_resource_client_class.return_value.__aenter__.return_value
+        storage_client = mock_storage_client_class.return_value.__aenter__.return_value
+        adf_client = mock_adf_client_class.return_value.__aenter__.return_value
+        mock_get_credential.return_value.__aenter__ = AsyncMock()
+        mock_get_credential.return_value.__aexit__ = AsyncMock(return_value=False)
+        for client_class in (
+            mock_resource_client_class,
+            mock_storage_client_class,
+            mock_adf_client_class,
+        ):
+            client_class.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        resource_client.resource_groups.check_existence = AsyncMock(return_value=True)
+        events = []
+        factory_created = asyncio.Event()
+
+        async def create_storage_account(*_):
+            events.append("storage account started")
+            # Only completes if the factory can be created in the meantime
+            await asyncio.wait_for(factory_created.wait(), timeout=1)
+            events.append("storage account created")
+            poller = MagicMock()
+            poller.result = AsyncMock()
+            return poller
+
+        async def create_factory(*_):
+            events.append("factory created")
+            factory_created.set()
+            return _resource("Succeeded")
+
+        storage_client.storage_accounts.get_properties = AsyncMock(
+            side_effect=ResourceNotFoundError("Not found"),
+        )
+        storage_client.storage_accounts.begin_create = AsyncMock(
+            side_effect=create_storage_account,
+        )
+        storage_client.blob_containers.get = AsyncMock()
+        keys = MagicMock()
+        keys.keys = [MagicMock(value="test-key")]
+        storage_client.storage_accounts.list_keys = AsyncMock(return_value=keys)
+        adf_client.factories.get = AsyncMock(side_effect=ResourceNotFoundError("Not found"))
+        adf_client.factories.create_or_update = AsyncMock(side_effect=create_factory)
+
+        storage_key = asyncio.run(provision_resources(mock_azure_details))
+
+        assert storage_key == "test-key"
+        assert events == ["storage account started", "factory created", "storage account created"]
+        storage_client.blob_containers.get.assert_awaited_once_with(
+            "test-rg",
+            "teststorage",
+            "test-container",
+        )
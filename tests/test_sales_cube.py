@@ -0,0 +1,52 @@
+from datetime import date
+
+import pytest
+
+from dashboard.sales_cube import sales_slice_query
+
+
+class TestSalesSliceQuery:
+    """Tests for the rollups of the sales cube."""
+
+    def test_grouped_and_filtered(self):
+        """Test that a slice groups by the dimensions and binds every filter value."""
+        query, params = sales_slice_query(
+            ["region", "sales_channel"],
+            {"order_priority": ["H", "C"], "item_type": "Cereal"},
+            start_date=date(2014, 1, 1),
+        )
+
+        assert query.startswith("select region, sales_channel, sum(order_count) as order_count")
+        assert (
+            " from analytics.sales_cube where order_priority in (%(order_priority_0)s, "
+            "%(order_priority_1)s) and item_type in (%(item_type_0)s) "
+            "and order_date >= %(start_date)s "
+            "group by region, sales_channel order by region, sales_channel"
+        ) in query
+        assert params == {
+            "order_priority_0": "H",
+            "order_priority_1": "C",
+            "item_type_0": "Cereal",
+            "start_date": date(2014, 1, 1),
+        }
+
+    def test_averages_from_sums(self):
+        """Test that averages are rolled up from sums rather than averaged again."""
+        query, params = sales_slice_query([])
+
+        assert "sum(total_days_to_ship) / nullif(sum(order_count), 0) as avg_days_to_ship" in query
+        assert "group by" not in query
+        assert params == {}
+
+    def test_empty_filter_list(self):
+        """Test that a filter accepting no values yields an empty slice, not an empty IN list."""
+        query, params = sales_slice_query(["region"], {"country": [], "item_type": "Cereal"})
+
+        assert " where false and item_type in (%(item_type_0)s) group by region" in query
+        assert "in ()" not in query
+        assert params == {"item_type_0": "Cereal"}
+
+    def test_unknown_dimension(self):
+        """Test that names that are not dimensions of the cube are rejected."""
+        with pytest.raises(ValueError, match="unit_price; drop"):
+            sales_slice_query(["unit_price; drop"], {"region": "Europe"})
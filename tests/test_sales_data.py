@@ -0,0 +1,101 @@
+import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from utils.sales_data import (
+    SALES_SCHEMA,
+    convert_csv_to_parquet,
+    partition_extract,
+    partition_glob,
+    staged_blob_name,
+)
+
+SOURCE_CSV = (
+    "Region,Country,Item Type,Sales Channel,Order Priority,Order Date,Order ID,Ship Date,"
+    "Units Sold,Unit Price,Unit Cost,Total Revenue,Total Cost,Total Profit\n"
+    "Sub-Saharan Africa,Chad,Office Supplies,Online,L,1/27/2011,292494523,2/12/2011,"
+    "4484,651.21,524.96,2920025.64,2353920.64,566105.00\n"
+    "Europe,Latvia,Beverages,Online,C,12/28/2015,361825549,1/23/2016,"
+    "1075,47.45,31.79,51008.75,34174.25,16834.50\n"
+    "Europe,Latvia,Cereal,Offline,M,12/3/2015,361825550,12/9/2015,"
+    "12,205.70,117.11,2468.40,1405.32,1063.08\n"
+)
+
+
+@pytest.fixture
+def source_csv(tmp_path):
+    """Fixture for a small source extract with the original header."""
+    path = tmp_path / "sales.csv"
+    path.write_text(SOURCE_CSV)
+    return path
+
+
+class TestConvertCsvToParquet:
+    """Tests for the Parquet staging conversion."""
+
+    def test_typed_columns(self, source_csv, tmp_path):
+        """Test that the Parquet file has raw column names, parsed dates and no totals."""
+        destination = tmp_path / "sales.parquet"
+
+        rows = convert_csv_to_parquet(source_csv, destination)
+
+        table = pq.read_table(destination)
+        assert rows == 3
+        assert table.schema.equals(SALES_SCHEMA)
+        assert table.column("order_date").to_pylist() == [
+            datetime.date(2011, 1, 27),
+            datetime.date(2015, 12, 28),
+            datetime.date(2015, 12, 3),
+        ]
+        assert table.column("order_id").to_pylist() == [292494523, 361825549, 361825550]
+        assert pa.types.is_dictionary(table.schema.field("country").type)
+
+    def test_compression_codec(self, source_csv, tmp_path):
+        """Test that the configured codec is used for the column chunks."""
+        destination = tmp_path / "sales.parquet"
+
+        convert_csv_to_parquet(source_csv, destination, compression="zstd")
+
+        metadata = pq.ParquetFile(destination).metadata
+        assert metadata.row_group(0).column(0).compression == "ZSTD"
+
+
+class TestPartitionExtract:
+    """Tests for the date-partitioned fan-out."""
+
+    def test_month_partitions_csv(self, source_csv, tmp_path):
+        """Test that rows land in headerless CSV files under Hive-style month folders."""
+        files = partition_extract(source_csv, tmp_path / "partitions", "month")
+
+        assert set(files) == {"year=2011/month=01", "year=2015/month=12"}
+        december = files["year=2015/month=12"].read_text().splitlines()
+        assert len(december) == 2
+        assert all(line.split(",")[5] in ("2015-12-28", "2015-12-03") for line in december)
+
+    def test_year_partitions_parquet(self, source_csv, tmp_path):
+        """Test that Parquet partitions keep the typed schema."""
+        files = partition_extract(source_csv, tmp_path / "partitions", "year", "parquet")
+
+        assert set(files) == {"year=2011", "year=2015"}
+        table = pq.read_table(files["year=2015"])
+        assert table.schema.equals(SALES_SCHEMA)
+        assert table.num_rows == 2
+
+    def test_partition_glob(self):
+        """Test the wildcard folder path matching every partition."""
+        assert partition_glob("sales.csv", "month") == "sales/year=*/month=*"
+        assert partition_glob("sales.csv", "year") == "sales/year=*"
+
+
+class TestStagedBlobName:
+    """Tests for the staged blob name."""
+
+    def test_csv_keeps_name(self):
+        """Test that CSV staging keeps the configured blob name."""
+        assert staged_blob_name("10000 Sales Records.csv", "csv") == "10000 Sales Records.csv"
+
+    def test_parquet_suffix(self):
+        """Test that Parquet staging swaps the suffix."""
+        assert staged_blob_name("raw/sales.csv", "parquet") == "raw/sales.parquet"
@@ -0,0 +1,98 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from scripts.snowflake_loader import local_staged_files, main
+
+
+@pytest.fixture
+def partitions_dir(tmp_path):
+    """Fixture for month partitions as written by the upload step."""
+    for folder in ("year=2014/month=01", "year=2014/month=02"):
+        path = tmp_path / "partitions" / folder / "part-00000.csv"
+        path.parent.mkdir(parents=True)
+        path.write_text("")
+    return tmp_path
+
+
+class TestLocalStagedFiles:
+    """Tests for finding the local files to stage."""
+
+    def test_whole_extract(self, tmp_path):
+        """Test that an unpartitioned extract is staged as one file, cleaned if configured."""
+        settings = {"format": "csv", "partition_by": "none", "clean": True}
+
+        files = local_staged_files(settings, "sales.csv", data_dir=tmp_path)
+
+        assert files == [("", tmp_path / "10000 Sales Records.clean.csv")]
+
+    def test_changed_partitions(self, partitions_dir):
+        """Test that only the changed partitions are staged, in their partition folders."""
+        settings = {"format": "csv", "partition_by": "month"}
+
+        all_files = local_staged_files(settings, "sales.csv", data_dir=partitions_dir)
+        changed = local_staged_files(
+            settings,
+            "sales.csv",
+            ["sales/year=2014/month=02/part-00000.csv"],
+            data_dir=partitions_dir,
+        )
+
+        assert [folder for folder, _ in all_files] == ["year=2014/month=01", "year=2014/month=02"]
+        assert changed == [
+            (
+                "year=2014/month=02",
+                partitions_dir / "partitions/year=2014/month=02/part-00000.csv",
+            ),
+        ]
+
+
+class TestMainFunction:
+    """Tests for the main function."""
+
+    @patch("scripts.snowflake_loader.config")
+    @patch("scripts.snowflake_loader.session")
+    @patch("scripts.snowflake_loader.load_files")
+    def test_main_local_backend(self, mock_load_files, mock_session, mock_config, tmp_path):
+        """Test that the local backend loads the extract without connecting to Snowflake."""
+        mock_config.get_azure_details.return_value = {"blob_name": "10000 Sales Records.csv"}
+        mock_config.get_staging_settings.return_value = {
+            "format": "parquet",
+            "partition_by": "none",
+        }
+        mock_config.get_load_settings.return_value = {
+            "backend": "local",
+            "local_root": str(tmp_path),
+            "on_error": "CONTINUE",
+            "put_workers": 2,
+        }
+
+        result = main()
+
+        backend, files, file_format = mock_load_files.call_args[0]
+        assert backend.root == tmp_path
+        assert files == [("", Path("data/10000 Sales Records.parquet"))]
+        assert file_format.name == "SALES_PARQUET"
+        assert mock_load_files.call_args.kwargs == {"on_error": "CONTINUE", "max_workers": 2}
+        mock_session.assert_not_called()
+        assert result == mock_load_files.return_value
+
+    @patch("scripts.snowflake_loader.config")
+    @patch("scripts.snowflake_loader.session")
+    @patch("scripts.snowflake_loader.load_files")
+    def test_main_snowflake_backend(self, mock_load_files, mock_session, mock_config):
+        """Test that the Snowflake backend loads through a pooled session of the loader preset."""
+        mock_config.get_azure_details.return_value = {"blob_name": "10000 Sales Records.csv"}
+        mock_config.get_staging_settings.return_value = {"format": "csv", "partition_by": "none"}
+        mock_config.get_load_settings.return_value = {
+            "backend": "snowflake",
+            "on_error": "CONTINUE",
+            "put_workers": 2,
+        }
+
+        main()
+
+        mock_session.assert_called_once_with("loader")
+        backend = mock_load_files.call_args[0][0]
+        assert backend.connection == mock_session.return_value.__enter__.return_value
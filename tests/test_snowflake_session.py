@@ -0,0 +1,195 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+import snowflake.connector
+
+from utils.snowflake_session import SESSION_PRESETS, PoolTimeoutError, SessionPool
+
+
+def _connection():
+    connection = MagicMock(spec=snowflake.connector.SnowflakeConnection)
+    connection.is_closed.return_value = False
+    return connection
+
+
+@pytest.fixture
+def mock_connect():
+    """Fixture for a connect function returning a new mock connection per login."""
+    return MagicMock(side_effect=lambda **_: _connection())
+
+
+@pytest.fixture
+def pool(mock_connect):
+    """Fixture for a pool of two connections."""
+    return SessionPool({"account": "test-account"}, max_size=2, timeout=1, connect=mock_connect)
+
+
+class TestSessionPresets:
+    """Tests for the session parameters of each call site."""
+
+    def test_statements(self):
+        """Test that a preset switches parameters and schema, formatting each value type."""
+        assert SESSION_PRESETS["loader"].statements() == [
+            "ALTER SESSION SET QUERY_TAG = 'salesflow-loader' STATEMENT_TIMEOUT_IN_SECONDS = 14400 "
+            "USE_CACHED_RESULT = TRUE",
+            "USE SCHEMA RAW",
+        ]
+        assert SESSION_PRESETS["dashboard"].statements()[1] == "USE SCHEMA PUBLIC"
+
+    def test_presets_set_the_same_parameters(self):
+        """Test that switching presets overrides every parameter the previous one set."""
+        parameters = {frozenset(preset.parameters) for preset in SESSION_PRESETS.values()}
+
+        assert len(parameters) == 1
+
+
+class TestSessionPool:
+    """Tests for checking out pooled connections."""
+
+    def test_connection_reused(self, pool, mock_connect):
+        """Test that sessions in sequence share one login, set up with the preset at login."""
+        with pool.session("pipeline") as first:
+            pass
+        with pool.session("pipeline") as second:
+            pass
+
+        assert first is second
+        mock_connect.assert_called_once_with(
+            account="test-account",
+            session_parameters=SESSION_PRESETS["pipeline"].parameters,
+            schema="PUBLIC",
+        )
+        first.cursor.assert_not_called()
+        assert (pool.metrics.logins, pool.metrics.checkouts) == (1, 2)
+
+    def test_preset_switched_once(self, pool):
+        """Test that a reused connection switches presets only when the preset changes."""
+        with pool.session("pipeline"):
+            pass
+        with pool.session("loader") as connection:
+            pass
+        with pool.session("loader"):
+            pass
+
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with(
+            ";\n".join(SESSION_PRESETS["loader"].statements()),
+            num_statements=2,
+        )
+
+    def test_error_rolls_back(self, pool):
+        """Test that a connection returned after an error is rolled back and set up again."""
+        with pytest.raises(RuntimeError), pool.session("pipeline") as first:
+            raise RuntimeError("query failed")
+        with pool.session("pipeline") as second:
+            pass
+
+        assert second is first
+        first.rollback.assert_called_once()
+        cursor = first.cursor.return_value.__enter__.return_value
+        cursor.execute.assert_called_once_with(
+            ";\n".join(SESSION_PRESETS["pipeline"].statements()),
+            num_statements=2,
+        )
+
+    def test_failed_rollback_closes(self, pool, mock_connect):
+        """Test that a connection that cannot be rolled back is not reused."""
+        with pool.session() as first:
+            pass
+        first.rollback.side_effect = snowflake.connector.errors.OperationalError("gone")
+        first.close.side_effect = lambda: setattr(first.is_closed, "return_value", True)
+
+        with pytest.raises(RuntimeError), pool.session():
+            raise RuntimeError("query failed")
+        with pool.session() as second:
+            pass
+
+        first.close.assert_called()
+        assert second is not first
+        assert mock_connect.call_count == 2
+
+    def test_bounded_with_wait(self, pool, mock_connect):
+        """Test that a checkout beyond the pool size waits for a connection to be returned."""
+        first_session = pool.session()
+        first = first_session.__enter__()
+        with pool.session():
+            waiter_done = threading.Event()
+
+            def wait_for_connection():
+                with pool.session() as connection:
+                    assert connection is first
+                waiter_done.set()
+
+            waiter = threading.Thread(target=wait_for_connection)
+            waiter.start()
+            assert not waiter_done.wait(0.1)
+            first_session.__exit__(None, None, None)
+            waiter.join(1)
+
+        assert waiter_done.is_set()
+        assert mock_connect.call_count == 2
+        assert pool.metrics.waits == 1
+
+    def test_timeout(self, mock_connect):
+        """Test that a checkout gives up when no connection is returned in time."""
+        pool = SessionPool({}, max_size=1, timeout=0.01, connect=mock_connect)
+
+        with pool.session(), pytest.raises(PoolTimeoutError), pool.session():
+            pass
+
+    def test_failed_login_frees_slot(self, mock_connect):
+        """Test that a failed login does not use up a slot of the pool."""
+        pool = SessionPool({}, max_size=1, timeout=0.01, connect=mock_connect)
+        mock_connect.side_effect = [snowflake.connector.errors.DatabaseError("down"), _connection()]
+
+        with pytest.raises(snowflake.connector.errors.DatabaseError), pool.session():
+            pass
+        with pool.session():
+            pass
+
+    def test_closed_connection_replaced(self, pool, mock_connect):
+        """Test that a connection closed while idle is replaced by a new login."""
+        with pool.session() as first:
+            pass
+        first.is_closed.return_value = True
+
+        with pool.session() as second:
+            pass
+
+        assert second is not first
+        assert pool.metrics.reconnects == 1
+        assert mock_connect.call_count == 2
+
+    def test_idle_connection_probed(self, mock_connect):
+        """Test that a connection idle for longer than the interval is probed before reuse."""
+        pool = SessionPool({}, health_check_interval=60, connect=mock_connect)
+        with pool.session() as first:
+            pass
+        cursor = first.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = snowflake.connector.errors.OperationalError("expired")
+
+        with (
+            patch("utils.snowflake_session.time.monotonic", return_value=1e9),
+            pool.session() as second,
+        ):
+            pass
+
+        cursor.execute.assert_called_once_with("SELECT 1")
+        assert second is not first
+        assert (pool.metrics.health_checks, pool.metrics.reconnects) == (1, 1)
+
+    def test_close(self, pool):
+        """Test that closing the pool closes idle connections and those returned later."""
+        in_use_session = pool.session()
+        in_use = in_use_session.__enter__()
+        with pool.session() as idle:
+            pass
+
+        pool.close()
+        in_use_session.__exit__(None, None, None)
+
+        idle.close.assert_called_once()
+        in_use.close.assert_called_once()
+        with pytest.raises(PoolTimeoutError, match="closed"), pool.session():
+            pass
@@ -0,0 +1,104 @@
+import io
+import zipfile
+
+import pytest
+
+from utils.streams import ChunkStream, iter_zip_member
+
+
+class _NonSeekableWriter(io.RawIOBase):
+    """Write-only stream that forces zipfile to emit data descriptors."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.buffer.extend(data)
+        return len(data)
+
+
+def _chunked(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def _build_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as archive:
+        for name, content in members.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def csv_content():
+    """Fixture for a CSV payload that is large enough to span many chunks."""
+    return b"Region,Country\n" + b"Asia,Japan\n" * 5000
+
+
+class TestChunkStream:
+    """Tests for the ChunkStream file-like wrapper."""
+
+    def test_readline_and_read(self):
+        """Test line and sized reads across chunk boundaries."""
+        stream = io.BufferedReader(ChunkStream([b"hea", b"der\nab", b"cdef"]))
+
+        assert stream.readline() == b"header\n"
+        assert stream.read(3) == b"abc"
+        assert stream.read() == b"def"
+        assert stream.read() == b""
+
+
+class TestIterZipMember:
+    """Tests for sequential zip member extraction."""
+
+    @pytest.mark.parametrize("compression", [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+    def test_extracts_member_after_others(self, csv_content, compression):
+        """Test that the requested member is found behind other members."""
+        archive = _build_zip(
+            {"readme.txt": b"ignore me" * 100, "sales.csv": csv_content},
+            compression=compression,
+        )
+
+        result = b"".join(iter_zip_member(_chunked(archive, 1000), "sales.csv"))
+
+        assert result == csv_content
+
+    def test_extracts_member_with_data_descriptor(self, csv_content):
+        """Test archives written to non-seekable streams (sizes in data descriptors)."""
+        writer = _NonSeekableWriter()
+        with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("readme.txt", b"ignore me")
+            archive.writestr("sales.csv", csv_content)
+
+        result = b"".join(iter_zip_member(_chunked(bytes(writer.buffer), 777), "sales.csv"))
+
+        assert result == csv_content
+
+    def test_skips_zip64_member_with_data_descriptor(self, csv_content):
+        """Test that the 8-byte sizes of a zip64 data descriptor are skipped entirely."""
+        writer = _NonSeekableWriter()
+        with zipfile.ZipFile(writer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, content in [("readme.txt", b"ignore me"), ("sales.csv", csv_content)]:
+                with archive.open(name, "w", force_zip64=True) as member:
+                    member.write(content)
+
+        result = b"".join(iter_zip_member(_chunked(bytes(writer.buffer), 777), "sales.csv"))
+
+        assert result == csv_content
+
+    def test_missing_member(self):
+        """Test that a missing member raises an error once the central directory is hit."""
+        archive = _build_zip({"readme.txt": b"ignore me"})
+
+        with pytest.raises(ValueError, match="not found"):
+            list(iter_zip_member([archive], "sales.csv"))
+
+    def test_truncated_archive(self, csv_content):
+        """Test that a truncated download is reported instead of silently accepted."""
+        archive = _build_zip({"sales.csv": csv_content})
+
+        with pytest.raises(ValueError, match="Truncated"):
+            list(iter_zip_member([archive[: len(archive) // 2]], "sales.csv"))
@@ -0,0 +1,157 @@
+import datetime
+import math
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from utils.sales_data import CSV_STAGING_SCHEMA, SALES_SCHEMA, open_sales_csv, to_raw_batch
+from utils.synthetic_sales import (
+    ITEM_PRICES,
+    ORDER_ID_MULTIPLIER,
+    ORDER_ID_SPACE,
+    REGIONS,
+    generate_batch,
+    iter_batches,
+    write_sales_data,
+)
+
+
+def _table(batches):
+    return pa.Table.from_batches(list(batches)).combine_chunks()
+
+
+class TestGenerateBatch:
+    """Tests for the vectorized row generator."""
+
+    def test_schema_and_size(self):
+        """Test that a batch has the raw table layout."""
+        batch = generate_batch(np.random.default_rng(0), 0, 1_000, 1_000)
+
+        assert batch.schema == SALES_SCHEMA
+        assert batch.num_rows == 1_000
+
+    def test_region_country_hierarchy(self):
+        """Test that every country is generated under its own region."""
+        table = _table(iter_batches(20_000, chunk_size=5_000))
+
+        regions = table["region"].to_pylist()
+        countries = table["country"].to_pylist()
+        assert all(country in REGIONS[region] for region, country in zip(regions, countries))
+
+    def test_item_prices(self):
+        """Test that unit price and cost are fixed per item type."""
+        table = _table(iter_batches(20_000, chunk_size=5_000))
+
+        columns = ("item_type", "unit_price", "unit_cost")
+        pairs = set(zip(*(table[name].to_pylist() for name in columns)))
+        assert pairs <= {(item, *prices) for item, prices in ITEM_PRICES.items()}
+
+    def test_duplicates(self):
+        """Test that duplicates are exact copies of earlier rows."""
+        batch = generate_batch(np.random.default_rng(0), 0, 10_000, 10_000, duplicate_rate=0.05)
+        rows = batch.to_pylist()
+
+        duplicates = len(rows) - len({tuple(row.values()) for row in rows})
+        assert len(rows) - len({row["order_id"] for row in rows}) == duplicates
+        assert 350 < duplicates < 650
+
+    def test_late_rows(self):
+        """Test that late rows are dated before the rows that arrived ahead of them."""
+        batch = generate_batch(
+            np.random.default_rng(0),
+            0,
+            10_000,
+            10_000,
+            duplicate_rate=0.0,
+            late_rate=0.05,
+        )
+
+        order_dates = batch["order_date"].cast(pa.int32()).to_numpy()
+        late = np.maximum.accumulate(order_dates) - order_dates > 1
+        assert 350 < late.sum() < 650
+
+    def test_without_duplicates(self):
+        """Test that order IDs are unique when no duplicates are requested."""
+        table = _table(iter_batches(50_000, chunk_size=10_000, duplicate_rate=0.0))
+
+        assert pc.count_distinct(table["order_id"]).as_py() == 50_000
+        assert pc.min(table["order_id"]).as_py() >= 1_000_000_000
+        assert pc.max(table["order_id"]).as_py() < 10_000_000_000
+
+    def test_order_ids_distinct_at_scale(self):
+        """Test that the order ID scramble stays a bijection beyond a billion rows."""
+        assert math.gcd(ORDER_ID_MULTIPLIER, ORDER_ID_SPACE) == 1
+        # The products stay within int64 for the largest row index
+        assert np.iinfo(np.int64).max > (ORDER_ID_SPACE - 1) * ORDER_ID_MULTIPLIER
+        # Row 900M wrapped around onto row 0 in a 9-digit space
+        row_index = np.array([0, 900_000_000, 1_000_000_000 - 1], dtype=np.int64)
+        order_ids = row_index * ORDER_ID_MULTIPLIER % ORDER_ID_SPACE
+        assert len(set(order_ids.tolist())) == len(row_index)
+
+    def test_too_many_rows(self, tmp_path):
+        """Test that an extract larger than the order ID space is rejected."""
+        with pytest.raises(ValueError, match="distinct order IDs"):
+            write_sales_data(tmp_path / "sales.csv", ORDER_ID_SPACE + 1)
+
+    def test_skewed_order_dates(self):
+        """Test that later years hold more orders than earlier ones."""
+        table = _table(iter_batches(20_000, chunk_size=5_000))
+
+        years = pc.value_counts(pc.year(table["order_date"])).to_pylist()
+        counts = {item["values"]: item["counts"] for item in years}
+        assert counts[2016] > 2 * counts[2010]
+        assert pc.all(pc.greater_equal(table["ship_date"], table["order_date"])).as_py()
+
+    def test_seeded(self):
+        """Test that the same seed reproduces the data and another seed changes it."""
+        first = _table(iter_batches(5_000, seed=7, chunk_size=2_000))
+        second = _table(iter_batches(5_000, seed=7, chunk_size=2_000))
+        other = _table(iter_batches(5_000, seed=8, chunk_size=2_000))
+
+        assert first.equals(second)
+        assert not first.equals(other)
+
+
+class TestWriteSalesData:
+    """Tests for writing synthetic extracts."""
+
+    def test_csv_matches_source_format(self, tmp_path):
+        """Test that generated CSV parses like the downloaded extract."""
+        destination = tmp_path / "sales.csv"
+
+        rows = write_sales_data(destination, 25_000, chunk_size=10_000, max_workers=2)
+
+        assert rows == 25_000
+        assert destination.read_text().startswith('"Region","Country","Item Type"')
+        table = _table(to_raw_batch(batch) for batch in open_sales_csv(destination))
+        assert table.num_rows == 25_000
+        expected = _table(iter_batches(25_000, chunk_size=10_000))
+        assert table.cast(CSV_STAGING_SCHEMA).equals(expected.cast(CSV_STAGING_SCHEMA))
+
+    def test_parquet(self, tmp_path):
+        """Test that Parquet output uses the staging schema."""
+        destination = tmp_path / "sales.parquet"
+
+        write_sales_data(destination, 12_000, "parquet", chunk_size=5_000)
+
+        table = pq.read_table(destination)
+        assert table.schema == SALES_SCHEMA
+        assert table.num_rows == 12_000
+        assert pc.min(table["order_date"]).as_py() >= datetime.date(2010, 1, 1)
+
+    def test_output_independent_of_workers(self, tmp_path):
+        """Test that the number of workers does not change the file."""
+        single, parallel = tmp_path / "single.csv", tmp_path / "parallel.csv"
+
+        write_sales_data(single, 10_000, chunk_size=1_000, max_workers=1)
+        write_sales_data(parallel, 10_000, chunk_size=1_000, max_workers=4)
+
+        assert single.read_bytes() == parallel.read_bytes()
+
+    def test_invalid_format(self, tmp_path):
+        """Test that unknown formats are rejected."""
+        with pytest.raises(ValueError, match="Unsupported format"):
+            write_sales_data(tmp_path / "sales.json", 10, "json")
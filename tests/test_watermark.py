@@ -0,0 +1,79 @@
+import json
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock
+
+from azure.core.exceptions import ResourceNotFoundError
+
+from utils.watermark import LoadWindow, advance_watermark, next_window, read_watermark
+
+
+class TestWatermark:
+    """Tests for the high-watermark of the incremental copy."""
+
+    def test_first_window_loads_everything(self):
+        """Test that without a stored watermark the window starts at the beginning."""
+        container_client = MagicMock()
+        container_client.download_blob.side_effect = ResourceNotFoundError("Not found")
+
+        staged = [MagicMock(last_modified=datetime(2024, 1, 1, 12, tzinfo=UTC))]
+
+        window = next_window(container_client, "test-blob.csv", staged)
+
+        container_client.download_blob.assert_called_once_with("test-blob/_watermark.json")
+        assert window.start is None
+        assert window.contains(datetime(2000, 1, 1, tzinfo=UTC))
+        assert window.parameters()["windowStart"] == "1970-01-01T00:00:00+00:00"
+
+    def test_window_ends_after_newest_blob(self):
+        """Test that the window end comes from the blobs' Last-Modified, not the local clock."""
+        container_client = MagicMock()
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        container_client.download_blob.return_value.readall.return_value = json.dumps(
+            {"modified_before": start.isoformat()},
+        ).encode()
+        newest = datetime(2024, 1, 2, 12, tzinfo=UTC)
+        staged = [
+            MagicMock(last_modified=datetime(2023, 12, 1, tzinfo=UTC)),
+            MagicMock(last_modified=newest),
+        ]
+
+        window = next_window(container_client, "test-blob.csv", staged)
+
+        assert window.start == start
+        assert window.contains(newest)
+        assert window.end == newest + timedelta(seconds=1)
+
+    def test_window_empty_without_new_blobs(self):
+        """Test that the window does not move back when no blob was modified since."""
+        container_client = MagicMock()
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        container_client.download_blob.return_value.readall.return_value = json.dumps(
+            {"modified_before": start.isoformat()},
+        ).encode()
+        staged = [MagicMock(last_modified=datetime(2023, 12, 1, tzinfo=UTC))]
+
+        window = next_window(container_client, "test-blob.csv", staged)
+
+        assert window.end == start
+
+    def test_advance_and_read(self):
+        """Test that the next window starts where the last successful one ended."""
+        container_client = MagicMock()
+        end = datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+        advance_watermark(container_client, "test-blob.csv", LoadWindow(None, end), "run-1")
+
+        name, content = container_client.upload_blob.call_args[0]
+        assert name == "test-blob/_watermark.json"
+        assert json.loads(content)["run_id"] == "run-1"
+        container_client.download_blob.return_value.readall.return_value = content.encode()
+        assert read_watermark(container_client, "test-blob.csv") == end
+
+    def test_window_is_half_open(self):
+        """Test that a blob modified exactly at a window boundary belongs to the later window."""
+        boundary = datetime(2024, 1, 2, tzinfo=UTC)
+        first = LoadWindow(datetime(2024, 1, 1, tzinfo=UTC), boundary)
+        second = LoadWindow(boundary, datetime(2024, 1, 3, tzinfo=UTC))
+
+        assert not first.contains(boundary)
+        assert second.contains(boundary)
@@ -0,0 +1,206 @@
+"""Declarative, diff-based deployment of the data factory's resources.
+
+The pipeline scripts describe the desired state of the factory as ``FactoryResource``
+definitions instead of pushing every resource on every run. Each definition is hashed over
+its canonical JSON, and the digests are compared against the deployed state: either a local
+state file written by the previous deployment, or the digest annotation that every deployed
+resource carries (read with one listing per resource kind). Only resources whose digest
+differs are pushed, in dependency order (linked services, then datasets, then pipelines),
+with the independent resources of each stage sent concurrently. A warm rerun with nothing
+changed makes no management-plane writes.
+"""
+
+import copy
+import hashlib
+import json
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from azure.mgmt.datafactory import DataFactoryManagementClient
+from azure.mgmt.datafactory.models import DatasetResource, LinkedServiceResource, PipelineResource
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# Resource kind -> operations group of the management client
+RESOURCE_OPERATIONS = {
+    "linked_service": "linked_services",
+    "dataset": "datasets",
+    "pipeline": "pipelines",
+}
+DIGEST_ANNOTATION_PREFIX = "sha256:"
+
+FactoryDefinition = LinkedServiceResource | DatasetResource | PipelineResource
+
+
+@dataclass(frozen=True)
+class FactoryResource:
+    """Desired definition of a linked service, dataset or pipeline of the factory."""
+
+    kind: str
+    name: str
+    definition: FactoryDefinition
+    depends_on: tuple[str, ...] = ()
+
+    @property
+    def key(self) -> str:
+        """Identify the resource among all kinds, e.g. ``dataset/SalesCSV``."""
+        return f"{self.kind}/{self.name}"
+
+    def body(self) -> dict:
+        """Return the definition as the JSON body sent to the management API."""
+        body = self.definition.serialize()
+        body["properties"].pop("annotations", None)
+        return body
+
+    def digest(self) -> str:
+        """Return the SHA-256 of the canonical JSON of the definition."""
+        canonical = json.dumps(self.body(), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+@dataclass
+class DeploymentPlan:
+    """Resources to push, grouped in stages that only depend on earlier stages."""
+
+    stages: list[list[FactoryResource]]
+    unchanged: list[str]
+
+    @property
+    def changed(self) -> list[str]:
+        """Keys of the resources to push, in deployment order."""
+        return [resource.key for stage in self.stages for resource in stage]
+
+
+def _dependency_levels(resources: Iterable[FactoryResource]) -> dict[str, int]:
+    """Return the depth of each resource in the dependency graph; 0 for no dependencies."""
+    by_key = {resource.key: resource for resource in resources}
+    levels: dict[str, int] = {}
+
+    def level(key: str, path: tuple[str, ...] = ()) -> int:
+        if key in path:
+            raise ValueError(f"Dependency cycle: {' -> '.join((*path, key))}")
+        if key not in levels:
+            dependencies = [dep for dep in by_key[key].depends_on if dep in by_key]
+            levels[key] = 1 + max((level(dep, (*path, key)) for dep in dependencies), default=-1)
+        return levels[key]
+
+    for key in by_key:
+        level(key)
+    return levels
+
+
+def plan_deployment(
+    resources: list[FactoryResource],
+    deployed_digests: dict[str, str],
+) -> DeploymentPlan:
+    """Diff the desired resources against the deployed digests."""
+    levels = _dependency_levels(resources)
+    changed = [r for r in resources if deployed_digests.get(r.key) != r.digest()]
+    stages = [
+        [resource for resource in changed if levels[resource.key] == level]
+        for level in sorted({levels[resource.key] for resource in changed})
+    ]
+    unchanged = [r.key for r in resources if deployed_digests.get(r.key) == r.digest()]
+    return DeploymentPlan(stages, unchanged)
+
+
+def _annotated_digest(properties: dict) -> str | None:
+    for annotation in properties.get("annotations") or []:
+        if isinstance(annotation, str) and annotation.startswith(DIGEST_ANNOTATION_PREFIX):
+            return annotation.removeprefix(DIGEST_ANNOTATION_PREFIX)
+    return None
+
+
+def read_deployed_digests(
+    client: DataFactoryManagementClient,
+    resource_group: str,
+    factory_name: str,
+) -> dict[str, str]:
+    """Read the digest annotations of the resources deployed to the factory."""
+    digests = {}
+    for kind, operations in RESOURCE_OPERATIONS.items():
+        for item in getattr(client, operations).list_by_factory(resource_group, factory_name):
+            digest = _annotated_digest(item.serialize()["properties"])
+            if digest:
+                digests[f"{kind}/{item.name}"] = digest
+    return digests
+
+
+def load_state(state_path: Path, factory_id: str) -> dict[str, str] | None:
+    """Return the digests recorded for the factory, or None without a usable state file."""
+    if not state_path.exists():
+        return None
+    state = json.loads(state_path.read_text())
+    if state.get("factory") != factory_id:
+        return None
+    return state["digests"]
+
+
+def save_state(state_path: Path, factory_id: str, digests: dict[str, str]) -> None:
+    """Record the digests of the deployed resources."""
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state = {"factory": factory_id, "digests": dict(sorted(digests.items()))}
+    state_path.write_text(json.dumps(state, indent=2) + "\n")
+
+
+def push_resource(
+    client: DataFactoryManagementClient,
+    resource_group: str,
+    factory_name: str,
+    resource: FactoryResource,
+) -> None:
+    """Create or update one resource, annotated with the digest of its definition."""
+    # Annotate a copy rather than deserializing the body, which would turn subclasses of the
+    # SDK models back into the SDK models and drop the properties they add
+    definition = copy.deepcopy(resource.definition)
+    # The pipeline model flattens its properties into the resource
+    properties = definition if isinstance(definition, PipelineResource) else definition.properties
+    properties.annotations = [f"{DIGEST_ANNOTATION_PREFIX}{resource.digest()}"]
+    operations = getattr(client, RESOURCE_OPERATIONS[resource.kind])
+    operations.create_or_update(resource_group, factory_name, resource.name, definition)
+    logger.info("Deployed %s", resource.key)
+
+
+def deploy_resources(
+    client: DataFactoryManagementClient,
+    resource_group: str,
+    factory_name: str,
+    resources: list[FactoryResource],
+    state_path: Path | None = None,
+) -> DeploymentPlan:
+    """Push the resources that differ from the deployed state; returns the plan.
+
+    Without a state file (or one recorded for another factory) the deployed state is read
+    from the factory. The state file is updated after a successful deployment.
+    """
+    factory_id = f"{resource_group}/{factory_name}"
+    deployed = load_state(state_path, factory_id) if state_path else None
+    if deployed is None:
+        deployed = read_deployed_digests(client, resource_group, factory_name)
+
+    plan = plan_deployment(resources, deployed)
+    logger.info(
+        "Deployment plan: %d changed, %d unchanged resources",
+        len(plan.changed),
+        len(plan.unchanged),
+    )
+    for stage in plan.stages:
+        with ThreadPoolExecutor(max_workers=len(stage)) as executor:
+            futures = [
+                executor.submit(push_resource, client, resource_group, factory_name, resource)
+                for resource in stage
+            ]
+            for future in futures:
+                future.result()
+
+    if state_path:
+        save_state(
+            state_path,
+            factory_id,
+            {**deployed, **{resource.key: resource.digest() for resource in resources}},
+        )
+    return plan
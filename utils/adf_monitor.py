@@ -0,0 +1,253 @@
+"""Monitoring of ADF pipeline runs until they finish, with the metrics of their copies.
+
+``create_run`` only queues a pipeline run. The monitor polls ``pipeline_runs.get`` with
+adaptive backoff until the run reaches a terminal state. Polling starts fast and slows down
+while the status stays the same, and becomes fast again whenever the status changes
+(e.g. from Queued to InProgress). It then queries the run's activities and turns the
+output of every copy activity into ``CopyActivityMetrics``: rows read, written and
+skipped, throughput, data integration units, and how long the copy queued versus
+transferred.
+"""
+
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime, timedelta
+
+from azure.mgmt.datafactory import DataFactoryManagementClient
+from azure.mgmt.datafactory.models import ActivityRun, PipelineRun, RunFilterParameters
+
+from utils.logger import get_logger
+from utils.provisioning import backoff_delays
+
+logger = get_logger()
+
+SUCCEEDED_STATUS = "Succeeded"
+TERMINAL_STATUSES = (SUCCEEDED_STATUS, "Failed", "Cancelled")
+RUN_TIMEOUT = 4 * 60 * 60
+POLL_INITIAL_DELAY = 2.0
+POLL_MAX_DELAY = 30.0
+# Activity runs are filtered by last update time, which must bracket the whole run
+ACTIVITY_QUERY_MARGIN = timedelta(minutes=5)
+
+
+class PipelineRunError(Exception):
+    """Raised when a pipeline run does not succeed or does not finish in time."""
+
+
+@dataclass
+class CopyActivityMetrics:
+    """Metrics reported in the output of a copy activity run."""
+
+    activity_name: str
+    status: str
+    source_path: str = ""
+    rows_read: int = 0
+    rows_copied: int = 0
+    rows_skipped: int = 0
+    files_read: int = 0
+    data_read: int = 0
+    data_written: int = 0
+    throughput_kbps: float = 0.0
+    data_integration_units: int = 0
+    parallel_copies: int = 0
+    copy_duration: float = 0.0
+    queue_duration: float = 0.0
+    transfer_duration: float = 0.0
+    time_to_first_byte: float = 0.0
+    errors: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_activity_run(cls, activity_run: ActivityRun) -> "CopyActivityMetrics":
+        """Read the metrics from the output of a copy activity run."""
+        output = activity_run.output or {}
+        # Fan-out copies resolve their source file per iteration, which identifies them
+        store_settings = (activity_run.input or {}).get("source", {}).get("storeSettings", {})
+        folder = store_settings.get("wildcardFolderPath")
+        file_name = store_settings.get("wildcardFileName")
+        # Durations per source/sink pair; a single copy has one entry
+        queue_duration = transfer_duration = time_to_first_byte = 0.0
+        for details in output.get("executionDetails", []):
+            durations = details.get("detailedDurations", {})
+            queue_duration += durations.get("queuingDuration", 0)
+            transfer_duration += durations.get("transferDuration", 0)
+            time_to_first_byte += durations.get("timeToFirstByte", 0)
+        return cls(
+            activity_name=activity_run.activity_name,
+            status=activity_run.status,
+            source_path=f"{folder}/{file_name}" if folder and file_name else "",
+            rows_read=output.get("rowsRead", 0),
+            rows_copied=output.get("rowsCopied", 0),
+            rows_skipped=output.get("rowsSkipped", 0),
+            files_read=output.get("filesRead", 0),
+            data_read=output.get("dataRead", 0),
+            data_written=output.get("dataWritten", 0),
+            throughput_kbps=output.get("throughput", 0.0),
+            data_integration_units=output.get("usedDataIntegrationUnits", 0),
+            parallel_copies=output.get("usedParallelCopies", 0),
+            copy_duration=output.get("copyDuration", 0.0),
+            queue_duration=queue_duration,
+            transfer_duration=transfer_duration,
+            time_to_first_byte=time_to_first_byte,
+            errors=[error.get("Message", str(error)) for error in output.get("errors", [])],
+        )
+
+
+@dataclass
+class PipelineRunReport:
+    """Outcome of a pipeline run and the metrics of its copy activities."""
+
+    run_id: str
+    pipeline_name: str
+    status: str
+    message: str
+    duration: float
+    wait_seconds: float
+    polls: int
+    copies: list[CopyActivityMetrics]
+    # Staged blobs the run copied, filled in by the caller that planned its input
+    copied_blobs: list[str] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> bool:
+        """Whether the run finished successfully."""
+        return self.status == SUCCEEDED_STATUS
+
+    @property
+    def rows_copied(self) -> int:
+        """Rows written by all copy activities."""
+        return sum(copy.rows_copied for copy in self.copies)
+
+    @property
+    def rows_skipped(self) -> int:
+        """Rows the copy activities skipped as incompatible."""
+        return sum(copy.rows_skipped for copy in self.copies)
+
+    def to_dict(self) -> dict:
+        """Return the report as plain data, e.g. to serialize it as JSON."""
+        return asdict(self)
+
+
+def wait_for_pipeline_run(
+    client: DataFactoryManagementClient,
+    resource_group: str,
+    factory_name: str,
+    run_id: str,
+    max_wait: float = RUN_TIMEOUT,
+) -> tuple[PipelineRun, int]:
+    """Block until the pipeline run reaches a terminal status; returns it and the poll count."""
+    deadline = time.monotonic() + max_wait
+    delays = backoff_delays(POLL_INITIAL_DELAY, POLL_MAX_DELAY)
+    last_status = None
+    polls = 0
+    while True:
+        run = client.pipeline_runs.get(resource_group, factory_name, run_id)
+        polls += 1
+        if run.status in TERMINAL_STATUSES:
+            return run, polls
+        if run.status != last_status:
+            logger.info("Pipeline run %s is %s", run_id, run.status)
+            # React quickly to the next transition, e.g. a short copy after a long queue
+            delays = backoff_delays(POLL_INITIAL_DELAY, POLL_MAX_DELAY)
+            last_status = run.status
+        delay = next(delays)
+        if time.monotonic() + delay > deadline:
+            raise PipelineRunError(
+                f"Pipeline run {run_id} still {run.status} after {max_wait:.0f}s",
+            )
+        time.sleep(delay)
+
+
+def query_copy_metrics(
+    client: DataFactoryManagementClient,
+    resource_group: str,
+    factory_name: str,
+    run: PipelineRun,
+) -> list[CopyActivityMetrics]:
+    """Return the metrics of the copy activities of a finished pipeline run."""
+    started = run.run_start or datetime.now(UTC)
+    ended = run.run_end or datetime.now(UTC)
+    filters = RunFilterParameters(
+        last_updated_after=started - ACTIVITY_QUERY_MARGIN,
+        last_updated_before=ended + ACTIVITY_QUERY_MARGIN,
+    )
+    copies = []
+    while True:
+        # Fan-out pipelines have an activity run per iteration, spread over several pages
+        response = client.activity_runs.query_by_pipeline_run(
+            resource_group,
+            factory_name,
+            run.run_id,
+            filters,
+        )
+        copies += [
+            CopyActivityMetrics.from_activity_run(activity_run)
+            for activity_run in response.value
+            if activity_run.activity_type == "Copy"
+        ]
+        if not response.continuation_token:
+            return copies
+        filters.continuation_token = response.continuation_token
+
+
+def log_run_report(report: PipelineRunReport) -> None:
+    """Log a summary of the run and of each of its copy activities."""
+    logger.info(
+        "Pipeline run %s %s in %.1fs (%d polls over %.1fs)",
+        report.run_id,
+        report.status,
+        report.duration,
+        report.polls,
+        report.wait_seconds,
+    )
+    for copy in report.copies:
+        logger.info(
+            "%s: %d rows read, %d copied, %d skipped; %.1f KB/s with %d DIUs; "
+            "queued %.1fs, transferred %.1fs",
+            copy.source_path or copy.activity_name,
+            copy.rows_read,
+            copy.rows_copied,
+            copy.rows_skipped,
+            copy.throughput_kbps,
+            copy.data_integration_units,
+            copy.queue_duration,
+            copy.transfer_duration,
+        )
+        if copy.rows_skipped:
+            logger.warning(
+                "%s skipped %d incompatible rows",
+                copy.source_path or copy.activity_name,
+                copy.rows_skipped,
+            )
+
+
+def monitor_pipeline_run(
+    client: DataFactoryManagementClient,
+    resource_group: str,
+    factory_name: str,
+    run_id: str,
+    max_wait: float = RUN_TIMEOUT,
+    *,
+    raise_on_failure: bool = True,
+) -> PipelineRunReport:
+    """Wait for a pipeline run to finish and report on it.
+
+    Raises ``PipelineRunError`` if the run did not finish within ``max_wait`` seconds or,
+    unless ``raise_on_failure`` is false, if it failed or was cancelled, so that nothing
+    downstream runs on a partial load.
+    """
+    started = time.perf_counter()
+    run, polls = wait_for_pipeline_run(client, resource_group, factory_name, run_id, max_wait)
+    report = PipelineRunReport(
+        run_id=run_id,
+        pipeline_name=run.pipeline_name,
+        status=run.status,
+        message=run.message or "",
+        duration=(run.duration_in_ms or 0) / 1000,
+        wait_seconds=time.perf_counter() - started,
+        polls=polls,
+        copies=query_copy_metrics(client, resource_group, factory_name, run),
+    )
+    log_run_report(report)
+    if raise_on_failure and not report.succeeded:
+        raise PipelineRunError(f"Pipeline run {run_id} {report.status}: {report.message}")
+    return report
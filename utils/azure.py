@@ -1,4 +1,5 @@
 from azure.identity import ClientSecretCredential
+from azure.identity.aio import ClientSecretCredential as AsyncClientSecretCredential
 
 from utils import config
 from utils.logger import get_logger
@@ -11,3 +12,14 @@ def get_azure_credential() -> ClientSecretCredential:
     logger.info("Authenticating with Azure...")
     azure_credentials = config.get_azure_details()
     return ClientSecretCredential(**azure_credentials)
+
+
+def get_async_azure_credential() -> AsyncClientSecretCredential:
+    """Get an async Azure credential using service principal, for the aio SDK clients."""
+    logger.info("Authenticating with Azure...")
+    azure_details = config.get_azure_details()
+    return AsyncClientSecretCredential(
+        azure_details["tenant_id"],
+        azure_details["client_id"],
+        azure_details["client_secret"],
+    )
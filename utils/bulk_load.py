@@ -0,0 +1,513 @@
+"""Direct bulk load of the staged extract into Snowflake: PUT to a stage, then COPY INTO.
+
+For a single extract, ADF spends minutes provisioning and orchestrating a copy that
+Snowflake can do by itself. The direct loader PUTs the local extract or its partitions to
+an internal stage in parallel, auto-compressing CSV files. It then loads them with a single
+``COPY INTO`` using a named file format that matches how the extract was staged. The rows
+COPY returns, one per file, are parsed into a ``LoadReport`` with the rows loaded and
+rejected.
+
+COPY keeps load metadata for each staged file. Files whose content has not changed since
+they were last loaded are skipped instead of loaded twice.
+
+``SnowflakeBackend`` runs the statements over a ``snowflake.connector`` connection.
+``LocalBackend`` is an offline stand-in: it stages files into a local folder, loads them
+into SQLite, and returns the same result rows.
+"""
+
+import csv
+import gzip
+import hashlib
+import shutil
+import sqlite3
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from datetime import UTC, date, datetime
+from pathlib import Path
+from typing import Protocol
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import snowflake.connector
+
+from utils.logger import get_logger
+from utils.sales_data import SALES_SCHEMA
+
+logger = get_logger()
+
+RAW_TABLE = "raw_sales_data"
+STAGE_NAME = "SALES_STAGE"
+# Set on raw rows after each load by stamp_loaded_rows
+LOADED_AT_COLUMN = "loaded_at"
+ON_ERROR_OPTIONS = ("CONTINUE", "SKIP_FILE", "ABORT_STATEMENT")
+LOAD_FAILED_STATUS = "LOAD_FAILED"
+# Returned instead of per-file rows when every file was skipped or none matched
+NO_FILES_STATUS = "Copy executed with 0 files processed."
+
+
+class LoadError(Exception):
+    """Raised when staged files could not be loaded into Snowflake."""
+
+
+@dataclass(frozen=True)
+class FileFormat:
+    """Named Snowflake file format describing how the extract was staged."""
+
+    name: str
+    type: str
+    skip_header: int = 0
+    date_format: str = "AUTO"
+    # The source CSV carries total columns that raw_sales_data does not have
+    error_on_column_count_mismatch: bool = True
+
+    def ddl(self) -> str:
+        """Return the statement creating the file format."""
+        options = [f"TYPE = {self.type}"]
+        if self.type == "CSV":
+            options += [
+                f"SKIP_HEADER = {self.skip_header}",
+                "FIELD_OPTIONALLY_ENCLOSED_BY = '\"'",
+                f"DATE_FORMAT = '{self.date_format}'",
+                "ERROR_ON_COLUMN_COUNT_MISMATCH = "
+                + str(self.error_on_column_count_mismatch).upper(),
+            ]
+        return f"CREATE OR REPLACE FILE FORMAT {self.name} {' '.join(options)}"
+
+
+FILE_FORMATS = {
+    # The downloaded (or cleaned) extract, with its header and M/D/YYYY dates
+    "csv": FileFormat(
+        "SALES_CSV",
+        "CSV",
+        skip_header=1,
+        date_format="MM/DD/YYYY",
+        error_on_column_count_mismatch=False,
+    ),
+    # Partitions are written without a header and with ISO dates
+    "csv_partition": FileFormat("SALES_CSV_PARTITION", "CSV", date_format="YYYY-MM-DD"),
+    "parquet": FileFormat("SALES_PARQUET", "PARQUET"),
+}
+
+
+def select_file_format(staging_format: str, partition_by: str = "none") -> FileFormat:
+    """Return the file format of the extract as staged with the given settings."""
+    if staging_format == "csv" and partition_by != "none":
+        return FILE_FORMATS["csv_partition"]
+    return FILE_FORMATS[staging_format]
+
+
+@dataclass
+class CopyFileResult:
+    """Outcome of loading one staged file, as reported by COPY INTO."""
+
+    file: str
+    status: str
+    rows_parsed: int = 0
+    rows_loaded: int = 0
+    errors_seen: int = 0
+    first_error: str | None = None
+    first_error_line: int | None = None
+    first_error_column: str | None = None
+
+    @classmethod
+    def from_row(cls, row: dict) -> "CopyFileResult":
+        """Read a result row of COPY INTO, keyed by lowercase column name."""
+        return cls(
+            file=row["file"],
+            status=row["status"],
+            rows_parsed=row.get("rows_parsed") or 0,
+            rows_loaded=row.get("rows_loaded") or 0,
+            errors_seen=row.get("errors_seen") or 0,
+            first_error=row.get("first_error"),
+            first_error_line=row.get("first_error_line"),
+            first_error_column=row.get("first_error_column_name"),
+        )
+
+
+def parse_copy_results(rows: Iterable[dict]) -> list[CopyFileResult]:
+    """Parse the result rows of COPY INTO; files skipped as already loaded have none."""
+    return [CopyFileResult.from_row(row) for row in rows if "file" in row]
+
+
+@dataclass
+class LoadReport:
+    """Outcome of a direct load and the result of each file COPY INTO processed."""
+
+    table: str
+    staged: int
+    stage_seconds: float
+    copy_seconds: float
+    files: list[CopyFileResult]
+
+    @property
+    def duration(self) -> float:
+        """Seconds spent staging and copying."""
+        return self.stage_seconds + self.copy_seconds
+
+    @property
+    def rows_copied(self) -> int:
+        """Rows loaded into the table."""
+        return sum(result.rows_loaded for result in self.files)
+
+    @property
+    def rows_skipped(self) -> int:
+        """Rows parsed but rejected, or in files that failed to load."""
+        return sum(result.rows_parsed - result.rows_loaded for result in self.files)
+
+    @property
+    def failed_files(self) -> list[CopyFileResult]:
+        """Files of which nothing was loaded."""
+        return [result for result in self.files if result.status == LOAD_FAILED_STATUS]
+
+    @property
+    def succeeded(self) -> bool:
+        """Whether every processed file was loaded, if only partially."""
+        return not self.failed_files
+
+    def to_dict(self) -> dict:
+        """Return the report as plain data, e.g. to serialize it as JSON."""
+        return asdict(self)
+
+
+class LoadBackend(Protocol):
+    """Runs the stage, PUT and COPY INTO steps of a direct load."""
+
+    def create_stage(self, stage: str, file_format: FileFormat) -> None:
+        """Create the stage and the file format if they do not exist."""
+
+    def put(self, path: Path, location: str) -> dict:
+        """Upload a local file to a stage location; returns the PUT result row."""
+
+    def copy_into(
+        self,
+        table: str,
+        stage: str,
+        files: list[str],
+        file_format: FileFormat,
+        on_error: str,
+    ) -> list[dict]:
+        """Load staged files into the table; returns the COPY INTO result rows."""
+
+
+class SnowflakeBackend:
+    """Runs the direct load over a Snowflake connection; cursors are opened per statement."""
+
+    def __init__(self, connection: snowflake.connector.SnowflakeConnection) -> None:
+        self.connection = connection
+
+    def execute(self, statement: str) -> list[dict]:
+        """Execute a statement; returns its rows keyed by lowercase column name."""
+        with self.connection.cursor() as cursor:
+            cursor.execute(statement)
+            columns = [column[0].lower() for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def create_stage(self, stage: str, file_format: FileFormat) -> None:
+        """Create the stage and the file format if they do not exist."""
+        self.execute(f"CREATE STAGE IF NOT EXISTS {stage}")
+        self.execute(file_format.ddl())
+
+    def put(self, path: Path, location: str) -> dict:
+        """Upload a local file to a stage location; returns the PUT result row."""
+        (row,) = self.execute(
+            f"PUT 'file://{path.resolve().as_posix()}' '@{location}' "
+            "AUTO_COMPRESS = TRUE OVERWRITE = TRUE",
+        )
+        return row
+
+    def copy_into(
+        self,
+        table: str,
+        stage: str,
+        files: list[str],
+        file_format: FileFormat,
+        on_error: str,
+    ) -> list[dict]:
+        """Load staged files into the table; returns the COPY INTO result rows."""
+        file_list = ", ".join(f"'{name}'" for name in files)
+        if file_format.type == "PARQUET":
+            source = f"@{stage}"
+        else:
+            # Name the raw columns, leaving the load timestamp to be stamped after the load
+            fields = ", ".join(f"${position}" for position in range(1, len(SALES_SCHEMA) + 1))
+            source = f"(SELECT {fields} FROM @{stage})"  # noqa: S608
+            table = f"{table} ({', '.join(SALES_SCHEMA.names)})"
+        statement = (
+            f"COPY INTO {table} FROM {source} FILES = ({file_list}) "
+            f"FILE_FORMAT = (FORMAT_NAME = {file_format.name}) ON_ERROR = {on_error}"
+        )
+        if file_format.type == "PARQUET":
+            statement += " MATCH_BY_COLUMN_NAME = CASE_INSENSITIVE"
+        return self.execute(statement)
+
+
+def stamp_loaded_rows(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    table: str = RAW_TABLE,
+) -> int:
+    """Set the load timestamp of the rows that have none yet; returns how many were set.
+
+    Snowflake cannot add a column with a CURRENT_TIMESTAMP default to an existing table, so
+    the rows of both loaders are stamped once their load finished, in a single statement.
+    Incremental dbt models read the rows stamped since their last run.
+    """
+    cursor.execute(
+        f"UPDATE {table} SET {LOADED_AT_COLUMN} = CURRENT_TIMESTAMP() "  # noqa: S608
+        f"WHERE {LOADED_AT_COLUMN} IS NULL",
+    )
+    return cursor.rowcount or 0
+
+
+# Snowflake date formats of FILE_FORMATS and their strptime equivalents
+DATE_FORMATS = {"MM/DD/YYYY": "%m/%d/%Y", "YYYY-MM-DD": "%Y-%m-%d"}
+SQLITE_TYPES = {pa.int64(): "INTEGER", pa.float64(): "REAL", pa.date32(): "DATE"}
+
+
+def _converters(file_format: FileFormat) -> list[Callable[[object], object]]:
+    """Return a function per raw column that coerces a field like COPY INTO does."""
+    date_format = DATE_FORMATS.get(file_format.date_format, "%Y-%m-%d")
+
+    def to_date(value: object) -> str:
+        if isinstance(value, date):
+            return value.isoformat()
+        return datetime.strptime(value, date_format).replace(tzinfo=UTC).date().isoformat()
+
+    converters = {pa.int64(): int, pa.float64(): float, pa.date32(): to_date}
+    return [converters.get(field.type, str) for field in SALES_SCHEMA]
+
+
+def _coerce_row(
+    fields: list,
+    converters: list[Callable[[object], object]],
+    file_format: FileFormat,
+) -> tuple[tuple | None, dict | None]:
+    """Coerce the fields of a row to the raw columns; returns the row or the error."""
+    if len(fields) < len(converters) or (
+        len(fields) > len(converters) and file_format.error_on_column_count_mismatch
+    ):
+        return None, {
+            "first_error": f"Number of columns in file ({len(fields)}) does not match that "
+            f"of the corresponding table ({len(converters)})",
+            "first_error_column_name": f'"{RAW_TABLE.upper()}"',
+        }
+    row = []
+    for field, convert, value in zip(SALES_SCHEMA, converters, fields):
+        try:
+            row.append(None if value in ("", None) else convert(value))
+        except ValueError as error:
+            return None, {
+                "first_error": str(error),
+                "first_error_column_name": f'"{RAW_TABLE.upper()}"["{field.name.upper()}"]',
+            }
+    return tuple(row), None
+
+
+class LocalBackend:
+    """Offline stand-in for Snowflake that stages into a folder and loads into SQLite.
+
+    It only knows the raw_sales_data layout. Like Snowflake, it compresses staged CSV files,
+    keeps load metadata so unchanged files are not loaded twice, and reports per file.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.database = root / "snowflake.db"
+        self.file_formats: dict[str, FileFormat] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return sqlite3.connect(self.database)
+
+    def create_stage(self, stage: str, file_format: FileFormat) -> None:
+        """Create the stage folder, the raw table and the load metadata, if missing."""
+        (self.root / stage).mkdir(parents=True, exist_ok=True)
+        self.file_formats[file_format.name] = file_format
+        columns = ", ".join(
+            f"{field.name} {SQLITE_TYPES.get(field.type, 'TEXT')}" for field in SALES_SCHEMA
+        )
+        with closing(self._connect()) as db, db:
+            db.execute(f"CREATE TABLE IF NOT EXISTS {RAW_TABLE} ({columns})")
+            db.execute("CREATE TABLE IF NOT EXISTS load_history (file TEXT, digest TEXT)")
+
+    def put(self, path: Path, location: str) -> dict:
+        """Copy a file into the stage folder, gzipping CSV files; returns the PUT result row."""
+        target_dir = self.root / location
+        target_dir.mkdir(parents=True, exist_ok=True)
+        compress = path.suffix != ".parquet"
+        target = target_dir / (f"{path.name}.gz" if compress else path.name)
+        with path.open("rb") as source, target.open("wb") as destination:
+            if compress:
+                # A fixed mtime keeps the staged bytes, and so the load metadata, stable
+                with gzip.GzipFile(fileobj=destination, mode="wb", mtime=0) as compressed:
+                    shutil.copyfileobj(source, compressed)
+            else:
+                shutil.copyfileobj(source, destination)
+        return {
+            "source": path.name,
+            "target": target.name,
+            "source_size": path.stat().st_size,
+            "target_size": target.stat().st_size,
+            "source_compression": "NONE" if compress else "PARQUET",
+            "target_compression": "GZIP" if compress else "PARQUET",
+            "status": "UPLOADED",
+            "message": "",
+        }
+
+    def _read_rows(self, path: Path, file_format: FileFormat) -> Iterable[list]:
+        if file_format.type == "PARQUET":
+            table = pq.read_table(path)
+            names = {name.lower(): name for name in table.column_names}
+            for row in table.to_pylist():
+                yield [row.get(names.get(field.name)) for field in SALES_SCHEMA]
+            return
+        with gzip.open(path, "rt", newline="") as text:
+            reader = csv.reader(text)
+            for _ in range(file_format.skip_header):
+                next(reader, None)
+            yield from reader
+
+    def _parse_file(
+        self,
+        path: Path,
+        file_format: FileFormat,
+    ) -> tuple[list[tuple], int, dict | None]:
+        """Coerce the rows of a staged file; returns the valid rows, row count and first error."""
+        converters = _converters(file_format)
+        rows, parsed, first_error = [], 0, None
+        for parsed, fields in enumerate(self._read_rows(path, file_format), start=1):
+            row, error = _coerce_row(fields, converters, file_format)
+            if error is None:
+                rows.append(row)
+            elif first_error is None:
+                first_error = {**error, "first_error_line": parsed + file_format.skip_header}
+        return rows, parsed, first_error
+
+    def copy_into(
+        self,
+        table: str,
+        stage: str,
+        files: list[str],
+        file_format: FileFormat,
+        on_error: str,
+    ) -> list[dict]:
+        """Load staged files into the table; returns the COPY INTO result rows."""
+        if file_format.name not in self.file_formats:
+            raise LoadError(f"File format '{file_format.name}' does not exist")
+        results = []
+        with closing(self._connect()) as db, db:
+            loaded = set(db.execute("SELECT file, digest FROM load_history").fetchall())
+            for name in files:
+                path = self.root / stage / name
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()
+                if (name, digest) in loaded:
+                    continue
+                rows, parsed, error = self._parse_file(path, file_format)
+                errors = parsed - len(rows)
+                if errors and on_error == "ABORT_STATEMENT":
+                    raise LoadError(f"{error['first_error']} in {name}")
+                status = "LOADED"
+                if errors:
+                    status = "PARTIALLY_LOADED" if on_error == "CONTINUE" else LOAD_FAILED_STATUS
+                if status != LOAD_FAILED_STATUS:
+                    placeholders = ", ".join("?" * len(SALES_SCHEMA))
+                    db.executemany(f"INSERT INTO {table} VALUES ({placeholders})", rows)  # noqa: S608
+                    db.execute("INSERT INTO load_history VALUES (?, ?)", (name, digest))
+                results.append(
+                    {
+                        "file": f"{stage.lower()}/{name}",
+                        "status": status,
+                        "rows_parsed": parsed,
+                        "rows_loaded": len(rows) if status != LOAD_FAILED_STATUS else 0,
+                        "error_limit": 1 if on_error == "SKIP_FILE" else parsed,
+                        "errors_seen": errors,
+                        **(error or {}),
+                    },
+                )
+        return results or [{"status": NO_FILES_STATUS}]
+
+
+def stage_files(
+    backend: LoadBackend,
+    files: list[tuple[str, Path]],
+    stage: str = STAGE_NAME,
+    max_workers: int = 4,
+) -> list[str]:
+    """PUT local files to their folders of the stage concurrently; returns the staged names."""
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(backend.put, path, f"{stage}/{folder}".rstrip("/"))
+            for folder, path in files
+        ]
+        rows = [future.result() for future in futures]
+    return [
+        f"{folder}/{row['target']}" if folder else row["target"]
+        for (folder, _), row in zip(files, rows)
+    ]
+
+
+def log_load_report(report: LoadReport) -> None:
+    """Log a summary of the load and the first error of each file with rejected rows."""
+    logger.info(
+        "Loaded %d rows (%d rejected) from %d of %d staged files into %s; "
+        "staged in %.1fs, copied in %.1fs",
+        report.rows_copied,
+        report.rows_skipped,
+        len(report.files),
+        report.staged,
+        report.table,
+        report.stage_seconds,
+        report.copy_seconds,
+    )
+    for result in report.files:
+        if result.errors_seen:
+            logger.warning(
+                "%s %s with %d errors, first at line %s (%s): %s",
+                result.file,
+                result.status,
+                result.errors_seen,
+                result.first_error_line,
+                result.first_error_column,
+                result.first_error,
+            )
+
+
+def load_files(
+    backend: LoadBackend,
+    files: list[tuple[str, Path]],
+    file_format: FileFormat,
+    *,
+    table: str = RAW_TABLE,
+    stage: str = STAGE_NAME,
+    on_error: str = "CONTINUE",
+    max_workers: int = 4,
+) -> LoadReport:
+    """Stage local files and load them into the table with COPY INTO.
+
+    ``files`` pairs each file with its folder on the stage, so that partition files of the
+    same name do not overwrite each other. Raises ``LoadError`` if a file failed to load.
+    """
+    if on_error not in ON_ERROR_OPTIONS:
+        raise ValueError(f"Unknown ON_ERROR option: {on_error}")
+    backend.create_stage(stage, file_format)
+
+    started = time.perf_counter()
+    staged = stage_files(backend, files, stage, max_workers)
+    copy_started = time.perf_counter()
+    results = parse_copy_results(
+        backend.copy_into(table, stage, staged, file_format, on_error),
+    )
+    report = LoadReport(
+        table=table,
+        staged=len(staged),
+        stage_seconds=copy_started - started,
+        copy_seconds=time.perf_counter() - copy_started,
+        files=results,
+    )
+    log_load_report(report)
+    if not report.succeeded:
+        failed = ", ".join(result.file for result in report.failed_files)
+        raise LoadError(f"Failed to load {failed} into {table}")
+    return report
@@ -0,0 +1,279 @@
+"""Local cleaning and deduplication of the sales extract before it is loaded.
+
+The extract is read as text in record batches. Each row is validated column by column: the
+text columns must be present, the dates must parse as M/D/YYYY and the numeric columns
+must coerce to their raw types. Rows that fail are written to a quarantine CSV with the
+reasons, instead of being dropped silently by the ADF sink's ``ON_ERROR: CONTINUE``.
+
+Duplicate order IDs are resolved with the rule of ``raw_sales_data_clean``: the row with
+the earliest order date wins, ties going to the row that comes first in the file. This
+takes two streaming passes. The first finds the winning row of every order ID, and the
+second writes the winners and quarantines the rest. Only the batch being processed and
+two integers per distinct order ID are held in memory.
+
+Run ``python -m utils.cleaning SOURCE DESTINATION`` to clean a file.
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from utils.logger import get_logger
+from utils.sales_data import (
+    CSV_BLOCK_SIZE,
+    DATE_COLUMNS,
+    DICTIONARY_COLUMNS,
+    RAW_COLUMNS,
+    SALES_SCHEMA,
+    SOURCE_DATE_FORMAT,
+    to_source_batch,
+)
+
+logger = get_logger()
+
+# A row's dedup key packs (order date, row index) into one integer, so that the minimum key
+# per order ID is the earliest order, ties broken by file order
+ROW_INDEX_BITS = 40
+# Compact the per-batch winners once this many candidates have piled up
+COMPACT_THRESHOLD = 4_000_000
+
+INTEGER_PATTERN = r"^[+-]?\d+$"
+DECIMAL_PATTERN = r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+
+QUARANTINE_SCHEMA = pa.schema(
+    [
+        ("row_index", pa.int64()),
+        ("reason", pa.string()),
+        *((name, pa.string()) for name in RAW_COLUMNS),
+    ],
+)
+
+
+@dataclass
+class CleaningReport:
+    """Summary of a cleaning run."""
+
+    source: Path
+    destination: Path
+    quarantine: Path
+    rows_read: int
+    rows_written: int
+    rejected: int
+    duplicates: int
+    seconds: float
+
+
+def _open_text_csv(source: Path, invalid_rows: list | None = None) -> pa_csv.CSVStreamingReader:
+    """Open the extract with every raw column as text, skipping rows with a wrong width."""
+
+    def handle_invalid_row(row: pa_csv.InvalidRow) -> str:
+        if invalid_rows is not None:
+            invalid_rows.append(row)
+        return "skip"
+
+    return pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(invalid_row_handler=handle_invalid_row),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(RAW_COLUMNS),
+            column_types=dict.fromkeys(RAW_COLUMNS, pa.string()),
+        ),
+    )
+
+
+def _coerce(text: pa.Array, raw_name: str) -> tuple[pa.Array, pa.Array]:
+    """Coerce a text column to its raw type; returns the values and a mask of failures."""
+    text = pc.utf8_trim_whitespace(text)
+    if raw_name in DATE_COLUMNS:
+        timestamps = pc.strptime(text, format=SOURCE_DATE_FORMAT, unit="s", error_is_null=True)
+        values = timestamps.cast(pa.date32())
+    elif raw_name in DICTIONARY_COLUMNS:
+        values = pc.if_else(pc.equal(text, ""), pa.scalar(None, pa.string()), text)
+    else:
+        raw_type = SALES_SCHEMA.field(raw_name).type
+        try:
+            values = text.cast(raw_type)
+        except pa.ArrowInvalid:
+            # Some value does not parse; find the culprits row by row only in that case
+            pattern = INTEGER_PATTERN if pa.types.is_integer(raw_type) else DECIMAL_PATTERN
+            valid = pc.match_substring_regex(text, pattern)
+            values = pc.if_else(valid, text, pa.scalar(None, pa.string())).cast(raw_type)
+    return values, pc.is_null(values)
+
+
+def clean_batch(batch: pa.RecordBatch) -> tuple[pa.RecordBatch, pa.Array, pa.Array]:
+    """Validate and coerce a text batch.
+
+    Returns the coerced SALES_SCHEMA-named batch (with plain text instead of dictionaries),
+    the rejection reason of each row (empty if valid) and the mask of valid rows.
+    """
+    columns, reasons = [], []
+    for source_name, text in zip(batch.schema.names, batch.columns):
+        raw_name = RAW_COLUMNS[source_name]
+        values, failed = _coerce(text, raw_name)
+        problem = "missing" if raw_name in DICTIONARY_COLUMNS else "invalid"
+        reasons.append(pc.if_else(failed, f"{problem} {raw_name}; ", pa.scalar(None, pa.string())))
+        columns.append(values)
+
+    joined = pc.binary_join_element_wise(*reasons, "", null_handling="replace", null_replacement="")
+    reason = pc.utf8_rtrim(joined, characters="; ")
+    valid = pc.equal(reason, "")
+    names = [RAW_COLUMNS[name] for name in batch.schema.names]
+    return pa.RecordBatch.from_arrays(columns, names=names), reason, valid
+
+
+def _dedup_keys(batch: pa.RecordBatch, first_row: int) -> pa.Array:
+    """Pack each row's order date and global row index into one sortable key."""
+    # Rows with an invalid order date are filtered out afterwards, any placeholder will do
+    days = batch.column("order_date").cast(pa.int32()).fill_null(0).to_numpy()
+    row_index = np.arange(first_row, first_row + batch.num_rows, dtype=np.int64)
+    return pa.array((days.astype(np.int64) << ROW_INDEX_BITS) | row_index)
+
+
+def _min_key_per_order(candidates: list[pa.Table]) -> pa.Table:
+    """Reduce (order_id, key) candidates to the minimum key of each order ID."""
+    return (
+        pa.concat_tables(candidates)
+        .group_by("order_id", use_threads=False)
+        .aggregate([("key", "min")])
+        .rename_columns(["order_id", "key"])
+    )
+
+
+def find_winning_rows(source: Path) -> np.ndarray:
+    """First pass: return the sorted global indices of the rows that survive deduplication."""
+    candidates: list[pa.Table] = []
+    pending = 0
+    first_row = 0
+    for text_batch in _open_text_csv(source):
+        batch, _, valid = clean_batch(text_batch)
+        keys = _dedup_keys(batch, first_row)
+        first_row += batch.num_rows
+
+        rows = pa.table({"order_id": batch.column("order_id"), "key": keys}).filter(valid)
+        candidates.append(_min_key_per_order([rows]))
+        pending += candidates[-1].num_rows
+        if pending > COMPACT_THRESHOLD and len(candidates) > 1:
+            candidates = [_min_key_per_order(candidates)]
+            pending = candidates[0].num_rows
+
+    if not candidates:
+        return np.array([], dtype=np.int64)
+    keys = _min_key_per_order(candidates).column("key").to_numpy()
+    return np.sort(keys & ((1 << ROW_INDEX_BITS) - 1))
+
+
+def _quarantine_batch(
+    text_batch: pa.RecordBatch,
+    first_row: int,
+    mask: pa.Array,
+    reason: pa.Array,
+) -> pa.RecordBatch:
+    row_index = pa.array(np.arange(first_row, first_row + text_batch.num_rows, dtype=np.int64))
+    columns = [row_index, reason, *text_batch.columns]
+    return pa.RecordBatch.from_arrays(columns, schema=QUARANTINE_SCHEMA).filter(mask)
+
+
+def _invalid_rows_batch(invalid_rows: list) -> pa.RecordBatch:
+    """Quarantine rows the CSV parser skipped because they had the wrong number of fields."""
+    reasons = [
+        f"malformed line {row.number}: expected {row.expected_columns} fields, "
+        f"got {row.actual_columns}: {row.text}"
+        for row in invalid_rows
+    ]
+    arrays = [pa.nulls(len(reasons), pa.int64()), pa.array(reasons, pa.string())]
+    arrays += [pa.nulls(len(reasons), pa.string()) for _ in RAW_COLUMNS]
+    return pa.RecordBatch.from_arrays(arrays, schema=QUARANTINE_SCHEMA)
+
+
+def clean_extract(source: Path, destination: Path, quarantine: Path) -> CleaningReport:
+    """Write the valid, deduplicated rows of ``source`` to ``destination`` in source format.
+
+    Rejected and duplicate rows go to ``quarantine`` with their original text and reasons.
+    """
+    started = time.perf_counter()
+    winners = find_winning_rows(source)
+
+    rows_read = rows_written = rejected = duplicates = 0
+    invalid_rows: list[pa_csv.InvalidRow] = []
+    writer = None
+    try:
+        with pa_csv.CSVWriter(quarantine, QUARANTINE_SCHEMA) as quarantine_writer:
+            for text_batch in _open_text_csv(source, invalid_rows):
+                batch, reason, valid = clean_batch(text_batch)
+                first_row, rows_read = rows_read, rows_read + batch.num_rows
+
+                # Winners that fall into this batch, as positions within the batch
+                low, high = np.searchsorted(winners, [first_row, rows_read])
+                keep = np.zeros(batch.num_rows, dtype=bool)
+                keep[winners[low:high] - first_row] = True
+                keep = pa.array(keep)
+                duplicate = pc.and_(valid, pc.invert(keep))
+                reason = pc.if_else(duplicate, "duplicate order_id", reason)
+
+                clean = to_source_batch(batch.filter(keep))
+                if clean.num_rows:
+                    writer = writer or pa_csv.CSVWriter(destination, clean.schema)
+                    writer.write_batch(clean)
+                quarantine_writer.write_batch(
+                    _quarantine_batch(text_batch, first_row, pc.invert(keep), reason),
+                )
+                rows_written += clean.num_rows
+                duplicates += pc.sum(duplicate).as_py() or 0
+                rejected += batch.num_rows - (pc.sum(valid).as_py() or 0)
+
+            if invalid_rows:
+                quarantine_writer.write_batch(_invalid_rows_batch(invalid_rows))
+                rejected += len(invalid_rows)
+    finally:
+        if writer:
+            writer.close()
+    if writer is None:
+        # No valid rows at all; still leave a file with the header for the next stage
+        destination.write_text(",".join(f'"{name}"' for name in RAW_COLUMNS) + "\n")
+
+    report = CleaningReport(
+        source,
+        destination,
+        quarantine,
+        rows_read + len(invalid_rows),
+        rows_written,
+        rejected,
+        duplicates,
+        time.perf_counter() - started,
+    )
+    logger.info(
+        "Cleaned %s: %d rows read, %d written, %d rejected, %d duplicates in %.2fs",
+        source,
+        report.rows_read,
+        report.rows_written,
+        report.rejected,
+        report.duplicates,
+        report.seconds,
+    )
+    if report.rejected or report.duplicates:
+        logger.warning("Quarantined %d rows in %s", report.rejected + report.duplicates, quarantine)
+    return report
+
+
+def main() -> None:
+    """Clean an extract from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", type=Path)
+    parser.add_argument("destination", type=Path)
+    parser.add_argument("--quarantine", type=Path)
+    args = parser.parse_args()
+
+    quarantine = args.quarantine or args.destination.with_suffix(".quarantine.csv")
+    clean_extract(args.source, args.destination, quarantine)
+
+
+if __name__ == "__main__":
+    main()
@@ -31,6 +31,93 @@ def get_azure_details() -> dict[str, str]:
     }
 
 
+def get_upload_settings() -> dict[str, str | int | bool]:
+    """Get blob upload settings.
+
+    "streaming" stages blocks of the local CSV concurrently; "pipelined" also skips the
+    local download and streams the archive from HTTP straight into the block uploader.
+    "force" re-uploads (and reloads) blobs whose content digest has not changed.
+    """
+    return {
+        "mode": os.getenv("AZURE_UPLOAD_MODE", "single"),
+        "block_size": int(os.getenv("AZURE_UPLOAD_BLOCK_SIZE", str(8 * 1024 * 1024))),
+        "max_workers": int(os.getenv("AZURE_UPLOAD_WORKERS", "4")),
+        "force": os.getenv("AZURE_UPLOAD_FORCE", "false").lower() in ("1", "true", "yes"),
+    }
+
+
+def get_staging_settings() -> dict[str, str | bool]:
+    """Get how the extract is staged in blob storage.
+
+    "format" is "csv" or "parquet"; "partition_by" is "none", "year" or "month" of order_date.
+    "clean" validates and deduplicates the extract locally before it is staged.
+    """
+    return {
+        "format": os.getenv("AZURE_STAGING_FORMAT", "csv"),
+        "parquet_compression": os.getenv("PARQUET_COMPRESSION", "snappy"),
+        "partition_by": os.getenv("PARTITION_BY", "none"),
+        "clean": os.getenv("CLEAN_EXTRACT", "false").lower() in ("1", "true", "yes"),
+    }
+
+
+def get_download_settings() -> dict[str, int]:
+    """Get settings for the ranged source downloader."""
+    return {
+        "segment_size": int(os.getenv("DOWNLOAD_SEGMENT_SIZE", str(8 * 1024 * 1024))),
+        "max_workers": int(os.getenv("DOWNLOAD_WORKERS", "4")),
+    }
+
+
+def get_copy_settings() -> dict[str, str | int | bool]:
+    """Get settings of the ADF copy activity.
+
+    "throughput_profile" is "small", "bulk", "backfill", or "auto" to pick one by the size
+    of the data to copy. "state_file" records the digests of the deployed factory resources;
+    if empty, they are read from the factory on every deployment. "incremental" only copies
+    the blobs modified since the last successful copy. "fan_out" copies each partition of a
+    partitioned extract separately, "batch_count" of them at a time.
+    """
+    return {
+        "throughput_profile": os.getenv("ADF_THROUGHPUT_PROFILE", "auto"),
+        "state_file": os.getenv("ADF_STATE_FILE", "data/adf_state.json"),
+        "incremental": os.getenv("ADF_INCREMENTAL", "true").lower() in ("1", "true", "yes"),
+        "fan_out": os.getenv("ADF_FAN_OUT", "false").lower() in ("1", "true", "yes"),
+        "batch_count": int(os.getenv("ADF_FAN_OUT_BATCH_COUNT", "8")),
+    }
+
+
+def get_load_settings() -> dict[str, str | int]:
+    """Get how the staged extract is loaded into Snowflake.
+
+    "loader" is "adf" (copy activity from blob storage) or "direct" (PUT to a Snowflake stage
+    and COPY INTO, bypassing ADF). The direct loader stages "put_workers" files at a time and
+    handles rejected rows per "on_error": "CONTINUE", "SKIP_FILE" or "ABORT_STATEMENT". Its
+    "backend" is "snowflake", or "local" for an offline stand-in kept under "local_root".
+    """
+    return {
+        "loader": os.getenv("LOADER", "adf"),
+        "put_workers": int(os.getenv("SNOWFLAKE_PUT_WORKERS", "4")),
+        "on_error": os.getenv("SNOWFLAKE_COPY_ON_ERROR", "CONTINUE"),
+        "backend": os.getenv("SNOWFLAKE_LOADER_BACKEND", "snowflake"),
+        "local_root": os.getenv("SNOWFLAKE_LOCAL_ROOT", "data/local_snowflake"),
+    }
+
+
+def get_session_settings() -> dict[str, int | float | bool]:
+    """Get the settings of the shared Snowflake session pool.
+
+    At most "pool_size" connections are open; a caller waits up to "checkout_timeout" seconds
+    for one. A connection idle for longer than "health_check_interval" seconds is probed
+    before reuse, and "keep_alive" stops idle sessions from expiring.
+    """
+    return {
+        "pool_size": int(os.getenv("SNOWFLAKE_POOL_SIZE", "4")),
+        "checkout_timeout": float(os.getenv("SNOWFLAKE_POOL_TIMEOUT", "30")),
+        "health_check_interval": float(os.getenv("SNOWFLAKE_HEALTH_CHECK_INTERVAL", "300")),
+        "keep_alive": os.getenv("SNOWFLAKE_KEEP_ALIVE", "true").lower() in ("1", "true", "yes"),
+    }
+
+
 def get_snowflake_details() -> dict[str, str]:
     """Get Snowflake details."""
     return {
@@ -0,0 +1,325 @@
+"""Parallel, resumable HTTP downloads using Range requests.
+
+Large files are split into fixed-size segments fetched concurrently over a pooled session.
+Completed segments are recorded in a ``<file>.progress.json`` sidecar next to the partial
+``<file>.part`` file, so an interrupted download resumes where it stopped. Each range
+request carries ``If-Range`` with the ETag seen at the start, so a file that changes on the
+server mid-download is detected instead of being stitched together from two versions.
+
+Run ``python -m utils.download URL DESTINATION`` to benchmark against any HTTP server.
+"""
+
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from http import HTTPStatus
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+DEFAULT_SEGMENT_SIZE = 8 * 1024 * 1024
+DEFAULT_WORKERS = 4
+WRITE_CHUNK_SIZE = 256 * 1024
+REQUEST_TIMEOUT = 30
+MIB = 1024 * 1024
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed or fails verification."""
+
+
+@dataclass
+class DownloadReport:
+    """Summary of a finished download."""
+
+    url: str
+    path: Path
+    size: int
+    downloaded: int
+    resumed: int
+    segments: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second fetched over the network in this run."""
+        return self.downloaded / self.seconds if self.seconds else 0.0
+
+
+def create_session(max_workers: int = DEFAULT_WORKERS) -> requests.Session:
+    """Create a session whose connection pool fits ``max_workers`` concurrent segments."""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("HEAD", "GET"),
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _progress_path(destination: Path) -> Path:
+    return destination.with_name(destination.name + ".progress.json")
+
+
+def _part_path(destination: Path) -> Path:
+    return destination.with_name(destination.name + ".part")
+
+
+def _probe(
+    session: requests.Session,
+    url: str,
+    headers: dict[str, str],
+) -> tuple[int | None, str | None, bool]:
+    """Return the remote size, ETag and whether byte ranges are supported."""
+    try:
+        response = session.head(url, headers=headers, allow_redirects=True, timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException:
+        # Includes retries exhausted on 5xx answers and servers that drop HEAD requests
+        logger.debug("HEAD request to %s failed, falling back to a single stream", url)
+        return None, None, False
+
+    content_length = response.headers.get("Content-Length")
+    size = int(content_length) if content_length else None
+    accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return size, response.headers.get("ETag"), accepts_ranges
+
+
+def _load_progress(progress_path: Path, state: dict) -> set[int]:
+    """Return the completed segment offsets if the sidecar matches the remote file."""
+    if not progress_path.exists():
+        return set()
+    try:
+        progress = json.loads(progress_path.read_text())
+    except json.JSONDecodeError:
+        logger.warning("Ignoring unreadable progress file %s", progress_path)
+        return set()
+
+    if any(progress.get(key) != state[key] for key in ("url", "size", "etag", "segment_size")):
+        logger.info("Remote file changed since the last attempt, restarting download")
+        return set()
+    return set(progress.get("completed", []))
+
+
+def _save_progress(progress_path: Path, state: dict) -> None:
+    """Atomically replace the progress sidecar."""
+    tmp_path = progress_path.with_name(progress_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state))
+    tmp_path.replace(progress_path)
+
+
+def _fetch_segment(
+    session: requests.Session,
+    url: str,
+    part_path: Path,
+    segment: tuple[int, int],
+    headers: dict[str, str],
+    etag: str | None,
+) -> int:
+    """Download one inclusive byte range into its place in the partial file."""
+    start, end = segment
+    range_headers = {**headers, "Range": f"bytes={start}-{end}"}
+    if etag and not etag.startswith("W/"):
+        range_headers["If-Range"] = etag
+
+    written = 0
+    with session.get(url, headers=range_headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        if response.status_code != HTTPStatus.PARTIAL_CONTENT:
+            raise DownloadError(f"Server ignored range request for {url}, file may have changed")
+        with part_path.open("r+b") as part_file:
+            part_file.seek(start)
+            for chunk in response.iter_content(chunk_size=WRITE_CHUNK_SIZE):
+                part_file.write(chunk)
+                written += len(chunk)
+
+    if written != end - start + 1:
+        raise DownloadError(f"Segment {start}-{end} of {url} is incomplete ({written} bytes)")
+    return written
+
+
+def _fetch_whole(
+    session: requests.Session,
+    url: str,
+    part_path: Path,
+    headers: dict[str, str],
+    size: int | None = None,
+) -> int:
+    """Download the file in a single stream when ranges are not available.
+
+    The stream is checked against ``size`` (e.g. from the HEAD probe) or else the response's
+    Content-Length, so a connection cut short is not taken for the whole file.
+    """
+    written = 0
+    with session.get(url, headers=headers, stream=True, timeout=REQUEST_TIMEOUT) as response:
+        response.raise_for_status()
+        content_length = response.headers.get("Content-Length")
+        if size is None and content_length:
+            size = int(content_length)
+        with part_path.open("wb") as part_file:
+            for chunk in response.iter_content(chunk_size=WRITE_CHUNK_SIZE):
+                part_file.write(chunk)
+                written += len(chunk)
+
+    if size is not None and written != size:
+        raise DownloadError(f"Download of {url} is incomplete ({written} of {size} bytes)")
+    return written
+
+
+def _fetch_segments(
+    session: requests.Session,
+    url: str,
+    part_path: Path,
+    progress_path: Path,
+    state: dict,
+    headers: dict[str, str],
+    max_workers: int,
+) -> int:
+    """Fetch every segment not yet in ``state["completed"]``, recording progress as they end."""
+    size, segment_size = state["size"], state["segment_size"]
+    completed = set(state["completed"])
+    pending = [
+        (start, min(start + segment_size, size) - 1)
+        for start in range(0, size, segment_size)
+        if start not in completed
+    ]
+
+    downloaded = 0
+    errors: list[Exception] = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                _fetch_segment,
+                session,
+                url,
+                part_path,
+                segment,
+                headers,
+                state["etag"],
+            ): segment[0]
+            for segment in pending
+        }
+        for future in as_completed(futures):
+            try:
+                downloaded += future.result()
+            except (requests.RequestException, DownloadError) as exc:
+                errors.append(exc)
+                continue
+            completed.add(futures[future])
+            state["completed"] = sorted(completed)
+            _save_progress(progress_path, state)
+
+    if errors:
+        raise DownloadError(
+            f"{len(errors)} of {len(pending)} segments of {url} failed; rerun to resume",
+        ) from errors[0]
+    return downloaded
+
+
+def download_file(
+    url: str,
+    destination: Path,
+    *,
+    headers: dict[str, str] | None = None,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+    max_workers: int = DEFAULT_WORKERS,
+    session: requests.Session | None = None,
+) -> DownloadReport:
+    """Download ``url`` to ``destination``, resuming a previous partial attempt if possible."""
+    # Ranges address the encoded body, so ask for the plain representation
+    headers = {**(headers or {}), "Accept-Encoding": "identity"}
+    owns_session = session is None
+    session = session or create_session(max_workers)
+    part_path = _part_path(destination)
+    progress_path = _progress_path(destination)
+
+    try:
+        started = time.perf_counter()
+        size, etag, accepts_ranges = _probe(session, url, headers)
+
+        if size is None or not accepts_ranges:
+            logger.info("Server does not support range requests, downloading in one stream")
+            downloaded = _fetch_whole(session, url, part_path, headers, size)
+            size, resumed, segments = downloaded, 0, 1
+        else:
+            state = {
+                "url": url,
+                "size": size,
+                "etag": etag,
+                "segment_size": segment_size,
+                "completed": [],
+            }
+            completed = _load_progress(progress_path, state) if part_path.exists() else set()
+            if not completed or part_path.stat().st_size != size:
+                completed = set()
+                with part_path.open("wb") as part_file:
+                    part_file.truncate(size)
+            state["completed"] = sorted(completed)
+            _save_progress(progress_path, state)
+
+            resumed = sum(min(segment_size, size - start) for start in completed)
+            if resumed:
+                logger.info("Resuming download of %s, %.1f MiB already present", url, resumed / MIB)
+            downloaded = _fetch_segments(
+                session,
+                url,
+                part_path,
+                progress_path,
+                state,
+                headers,
+                max_workers,
+            )
+            segments = -(-size // segment_size)
+        seconds = time.perf_counter() - started
+    finally:
+        if owns_session:
+            session.close()
+
+    if part_path.stat().st_size != size:
+        raise DownloadError(f"Downloaded size of {url} does not match the expected {size} bytes")
+    part_path.replace(destination)
+    progress_path.unlink(missing_ok=True)
+
+    report = DownloadReport(url, destination, size, downloaded, resumed, segments, seconds)
+    logger.info(
+        "Downloaded %s: %.1f MiB in %.2fs (%.1f MiB/s, %d segments)",
+        destination,
+        size / MIB,
+        seconds,
+        report.throughput / MIB,
+        segments,
+    )
+    return report
+
+
+def main() -> None:
+    """Download a URL from the command line and report the throughput."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("url")
+    parser.add_argument("destination", type=Path)
+    parser.add_argument("--segment-size", type=int, default=DEFAULT_SEGMENT_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    args = parser.parse_args()
+
+    download_file(
+        args.url,
+        args.destination,
+        segment_size=args.segment_size,
+        max_workers=args.workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
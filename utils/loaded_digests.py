@@ -0,0 +1,62 @@
+"""Content digests of the staged blobs as of their last successful load.
+
+An upload skips blobs whose content did not change, but whether the load has to run again
+depends on what was last loaded, not on what was last uploaded: a load or a dbt run that
+failed must be retried by the next run even though the blobs are now unchanged. Once the
+load and the transformations succeeded, the digests of the loaded blobs are merged into a
+JSON blob next to the staged data. A blob is pending while its digest differs from the
+recorded one.
+
+The record is kept in its own blob rather than in the staged blobs' metadata, because
+setting metadata changes a blob's Last-Modified and would move it into the next load window.
+"""
+
+import json
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContainerClient
+
+from utils.logger import get_logger
+from utils.sales_data import partition_prefix
+
+logger = get_logger()
+
+
+def loaded_digests_blob(blob_name: str) -> str:
+    """Return the blob recording the content digest of each loaded blob."""
+    return f"{partition_prefix(blob_name)}/_loaded_digests.json"
+
+
+def read_loaded_digests(container_client: ContainerClient, blob_name: str) -> dict[str, str]:
+    """Return the digest of each blob as of its last successful load, by blob name."""
+    try:
+        content = container_client.download_blob(loaded_digests_blob(blob_name)).readall()
+    except ResourceNotFoundError:
+        return {}
+    return json.loads(content)
+
+
+def pending_blobs(
+    digests: dict[str, str],
+    loaded: dict[str, str],
+    *,
+    force: bool = False,
+) -> list[str]:
+    """Return the blobs whose content was not loaded yet; all of them with ``force``."""
+    return sorted(name for name, digest in digests.items() if force or loaded.get(name) != digest)
+
+
+def record_loaded_digests(
+    container_client: ContainerClient,
+    blob_name: str,
+    digests: dict[str, str | None],
+) -> None:
+    """Merge the digests of blobs that were loaded successfully into the record."""
+    loaded = read_loaded_digests(container_client, blob_name)
+    loaded.update({name: digest for name, digest in digests.items() if digest})
+    container_client.upload_blob(
+        loaded_digests_blob(blob_name),
+        json.dumps(dict(sorted(loaded.items())), indent=2),
+        overwrite=True,
+    )
+    logger.info("Recorded %d blobs as loaded", len(digests))
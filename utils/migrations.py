@@ -0,0 +1,319 @@
+"""Versioned schema migrations with a checksummed ledger in Snowflake.
+
+Migrations are SQL scripts named ``V<version>__<description>.sql`` under
+``db_schema/migrations``. The ledger table ``SCHEMA_MIGRATIONS`` records the version,
+checksum and duration of every applied script. It also records a fingerprint of the live
+schema as of the last time migrations were applied: a hash of the columns of the tables the
+scripts create or alter. Other tables of the schema, such as the ones dbt builds there, are
+left out, so they do not show up as drift.
+
+A run starts with a single metadata query, which reads the ledger together with the
+current fingerprint. Only scripts that are new, or whose checksum changed, are applied. If
+there are none, the run ends there. Otherwise all pending scripts are applied in version
+order as one batch (see ``utils.sql_script``), and the scripts that succeeded are recorded
+in a second batch. The first failing statement stops the run: its script is not recorded
+and is retried by the next run, and the later scripts are neither applied nor recorded,
+since they may depend on it.
+
+When nothing is pending but the live fingerprint differs from the recorded one, the schema
+was changed outside the migrations. The drift is reported, not repaired.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+
+import snowflake.connector
+
+from utils.logger import get_logger
+from utils.sql_script import (
+    SUCCESS_STATUS,
+    Statement,
+    apply_statements,
+    log_apply_report,
+    split_statements,
+)
+
+logger = get_logger()
+
+MIGRATIONS_DIR = Path("db_schema/migrations")
+LEDGER_TABLE = "SCHEMA_MIGRATIONS"
+MIGRATION_NAME = re.compile(r"V(?P<version>\d+)__(?P<description>\w+)\.sql")
+TABLE_STATEMENT = re.compile(
+    r"(?:CREATE(?:\s+OR\s+REPLACE)?|ALTER)\s+TABLE\s+(?:IF\s+(?:NOT\s+)?EXISTS\s+)?"
+    r"(?P<name>[\w.$]+)",
+    re.IGNORECASE,
+)
+
+
+class MigrationError(Exception):
+    """Raised when migrations could not be applied or recorded."""
+
+
+@dataclass(frozen=True)
+class Migration:
+    """A versioned migration script."""
+
+    version: int
+    description: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        """SHA-256 of the script, insensitive to line endings and surrounding whitespace."""
+        normalized = "\n".join(line.rstrip() for line in self.sql.strip().splitlines())
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    @property
+    def statements(self) -> list[Statement]:
+        """The statements of the script."""
+        return split_statements(self.sql)
+
+    @property
+    def tables(self) -> set[str]:
+        """Names of the tables the script creates or alters, upper-cased and unqualified."""
+        return {
+            match["name"].rsplit(".", 1)[-1].upper()
+            for statement in self.statements
+            if (match := TABLE_STATEMENT.match(statement.text))
+        }
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """Return the migration scripts of a directory, ordered by version."""
+    migrations = {}
+    for path in sorted(directory.glob("V*.sql")):
+        match = MIGRATION_NAME.fullmatch(path.name)
+        if not match:
+            raise ValueError(f"Migration script name must be V<version>__<name>.sql: {path}")
+        version = int(match["version"])
+        if version in migrations:
+            raise ValueError(f"Duplicate migration version {version}: {path}")
+        migrations[version] = Migration(
+            version,
+            match["description"].replace("_", " "),
+            path.read_text(),
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def owned_tables(migrations: list[Migration]) -> list[str]:
+    """Return the tables created or altered by the migrations, which the fingerprint covers."""
+    return sorted(set().union(*(migration.tables for migration in migrations)))
+
+
+def fingerprint_query(database: str, schema: str, tables: list[str]) -> str:
+    """Return a query hashing the columns of the given tables of the schema."""
+    names = ", ".join(f"'{table}'" for table in tables) or "NULL"
+    return (
+        "SELECT TO_VARCHAR(HASH_AGG(table_name, column_name, ordinal_position, data_type, "  # noqa: S608
+        f"is_nullable)) FROM {database}.INFORMATION_SCHEMA.COLUMNS "
+        f"WHERE table_schema = '{schema.upper()}' AND table_name IN ({names})"
+    )
+
+
+@dataclass
+class Ledger:
+    """Applied migrations and the recorded and live fingerprints of the schema."""
+
+    checksums: dict[int, str]
+    recorded_fingerprint: str | None
+    live_fingerprint: str | None
+
+    @property
+    def drifted(self) -> bool:
+        """Whether the schema changed since migrations were last applied."""
+        return bool(self.checksums) and self.recorded_fingerprint != self.live_fingerprint
+
+
+def read_ledger(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    database: str,
+    schema: str,
+    tables: list[str],
+) -> Ledger | None:
+    """Read the ledger and the live fingerprint in one query; None if there is no ledger."""
+    try:
+        cursor.execute(
+            "SELECT version, checksum, schema_fingerprint, "  # noqa: S608
+            f"({fingerprint_query(database, schema, tables)}) AS live_fingerprint "
+            f"FROM {database}.{schema}.{LEDGER_TABLE} ORDER BY version",
+        )
+    except snowflake.connector.errors.ProgrammingError as error:
+        # The database, schema or ledger does not exist yet
+        logger.info("No migration ledger found (%s), applying all migrations", error.msg)
+        return None
+    rows = cursor.fetchall()
+    return Ledger(
+        checksums={version: checksum for version, checksum, _, _ in rows},
+        recorded_fingerprint=rows[-1][2] if rows else None,
+        live_fingerprint=rows[-1][3] if rows else None,
+    )
+
+
+def setup_statements(database: str, schema: str) -> list[Statement]:
+    """Return the statements creating the database, schema and ledger, and using them."""
+    return split_statements(
+        f"CREATE DATABASE IF NOT EXISTS {database};\n"
+        f"USE DATABASE {database};\n"
+        f"CREATE SCHEMA IF NOT EXISTS {schema};\n"
+        f"USE SCHEMA {schema};\n"
+        f"CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (\n"
+        "    version INTEGER NOT NULL,\n"
+        "    description VARCHAR NOT NULL,\n"
+        "    checksum VARCHAR(64) NOT NULL,\n"
+        "    execution_ms INTEGER,\n"
+        "    schema_fingerprint VARCHAR,\n"
+        "    applied_at TIMESTAMP_LTZ DEFAULT CURRENT_TIMESTAMP()\n"
+        ");\n",
+    )
+
+
+def record_statements(
+    database: str,
+    schema: str,
+    applied: dict[Migration, float],
+    tables: list[str],
+) -> list[Statement]:
+    """Return the statements recording applied migrations and the new fingerprint."""
+    ledger = f"{database}.{schema}.{LEDGER_TABLE}"
+    versions = ", ".join(str(migration.version) for migration in applied)
+    values = ", ".join(
+        f"({migration.version}, '{migration.description}', '{migration.checksum}', "
+        f"{round(seconds * 1000)})"
+        for migration, seconds in applied.items()
+    )
+    return split_statements(
+        f"DELETE FROM {ledger} WHERE version IN ({versions});\n"  # noqa: S608
+        f"INSERT INTO {ledger} (version, description, checksum, execution_ms) VALUES {values};\n"
+        f"UPDATE {ledger} SET schema_fingerprint = "
+        f"({fingerprint_query(database, schema, tables)});\n",
+    )
+
+
+@dataclass
+class MigrationReport:
+    """Outcome of a migration run."""
+
+    applied: list[int] = field(default_factory=list)
+    failed: list[int] = field(default_factory=list)
+    # Pending versions after the failure, which were not applied
+    skipped: list[int] = field(default_factory=list)
+    # Applied versions that could not be recorded in the ledger
+    unrecorded: list[int] = field(default_factory=list)
+    unchanged: int = 0
+    # Versions in the ledger without a script
+    missing: list[int] = field(default_factory=list)
+    drifted: bool = False
+    round_trips: int = 0
+
+    @property
+    def succeeded(self) -> bool:
+        """Whether every pending migration was applied and recorded."""
+        return not (self.failed or self.skipped or self.unrecorded)
+
+
+def _apply_pending(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    database: str,
+    schema: str,
+    pending: list[Migration],
+    tables: list[str],
+    report: MigrationReport,
+) -> None:
+    """Apply the pending migrations in one batch, up to the first failure, and record them."""
+    setup = setup_statements(database, schema)
+    scripts = [(migration, migration.statements) for migration in pending]
+    apply_report = apply_statements(
+        cursor,
+        setup + [statement for _, statements in scripts for statement in statements],
+        stop_on_error=True,
+    )
+    log_apply_report(apply_report)
+    report.round_trips += apply_report.round_trips
+
+    # Results are in statement order and end at the first failure; setup comes first
+    stopped = any(result.status != SUCCESS_STATUS for result in apply_report.results[: len(setup)])
+    results = iter(apply_report.results[len(setup) :])
+    applied = {}
+    for migration, statements in scripts:
+        migration_results = list(islice(results, len(statements)))
+        if stopped:
+            report.skipped.append(migration.version)
+        elif len(migration_results) == len(statements) and all(
+            result.status == SUCCESS_STATUS for result in migration_results
+        ):
+            applied[migration] = sum(result.elapsed or 0 for result in migration_results)
+            report.applied.append(migration.version)
+        else:
+            logger.error("Migration V%03d (%s) failed", migration.version, migration.description)
+            report.failed.append(migration.version)
+            stopped = True
+    if report.skipped:
+        logger.error("Migrations not applied after the failure: %s", report.skipped)
+
+    if applied:
+        record_report = apply_statements(
+            cursor,
+            record_statements(database, schema, applied, tables),
+            stop_on_error=True,
+        )
+        report.round_trips += record_report.round_trips
+        for result in record_report.failed:
+            logger.error("Could not record migrations in the ledger: %s", result.error)
+        if record_report.failed:
+            report.unrecorded = list(report.applied)
+
+
+def apply_migrations(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    database: str,
+    schema: str,
+    directory: Path = MIGRATIONS_DIR,
+) -> MigrationReport:
+    """Apply the new and changed migrations of a directory to a schema.
+
+    Creates the database, schema and ledger on the first run. When no migration changed,
+    this is a single metadata query, which also detects drift of the live schema.
+    """
+    migrations = discover_migrations(directory)
+    tables = owned_tables(migrations)
+    ledger = read_ledger(cursor, database, schema, tables)
+    checksums = ledger.checksums if ledger else {}
+    report = MigrationReport(round_trips=1)
+    report.missing = sorted(set(checksums) - {migration.version for migration in migrations})
+    if report.missing:
+        logger.warning("Applied migrations without a script: %s", report.missing)
+
+    pending = [
+        migration
+        for migration in migrations
+        if checksums.get(migration.version) != migration.checksum
+    ]
+    report.unchanged = len(migrations) - len(pending)
+    for migration in pending:
+        change = "changed" if migration.version in checksums else "new"
+        logger.info("Migration V%03d (%s) is %s", migration.version, migration.description, change)
+
+    if pending:
+        _apply_pending(cursor, database, schema, pending, tables, report)
+    elif ledger and ledger.drifted:
+        report.drifted = True
+        logger.warning(
+            "Schema %s.%s drifted from the migration ledger: the columns of its migrated "
+            "tables changed since migrations were last applied",
+            database,
+            schema,
+        )
+
+    logger.info(
+        "Applied %d migrations (%d failed, %d skipped, %d unchanged) in %d round trips",
+        len(report.applied),
+        len(report.failed),
+        len(report.skipped),
+        report.unchanged,
+        report.round_trips,
+    )
+    return report
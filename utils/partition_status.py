@@ -0,0 +1,95 @@
+"""Partition list and per-partition status of fan-out copies.
+
+A fan-out pipeline looks up the partitions to copy from a JSON list blob and runs one copy
+per partition. Once the run has finished, the outcome of each partition's copy is merged
+into a status blob next to the staged data. Partitions whose copy did not succeed (including
+those never started because the run failed early) are added to the list of the next run,
+whatever its load window, so a retry only copies the partitions that failed.
+"""
+
+import json
+from pathlib import PurePosixPath
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import ContainerClient
+
+from utils.adf_monitor import SUCCEEDED_STATUS, CopyActivityMetrics
+from utils.logger import get_logger
+from utils.sales_data import partition_prefix
+
+logger = get_logger()
+
+NOT_RUN_STATUS = "NotRun"
+
+
+def partition_list_blob(blob_name: str) -> str:
+    """Return the blob listing the partitions the next fan-out run copies."""
+    return f"{partition_prefix(blob_name)}/_partition_list.json"
+
+
+def partition_status_blob(blob_name: str) -> str:
+    """Return the blob recording the outcome of each partition's last copy."""
+    return f"{partition_prefix(blob_name)}/_partition_status.json"
+
+
+def write_partition_list(
+    container_client: ContainerClient,
+    blob_name: str,
+    partitions: list[str],
+) -> None:
+    """Write the partitions as the ``folder``/``file`` items the ForEach iterates over."""
+    items = [
+        {"folder": str(PurePosixPath(partition).parent), "file": PurePosixPath(partition).name}
+        for partition in partitions
+    ]
+    container_client.upload_blob(partition_list_blob(blob_name), json.dumps(items), overwrite=True)
+
+
+def read_partition_status(container_client: ContainerClient, blob_name: str) -> dict[str, dict]:
+    """Return the recorded status of each partition, by blob name."""
+    try:
+        content = container_client.download_blob(partition_status_blob(blob_name)).readall()
+    except ResourceNotFoundError:
+        return {}
+    return json.loads(content)
+
+
+def failed_partitions(status: dict[str, dict]) -> list[str]:
+    """Return the partitions whose last copy did not succeed."""
+    return sorted(name for name, entry in status.items() if entry["status"] != SUCCEEDED_STATUS)
+
+
+def record_partition_status(
+    container_client: ContainerClient,
+    blob_name: str,
+    partitions: list[str],
+    copies: list[CopyActivityMetrics],
+    run_id: str,
+) -> list[str]:
+    """Merge the outcome of each partition's copy into the status blob.
+
+    Returns the partitions that failed and will be retried by the next run.
+    """
+    status = read_partition_status(container_client, blob_name)
+    copies_by_source = {copy.source_path: copy for copy in copies}
+    for partition in partitions:
+        copy = copies_by_source.get(partition)
+        status[partition] = {
+            "status": copy.status if copy else NOT_RUN_STATUS,
+            "run_id": run_id,
+            "rows_copied": copy.rows_copied if copy else 0,
+        }
+    container_client.upload_blob(
+        partition_status_blob(blob_name),
+        json.dumps(dict(sorted(status.items())), indent=2),
+        overwrite=True,
+    )
+
+    failed = [name for name in partitions if status[name]["status"] != SUCCEEDED_STATUS]
+    logger.info(
+        "Copied %d of %d partitions in run %s",
+        len(partitions) - len(failed),
+        len(partitions),
+        run_id,
+    )
+    return failed
@@ -0,0 +1,219 @@
+"""Concurrent provisioning of the Azure resources used by the pipeline.
+
+Every resource is checked with a direct point lookup of the resource itself instead of
+listing its siblings, and only created when it is missing. Resources that do not depend on
+each other are provisioned concurrently with the async SDK clients: once the resource
+group exists, the storage account (followed by its container and keys) and the data
+factory are set up side by side. Long-running creates are awaited through their pollers;
+resources that report a provisioning state without one are polled with exponential backoff
+instead of sleeping for a fixed time.
+"""
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable, Iterator
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.mgmt.datafactory.aio import DataFactoryManagementClient
+from azure.mgmt.datafactory.models import Factory
+from azure.mgmt.resource.resources.aio import ResourceManagementClient
+from azure.mgmt.storage.aio import StorageManagementClient
+
+from utils.azure import get_async_azure_credential
+from utils.logger import get_logger
+
+logger = get_logger()
+
+LOCATION = "uaenorth"
+DATA_FACTORY_LOCATION = "eastus"
+STORAGE_ACCOUNT_SETTINGS = {"kind": "StorageV2", "sku": {"name": "Standard_LRS"}}
+SUCCEEDED_STATE = "succeeded"
+FAILED_STATES = ("failed", "canceled")
+PROVISIONING_TIMEOUT = 600
+
+
+class ProvisioningError(Exception):
+    """Raised when a resource fails to provision or does not become ready in time."""
+
+
+def backoff_delays(
+    initial: float = 1.0,
+    maximum: float = 15.0,
+    factor: float = 2.0,
+) -> Iterator[float]:
+    """Yield exponentially growing delays between polls, capped at ``maximum`` seconds."""
+    delay = initial
+    while True:
+        yield delay
+        delay = min(delay * factor, maximum)
+
+
+def _is_provisioned(name: str, state: str | None) -> bool:
+    """Return whether a provisioning state is final, raising if it is a failure."""
+    state = (state or "").lower()
+    if state in FAILED_STATES:
+        raise ProvisioningError(f"Provisioning of {name} ended in state {state!r}")
+    # Resources without a provisioning state are usable as soon as they are returned
+    return state in ("", SUCCEEDED_STATE)
+
+
+async def wait_for_provisioning(
+    name: str,
+    fetch_state: Callable[[], Awaitable[str | None]],
+    max_wait: float = PROVISIONING_TIMEOUT,
+) -> None:
+    """Poll ``fetch_state`` with backoff until the resource has provisioned."""
+    try:
+        async with asyncio.timeout(max_wait):
+            for delay in backoff_delays():
+                if _is_provisioned(name, await fetch_state()):
+                    return
+                logger.debug("Waiting %.1fs for %s to finish provisioning...", delay, name)
+                await asyncio.sleep(delay)
+    except TimeoutError as exc:
+        raise ProvisioningError(f"{name} was not provisioned within {max_wait:.0f}s") from exc
+
+
+def poll_provisioning(
+    name: str,
+    fetch_state: Callable[[], str | None],
+    max_wait: float = PROVISIONING_TIMEOUT,
+) -> None:
+    """Blocking variant of ``wait_for_provisioning`` for the synchronous SDK clients."""
+    deadline = time.monotonic() + max_wait
+    for delay in backoff_delays():
+        if _is_provisioned(name, fetch_state()):
+            return
+        if time.monotonic() + delay > deadline:
+            raise ProvisioningError(f"{name} was not provisioned within {max_wait:.0f}s")
+        logger.debug("Waiting %.1fs for %s to finish provisioning...", delay, name)
+        time.sleep(delay)
+
+
+async def ensure_resource_group(
+    client: ResourceManagementClient,
+    name: str,
+    location: str = LOCATION,
+) -> None:
+    """Create the resource group unless a HEAD request finds it."""
+    if await client.resource_groups.check_existence(name):
+        logger.info("Resource group %s already exists", name)
+        return
+    logger.info("Creating resource group %s...", name)
+    await client.resource_groups.create_or_update(name, {"location": location})
+
+
+async def ensure_storage_account(
+    client: StorageManagementClient,
+    resource_group: str,
+    name: str,
+    location: str = LOCATION,
+) -> None:
+    """Create the storage account if missing and wait until it has provisioned."""
+    try:
+        account = await client.storage_accounts.get_properties(resource_group, name)
+    except ResourceNotFoundError:
+        logger.info("Creating storage account %s...", name)
+        poller = await client.storage_accounts.begin_create(
+            resource_group,
+            name,
+            {"location": location, **STORAGE_ACCOUNT_SETTINGS},
+        )
+        await poller.result()
+        return
+    logger.info("Storage account %s already exists", name)
+
+    async def fetch_state() -> str | None:
+        account = await client.storage_accounts.get_properties(resource_group, name)
+        return account.provisioning_state
+
+    if not _is_provisioned(name, account.provisioning_state):
+        await wait_for_provisioning(f"storage account {name}", fetch_state)
+
+
+async def ensure_container(
+    client: StorageManagementClient,
+    resource_group: str,
+    account_name: str,
+    name: str,
+) -> None:
+    """Create the blob container through the management plane unless it exists."""
+    try:
+        await client.blob_containers.get(resource_group, account_name, name)
+        logger.info("Container %s already exists", name)
+    except ResourceNotFoundError:
+        logger.info("Creating container %s...", name)
+        await client.blob_containers.create(resource_group, account_name, name, {})
+
+
+async def get_storage_key(
+    client: StorageManagementClient,
+    resource_group: str,
+    account_name: str,
+) -> str:
+    """Return the first access key of the storage account."""
+    keys = await client.storage_accounts.list_keys(resource_group, account_name)
+    return keys.keys[0].value
+
+
+async def ensure_data_factory(
+    client: DataFactoryManagementClient,
+    resource_group: str,
+    name: str,
+    location: str = DATA_FACTORY_LOCATION,
+) -> Factory:
+    """Create the data factory if missing and wait until it has provisioned."""
+    try:
+        factory = await client.factories.get(resource_group, name)
+        logger.info("Data Factory %s already exists", name)
+    except ResourceNotFoundError:
+        logger.info("Creating Data Factory %s in %s...", name, location)
+        factory = await client.factories.create_or_update(
+            resource_group,
+            name,
+            Factory(location=location),
+        )
+
+    async def fetch_state() -> str | None:
+        return (await client.factories.get(resource_group, name)).provisioning_state
+
+    if not _is_provisioned(name, factory.provisioning_state):
+        await wait_for_provisioning(f"Data Factory {name}", fetch_state)
+    return factory
+
+
+async def provision_resources(azure_details: dict[str, str]) -> str:
+    """Provision every Azure resource of the pipeline; returns the storage account key."""
+    started = time.perf_counter()
+    subscription_id = azure_details["subscription_id"]
+    resource_group = azure_details["resource_group"]
+    storage_account = azure_details["storage_account"]
+
+    async with (
+        get_async_azure_credential() as credential,
+        ResourceManagementClient(credential, subscription_id) as resource_client,
+        StorageManagementClient(credential, subscription_id) as storage_client,
+        DataFactoryManagementClient(credential, subscription_id) as adf_client,
+    ):
+        await ensure_resource_group(resource_client, resource_group)
+
+        async def provision_storage() -> str:
+            await ensure_storage_account(storage_client, resource_group, storage_account)
+            _, storage_key = await asyncio.gather(
+                ensure_container(
+                    storage_client,
+                    resource_group,
+                    storage_account,
+                    azure_details["container_name"],
+                ),
+                get_storage_key(storage_client, resource_group, storage_account),
+            )
+            return storage_key
+
+        storage_key, _ = await asyncio.gather(
+            provision_storage(),
+            ensure_data_factory(adf_client, resource_group, azure_details["data_factory_name"]),
+        )
+
+    logger.info("Azure resources ready in %.1fs", time.perf_counter() - started)
+    return storage_key
@@ -0,0 +1,226 @@
+"""Schema of the sales extract and conversion of the source CSV into staging formats."""
+
+from pathlib import Path, PurePosixPath
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+# Source CSV header -> column of RAW.RAW_SALES_DATA, in table order
+RAW_COLUMNS = {
+    "Region": "region",
+    "Country": "country",
+    "Item Type": "item_type",
+    "Sales Channel": "sales_channel",
+    "Order Priority": "order_priority",
+    "Order Date": "order_date",
+    "Order ID": "order_id",
+    "Ship Date": "ship_date",
+    "Units Sold": "units_sold",
+    "Unit Price": "unit_price",
+    "Unit Cost": "unit_cost",
+}
+DICTIONARY_COLUMNS = ("region", "country", "item_type", "sales_channel", "order_priority")
+DATE_COLUMNS = ("order_date", "ship_date")
+SOURCE_DATE_FORMAT = "%m/%d/%Y"
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
+SALES_SCHEMA = pa.schema(
+    [
+        *((name, pa.dictionary(pa.int32(), pa.string())) for name in DICTIONARY_COLUMNS),
+        ("order_date", pa.date32()),
+        ("order_id", pa.int64()),
+        ("ship_date", pa.date32()),
+        ("units_sold", pa.int64()),
+        ("unit_price", pa.float64()),
+        ("unit_cost", pa.float64()),
+    ],
+)
+
+# Plain-text variant for CSV staging, where dictionary encoding has no meaning
+CSV_STAGING_SCHEMA = pa.schema(
+    [
+        pa.field(field.name, pa.string()) if pa.types.is_dictionary(field.type) else field
+        for field in SALES_SCHEMA
+    ],
+)
+
+STAGING_FORMATS = ("csv", "parquet")
+PARTITION_GRANULARITIES = ("none", "year", "month")
+
+
+def staged_blob_name(blob_name: str, staging_format: str) -> str:
+    """Return the blob name used for the given staging format."""
+    if staging_format == "parquet":
+        return str(PurePosixPath(blob_name).with_suffix(".parquet"))
+    return blob_name
+
+
+def partition_prefix(blob_name: str) -> str:
+    """Return the blob prefix under which partitions of the extract are stored."""
+    return str(PurePosixPath(blob_name).with_suffix(""))
+
+
+def partition_glob(blob_name: str, partition_by: str) -> str:
+    """Return the wildcard folder path matching every partition folder."""
+    folders = {"year": "year=*", "month": "year=*/month=*"}[partition_by]
+    return f"{partition_prefix(blob_name)}/{folders}"
+
+
+def changed_files_manifest(blob_name: str) -> str:
+    """Return the blob listing the partition files changed by the last upload."""
+    return f"{partition_prefix(blob_name)}/_changed_files.txt"
+
+
+def partition_path(partition_id: int, partition_by: str) -> str:
+    """Return the Hive-style folder of a partition, e.g. ``year=2014/month=02``."""
+    if partition_by == "year":
+        return f"year={partition_id}"
+    return f"year={partition_id // 100}/month={partition_id % 100:02d}"
+
+
+def open_sales_csv(source: Path) -> pa_csv.CSVStreamingReader:
+    """Open the source CSV as a stream of typed record batches with source column names."""
+    source_types = {
+        source_name: SALES_SCHEMA.field(raw_name).type
+        for source_name, raw_name in RAW_COLUMNS.items()
+        if raw_name not in DATE_COLUMNS
+    }
+    source_types.update(
+        {
+            source_name: pa.timestamp("s")
+            for source_name, raw_name in RAW_COLUMNS.items()
+            if raw_name in DATE_COLUMNS
+        },
+    )
+    return pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=list(RAW_COLUMNS),
+            column_types=source_types,
+            timestamp_parsers=[SOURCE_DATE_FORMAT],
+        ),
+    )
+
+
+def to_raw_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Rename a source batch to raw column names and narrow the dates to DATE."""
+    columns = [
+        column.cast(pa.date32()) if RAW_COLUMNS[name] in DATE_COLUMNS else column
+        for name, column in zip(batch.schema.names, batch.columns)
+    ]
+    return pa.RecordBatch.from_arrays(columns, schema=SALES_SCHEMA)
+
+
+def _format_dates(column: pa.Array) -> pa.DictionaryArray:
+    """Format a date column as M/D/YYYY text, formatting each distinct day only once."""
+    if not len(column):
+        return pa.array([], pa.string())
+    days = column.cast(pa.int32()).to_numpy()
+    first, last = days.min(), days.max()
+    labels = pc.strftime(
+        pa.array(np.arange(first, last + 1).astype("datetime64[D]")),
+        SOURCE_DATE_FORMAT,
+    )
+    return pa.DictionaryArray.from_arrays(days - first, labels)
+
+
+def to_source_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Convert a SALES_SCHEMA batch to the source CSV layout: header names and M/D/YYYY dates."""
+    columns = [
+        _format_dates(column) if name in DATE_COLUMNS else column
+        for name, column in zip(batch.schema.names, batch.columns)
+    ]
+    return pa.RecordBatch.from_arrays(columns, names=list(RAW_COLUMNS))
+
+
+def convert_csv_to_parquet(source: Path, destination: Path, compression: str = "snappy") -> int:
+    """Convert the source CSV to typed Parquet in one streaming pass; returns the row count.
+
+    Dates are parsed once here, and the low-cardinality text columns are dictionary-encoded.
+    ADF only copies Parquet straight into Snowflake for the "snappy" and "none" codecs.
+    """
+    rows = 0
+    with pq.ParquetWriter(
+        destination,
+        SALES_SCHEMA,
+        compression=compression,
+        use_dictionary=list(DICTIONARY_COLUMNS),
+    ) as writer:
+        for batch in open_sales_csv(source):
+            writer.write_batch(to_raw_batch(batch))
+            rows += batch.num_rows
+    return rows
+
+
+def _partition_ids(batch: pa.RecordBatch, partition_by: str) -> pa.Array:
+    """Compute an integer partition ID per row: YYYY for years, YYYYMM for months."""
+    order_date = batch.column("order_date")
+    year = pc.year(order_date)
+    if partition_by == "year":
+        return year
+    return pc.add(pc.multiply(year, 100), pc.month(order_date))
+
+
+def _open_writer(
+    path: Path,
+    staging_format: str,
+    compression: str,
+) -> pq.ParquetWriter | pa_csv.CSVWriter:
+    if staging_format == "parquet":
+        return pq.ParquetWriter(
+            path,
+            SALES_SCHEMA,
+            compression=compression,
+            use_dictionary=list(DICTIONARY_COLUMNS),
+        )
+    return pa_csv.CSVWriter(
+        path,
+        CSV_STAGING_SCHEMA,
+        write_options=pa_csv.WriteOptions(include_header=False),
+    )
+
+
+def partition_extract(
+    source: Path,
+    output_dir: Path,
+    partition_by: str,
+    staging_format: str = "csv",
+    compression: str = "snappy",
+) -> dict[str, Path]:
+    """Split the source CSV by order_date into one file per partition in one streaming pass.
+
+    Returns the Hive-style partition folder of each file, e.g. ``year=2014/month=02``.
+    CSV partitions are headerless with ISO dates; Parquet partitions use SALES_SCHEMA.
+    """
+    writers: dict[int, pq.ParquetWriter | pa_csv.CSVWriter] = {}
+    files: dict[str, Path] = {}
+    try:
+        for source_batch in open_sales_csv(source):
+            batch = to_raw_batch(source_batch)
+            if staging_format == "csv":
+                batch = batch.cast(CSV_STAGING_SCHEMA)
+
+            # Sort rows by partition so each partition is one contiguous slice of the batch
+            partition_ids = _partition_ids(batch, partition_by)
+            order = pc.sort_indices(partition_ids)
+            batch = batch.take(order)
+            runs = pc.run_end_encode(partition_ids.take(order))
+
+            start = 0
+            for end, partition_id in zip(runs.run_ends.to_pylist(), runs.values.to_pylist()):
+                if partition_id not in writers:
+                    folder = partition_path(partition_id, partition_by)
+                    path = output_dir / folder / f"part-00000.{staging_format}"
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    writers[partition_id] = _open_writer(path, staging_format, compression)
+                    files[folder] = path
+                writers[partition_id].write_batch(batch.slice(start, end - start))
+                start = end
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return files
@@ -0,0 +1,305 @@
+"""Pooled Snowflake sessions shared by the pipeline, the direct loader and the dashboard.
+
+Logging in to Snowflake takes a noticeable round trip or two, and each stage used to open
+its own connection. ``SessionPool`` keeps up to ``max_size`` logged-in connections and
+hands them out with ``session(preset)``. When every connection is checked out, callers
+wait for one to be returned, up to a timeout. Connections use ``client_session_keep_alive``
+so an idle session does not expire. A connection that was idle for longer than the health
+check interval is probed with ``SELECT 1`` before reuse, and one that is closed or fails
+the probe is replaced.
+
+A preset is the set of session parameters of a call site (query tag, statement timeout,
+result cache) and its schema. Every preset sets the same parameters and a schema, so
+switching presets leaves nothing of the previous one behind. A new connection gets its
+preset at login. A reused connection switches presets with ``ALTER SESSION`` only when its
+current preset differs. A connection returned after an error is rolled back, and gets its
+preset again on the next checkout. ``PoolMetrics`` counts checkouts, waits, reconnects and
+logins.
+"""
+
+import atexit
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass, field
+
+import snowflake.connector
+
+from utils import config
+from utils.logger import get_logger
+
+logger = get_logger()
+
+
+# Schema a session starts in when the login names none
+DEFAULT_SCHEMA = "PUBLIC"
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection became available in time."""
+
+
+@dataclass(frozen=True)
+class SessionPreset:
+    """Session parameters and schema of a call site."""
+
+    parameters: dict[str, str | int | bool] = field(default_factory=dict)
+    schema: str = DEFAULT_SCHEMA
+
+    def statements(self) -> list[str]:
+        """Return the statements switching a session to this preset."""
+        values = " ".join(
+            f"{name} = {_sql_value(value)}" for name, value in self.parameters.items()
+        )
+        statements = [f"ALTER SESSION SET {values}"] if values else []
+        statements.append(f"USE SCHEMA {self.schema}")
+        return statements
+
+
+def _sql_value(value: str | int | bool) -> str:
+    if isinstance(value, bool):
+        return str(value).upper()
+    if isinstance(value, int):
+        return str(value)
+    return f"'{value}'"
+
+
+# Every preset sets all of these parameters, overriding what the previous preset set
+SESSION_PRESETS = {
+    "pipeline": SessionPreset(
+        {
+            "QUERY_TAG": "salesflow-pipeline",
+            "STATEMENT_TIMEOUT_IN_SECONDS": 3600,
+            "USE_CACHED_RESULT": True,
+        },
+    ),
+    "loader": SessionPreset(
+        {
+            "QUERY_TAG": "salesflow-loader",
+            "STATEMENT_TIMEOUT_IN_SECONDS": 4 * 3600,
+            "USE_CACHED_RESULT": True,
+        },
+        schema="RAW",
+    ),
+    "dashboard": SessionPreset(
+        {
+            "QUERY_TAG": "salesflow-dashboard",
+            "STATEMENT_TIMEOUT_IN_SECONDS": 120,
+            "USE_CACHED_RESULT": True,
+        },
+    ),
+}
+
+
+@dataclass
+class PoolMetrics:
+    """Counters of a session pool."""
+
+    logins: int = 0
+    checkouts: int = 0
+    # Checkouts that had to wait for a connection to be returned, and for how long
+    waits: int = 0
+    wait_seconds: float = 0.0
+    health_checks: int = 0
+    reconnects: int = 0
+
+
+@dataclass
+class _PooledConnection:
+    connection: snowflake.connector.SnowflakeConnection
+    # None when the session state is unknown, e.g. after an error
+    preset: str | None
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class SessionPool:
+    """Bounded pool of logged-in Snowflake connections."""
+
+    def __init__(
+        self,
+        connect_args: dict,
+        max_size: int = 4,
+        timeout: float = 30.0,
+        health_check_interval: float = 300.0,
+        connect: Callable[..., snowflake.connector.SnowflakeConnection] = (
+            snowflake.connector.connect
+        ),
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.connect_args = connect_args
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.metrics = PoolMetrics()
+        self._connect = connect
+        # Most recently returned last, so the warmest connection is reused first
+        self._idle: list[_PooledConnection] = []
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def session(
+        self,
+        preset: str = "pipeline",
+    ) -> Iterator[snowflake.connector.SnowflakeConnection]:
+        """Check out a connection set up with the preset, returning it to the pool after use."""
+        if preset not in SESSION_PRESETS:
+            raise ValueError(f"Unknown session preset: {preset}")
+        pooled = self._checkout(preset)
+        try:
+            self._prepare(pooled, preset)
+            yield pooled.connection
+        except BaseException:
+            self._reset(pooled)
+            raise
+        finally:
+            self._checkin(pooled)
+
+    def _open(self, preset: str) -> _PooledConnection:
+        session_preset = SESSION_PRESETS[preset]
+        connect_args = {
+            **self.connect_args,
+            "session_parameters": session_preset.parameters,
+            "schema": session_preset.schema,
+        }
+        connection = self._connect(**connect_args)
+        with self._condition:
+            self.metrics.logins += 1
+        return _PooledConnection(connection, preset)
+
+    def _checkout(self, preset: str) -> _PooledConnection:
+        with self._condition:
+            if self._closed:
+                raise PoolTimeoutError("The session pool is closed")
+            self.metrics.checkouts += 1
+            if not self._idle and self._size >= self.max_size:
+                self.metrics.waits += 1
+                started = time.monotonic()
+                available = self._condition.wait_for(
+                    lambda: self._idle or self._size < self.max_size,
+                    self.timeout,
+                )
+                self.metrics.wait_seconds += time.monotonic() - started
+                if not available:
+                    raise PoolTimeoutError(
+                        f"No Snowflake connection available after {self.timeout:.0f}s",
+                    )
+            if self._idle:
+                return self._idle.pop()
+            # Log in outside the lock; the slot is reserved so the pool stays bounded
+            self._size += 1
+        try:
+            return self._open(preset)
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _healthy(self, pooled: _PooledConnection) -> bool:
+        if pooled.connection.is_closed():
+            return False
+        if time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        with self._condition:
+            self.metrics.health_checks += 1
+        try:
+            with pooled.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except snowflake.connector.errors.Error:
+            return False
+        return True
+
+    def _prepare(self, pooled: _PooledConnection, preset: str) -> None:
+        """Replace an unhealthy connection and switch it to the preset if needed."""
+        if not self._healthy(pooled):
+            logger.warning("Replacing an unhealthy Snowflake connection")
+            with suppress(snowflake.connector.errors.Error):
+                pooled.connection.close()
+            replacement = self._open(preset)
+            pooled.connection, pooled.preset = replacement.connection, replacement.preset
+            with self._condition:
+                self.metrics.reconnects += 1
+        if pooled.preset != preset:
+            statements = SESSION_PRESETS[preset].statements()
+            with pooled.connection.cursor() as cursor:
+                cursor.execute(";\n".join(statements), num_statements=len(statements))
+            pooled.preset = preset
+
+    def _reset(self, pooled: _PooledConnection) -> None:
+        """Roll back a connection returned after an error, or close it if that fails too."""
+        pooled.preset = None
+        try:
+            pooled.connection.rollback()
+        except snowflake.connector.errors.Error:
+            logger.warning("Closing a Snowflake connection that could not be rolled back")
+            with suppress(snowflake.connector.errors.Error):
+                pooled.connection.close()
+
+    def _checkin(self, pooled: _PooledConnection) -> None:
+        with self._condition:
+            if self._closed or pooled.connection.is_closed():
+                self._size -= 1
+                with suppress(snowflake.connector.errors.Error):
+                    pooled.connection.close()
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+            self._condition.notify()
+
+    def close(self) -> None:
+        """Close the idle connections; connections in use are closed when returned."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for pooled in idle:
+            with suppress(snowflake.connector.errors.Error):
+                pooled.connection.close()
+
+
+_pools: dict[str, SessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool() -> SessionPool:
+    """Return the process-wide session pool, creating it on first use."""
+    with _pools_lock:
+        if "default" not in _pools:
+            settings = config.get_session_settings()
+            pool = SessionPool(
+                {
+                    **config.get_snowflake_details(),
+                    "client_session_keep_alive": settings["keep_alive"],
+                },
+                max_size=settings["pool_size"],
+                timeout=settings["checkout_timeout"],
+                health_check_interval=settings["health_check_interval"],
+            )
+            atexit.register(pool.close)
+            _pools["default"] = pool
+        return _pools["default"]
+
+
+def session(preset: str = "pipeline") -> Iterator[snowflake.connector.SnowflakeConnection]:
+    """Check out a connection of the process-wide pool, set up with the preset."""
+    return get_pool().session(preset)
+
+
+def log_pool_metrics() -> None:
+    """Log the counters of the process-wide pool, if it was used."""
+    if "default" in _pools:
+        metrics = _pools["default"].metrics
+        logger.info(
+            "Snowflake sessions: %d logins for %d checkouts, %d waits (%.1fs), "
+            "%d health checks, %d reconnects",
+            metrics.logins,
+            metrics.checkouts,
+            metrics.waits,
+            metrics.wait_seconds,
+            metrics.health_checks,
+            metrics.reconnects,
+        )
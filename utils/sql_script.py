@@ -0,0 +1,363 @@
+"""Splitting of SQL scripts into statements, applied to Snowflake in few round trips.
+
+``split_statements`` tokenizes a script instead of splitting it on every semicolon.
+Semicolons inside string literals, quoted identifiers, ``$$``-delimited bodies and comments
+do not end a statement. Comments are dropped, and each statement keeps the line it starts
+on so that errors can be traced back to the script.
+
+``apply_statements`` sends consecutive statements as one multi-statement request, so an
+init over a high-latency link costs one round trip per batch rather than per statement.
+A request runs its statements in order and stops at the first failure, but Snowflake
+reports the error without saying which statement raised it. The session's query history
+tells: the statements of the batch that succeeded there are kept, the next one gets the
+error, and the ones after it go into the next batch. No statement runs twice, so a batch
+may hold statements that are not idempotent. A single query of the query history at the
+end gives the server-side time of every statement.
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+import snowflake.connector
+
+from utils.logger import get_logger
+
+logger = get_logger()
+
+# Statements per multi-statement request
+MAX_BATCH_STATEMENTS = 50
+# Commands that cannot run inside a multi-statement request
+UNBATCHABLE_COMMANDS = ("PUT", "GET")
+SUCCESS_STATUS = "SUCCESS"
+FAILED_STATUS = "FAILED"
+SUMMARY_LENGTH = 80
+
+
+@dataclass(frozen=True)
+class Statement:
+    """A statement of a script, without comments or the terminating semicolon."""
+
+    text: str
+    line: int
+
+    @property
+    def summary(self) -> str:
+        """First line of the statement, shortened for logging."""
+        first_line = self.text.splitlines()[0]
+        if len(first_line) > SUMMARY_LENGTH:
+            return f"{first_line[: SUMMARY_LENGTH - 3]}..."
+        return first_line
+
+    @property
+    def batchable(self) -> bool:
+        """Whether the statement may run as part of a multi-statement request."""
+        return not self.text.upper().startswith(UNBATCHABLE_COMMANDS)
+
+
+def _quoted_end(script: str, start: int) -> int:
+    """Return the index after the literal, identifier or ``$$`` body starting at ``start``."""
+    if script.startswith("$$", start):
+        end = script.find("$$", start + 2)
+        if end == -1:
+            raise ValueError(f"Unterminated $$ body at offset {start}")
+        return end + 2
+    quote = script[start]
+    index = start + 1
+    while index < len(script):
+        char = script[index]
+        if (char == "\\" and quote == "'") or (
+            char == quote and script.startswith(quote * 2, index)
+        ):
+            index += 2
+        elif char == quote:
+            return index + 1
+        else:
+            index += 1
+    raise ValueError(f"Unterminated {quote} quote at offset {start}")
+
+
+def _comment_end(script: str, start: int) -> int | None:
+    """Return the index after the comment starting at ``start``, or None if there is none."""
+    # ``//`` only starts a comment at the start of a word, not in an unquoted file:// URL
+    slashes = script.startswith("//", start) and (start == 0 or script[start - 1].isspace())
+    if script.startswith("--", start) or slashes:
+        end = script.find("\n", start)
+        return len(script) if end == -1 else end
+    if script.startswith("/*", start):
+        end = script.find("*/", start + 2)
+        if end == -1:
+            raise ValueError(f"Unterminated comment at offset {start}")
+        return end + 2
+    return None
+
+
+def split_statements(script: str) -> list[Statement]:
+    """Split a script into its statements, ignoring semicolons in literals and comments."""
+    statements = []
+    current: list[str] = []
+    line = 1
+    start_line = None
+    index = 0
+
+    def flush() -> None:
+        text = "".join(current).strip()
+        if text:
+            statements.append(Statement(text, start_line))
+        current.clear()
+
+    while index < len(script):
+        char = script[index]
+        comment_end = _comment_end(script, index)
+        if comment_end is not None:
+            # Block comments may span lines; line comments stop before the newline
+            line += script.count("\n", index, comment_end)
+            current.append(" ")
+            index = comment_end
+        elif char == ";":
+            flush()
+            start_line = None
+            index += 1
+        elif char in "'\"" or script.startswith("$$", index):
+            end = _quoted_end(script, index)
+            start_line = start_line or line
+            line += script.count("\n", index, end)
+            current.append(script[index:end])
+            index = end
+        else:
+            if char == "\n":
+                line += 1
+            elif not char.isspace():
+                start_line = start_line or line
+            current.append(char)
+            index += 1
+    flush()
+    return statements
+
+
+@dataclass
+class StatementResult:
+    """Outcome of one statement of an applied script."""
+
+    statement: Statement
+    status: str
+    # Server-side time, or the round trip of a statement run on its own if unavailable
+    elapsed: float | None = None
+    query_id: str | None = None
+    error: str | None = None
+
+
+@dataclass
+class ApplyReport:
+    """Outcome of applying a script: each statement and the requests it took."""
+
+    results: list[StatementResult] = field(default_factory=list)
+    round_trips: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def failed(self) -> list[StatementResult]:
+        """Statements that raised an error."""
+        return [result for result in self.results if result.status == FAILED_STATUS]
+
+
+def _next_batch(pending: deque[Statement], max_batch: int) -> list[Statement]:
+    """Take the longest run of batchable statements, or a single unbatchable one."""
+    batch = [pending.popleft()]
+    while batch[0].batchable and pending and pending[0].batchable and len(batch) < max_batch:
+        batch.append(pending.popleft())
+    return batch
+
+
+def _execute_one(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    statement: Statement,
+) -> StatementResult:
+    started = time.perf_counter()
+    try:
+        cursor.execute(statement.text)
+    except snowflake.connector.errors.ProgrammingError as error:
+        logger.exception(
+            "Error executing the statement at line %d: %s",
+            statement.line,
+            statement.summary,
+        )
+        return StatementResult(
+            statement,
+            FAILED_STATUS,
+            time.perf_counter() - started,
+            error.sfqid,
+            str(error),
+        )
+    return StatementResult(statement, SUCCESS_STATUS, time.perf_counter() - started, cursor.sfqid)
+
+
+def _query_history(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    limit: int,
+) -> list[tuple[str, str, int, str]]:
+    """Return the text, ID, elapsed milliseconds and status of the session's latest queries."""
+    cursor.execute(
+        "SELECT query_text, query_id, total_elapsed_time, execution_status "
+        "FROM TABLE(INFORMATION_SCHEMA.QUERY_HISTORY_BY_SESSION(RESULT_LIMIT => %s)) "
+        "ORDER BY start_time",
+        (limit,),
+    )
+    return cursor.fetchall()
+
+
+def _query_text(text: str) -> str:
+    """Return a query text of the history as the statement text it was sent as."""
+    return text.strip().rstrip(";").strip()
+
+
+def _succeeded_count(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    batch: list[Statement],
+) -> int | None:
+    """Return how many leading statements of a failed batch succeeded, from the history.
+
+    None if the query history cannot be read or does not show the request.
+    """
+    try:
+        history = _query_history(cursor, 2 * len(batch) + 10)
+    except snowflake.connector.errors.Error as error:
+        logger.warning("Could not read the query history of the failed batch: %s", error)
+        return None
+
+    # The statements follow the request itself in the history
+    request = ";\n".join(statement.text for statement in batch)
+    starts = [index for index, row in enumerate(history) if _query_text(row[0]) == request]
+    if not starts:
+        return None
+    rows = iter(history[starts[-1] + 1 :])
+    succeeded = 0
+    for statement in batch:
+        status = next((row[3] for row in rows if _query_text(row[0]) == statement.text), None)
+        if status != SUCCESS_STATUS:
+            break
+        succeeded += 1
+    return succeeded
+
+
+def _attach_timings(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    results: list[StatementResult],
+) -> None:
+    """Set the server-side time of each statement from the session's query history."""
+    try:
+        history = _query_history(cursor, 2 * len(results) + 10)
+    except snowflake.connector.errors.Error as error:
+        logger.warning("Could not read the query history for statement timings: %s", error)
+        return
+
+    # Statements ran in script order, so match them to the history rows in order
+    rows = iter(history)
+    for result in results:
+        for text, query_id, elapsed_ms, _ in rows:
+            if _query_text(text) == result.statement.text:
+                result.query_id = query_id
+                result.elapsed = elapsed_ms / 1000
+                break
+
+
+def _resume_failed_batch(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    batch: list[Statement],
+    error: snowflake.connector.errors.ProgrammingError,
+    pending: deque[Statement],
+    report: ApplyReport,
+) -> None:
+    """Report the statements of a failed batch, putting back the ones that did not run."""
+    succeeded = _succeeded_count(cursor, batch)
+    if succeeded is None:
+        logger.error(
+            "A batch of %d statements failed (%s) and the query history does not show "
+            "which statement raised it; reporting all of them as failed",
+            len(batch),
+            error,
+        )
+        report.results += [
+            StatementResult(statement, FAILED_STATUS, query_id=error.sfqid, error=str(error))
+            for statement in batch
+        ]
+        return
+
+    report.results += [
+        StatementResult(statement, SUCCESS_STATUS) for statement in batch[:succeeded]
+    ]
+    if succeeded < len(batch):
+        failed = batch[succeeded]
+        logger.error(
+            "Error executing the statement at line %d: %s (%s)",
+            failed.line,
+            failed.summary,
+            error,
+        )
+        report.results.append(
+            StatementResult(failed, FAILED_STATUS, query_id=error.sfqid, error=str(error)),
+        )
+        pending.extendleft(reversed(batch[succeeded + 1 :]))
+
+
+def apply_statements(
+    cursor: snowflake.connector.cursor.SnowflakeCursor,
+    statements: list[Statement],
+    max_batch: int = MAX_BATCH_STATEMENTS,
+    *,
+    stop_on_error: bool = False,
+) -> ApplyReport:
+    """Apply statements in multi-statement batches, continuing past failing statements.
+
+    When a batch fails, the query history shows how far it got; the statements after the
+    failed one are sent again in the next batch. If the history does not show it, every
+    statement of the batch is reported as failed rather than run again. Failures are logged
+    and reported, not raised. With ``stop_on_error`` the statements after the first failure
+    are not run, and the results end with the failed statement.
+    """
+    report = ApplyReport()
+    started = time.perf_counter()
+    pending = deque(statements)
+    while pending and not (stop_on_error and report.failed):
+        batch = _next_batch(pending, max_batch)
+        report.round_trips += 1
+        if len(batch) == 1:
+            report.results.append(_execute_one(cursor, batch[0]))
+            continue
+
+        try:
+            cursor.execute(
+                ";\n".join(statement.text for statement in batch),
+                num_statements=len(batch),
+            )
+        except snowflake.connector.errors.ProgrammingError as error:
+            report.round_trips += 1
+            _resume_failed_batch(cursor, batch, error, pending, report)
+        else:
+            report.results += [StatementResult(statement, SUCCESS_STATUS) for statement in batch]
+
+    if report.results:
+        report.round_trips += 1
+        _attach_timings(cursor, report.results)
+    report.elapsed = time.perf_counter() - started
+    return report
+
+
+def log_apply_report(report: ApplyReport) -> None:
+    """Log the time of each statement and a summary of the applied script."""
+    for result in report.results:
+        if result.status == SUCCESS_STATUS:
+            elapsed = f"{result.elapsed:.3f}s" if result.elapsed is not None else "n/a"
+            logger.info(
+                "Line %d: %s (%s)",
+                result.statement.line,
+                result.statement.summary,
+                elapsed,
+            )
+    logger.info(
+        "Applied %d statements (%d failed) in %d round trips and %.2fs",
+        len(report.results),
+        len(report.failed),
+        report.round_trips,
+        report.elapsed,
+    )
@@ -0,0 +1,180 @@
+"""Helpers for processing byte streams chunk by chunk without spooling them to disk."""
+
+import io
+import struct
+import zipfile
+import zlib
+from collections.abc import Iterable, Iterator
+
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8_NAME = 0x800
+ZIP64_SIZE_MARKER = 0xFFFFFFFF
+ZIP64_EXTRA_ID = 0x0001
+
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file-like view over an iterable of byte chunks.
+
+    Wrap it in ``io.BufferedReader`` to get ``readline`` and full-size ``read`` calls.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: bytearray | memoryview) -> int:
+        while not self._pending:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._pending = chunk
+
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+class _ChunkReader:
+    """Sequential reader over byte chunks that supports exact reads and push-back."""
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read_exact(self, size: int) -> bytes:
+        while len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                raise ValueError("Unexpected end of zip stream")
+            self._buffer += chunk
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def iter_raw(self) -> Iterator[bytes]:
+        if self._buffer:
+            data, self._buffer = self._buffer, b""
+            yield data
+        yield from self._chunks
+
+    def push_back(self, data: bytes) -> None:
+        self._buffer = data + self._buffer
+
+
+def _inflate(reader: _ChunkReader) -> Iterator[bytes]:
+    """Inflate one raw deflate stream, returning any trailing bytes to the reader."""
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    for chunk in reader.iter_raw():
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+        if decompressor.eof:
+            reader.push_back(decompressor.unused_data)
+            return
+    raise ValueError("Truncated deflate stream in zip archive")
+
+
+def _read_stored(reader: _ChunkReader, size: int) -> Iterator[bytes]:
+    """Yield ``size`` uncompressed bytes, returning any trailing bytes to the reader."""
+    remaining = size
+    if not remaining:
+        return
+    for chunk in reader.iter_raw():
+        if len(chunk) >= remaining:
+            yield chunk[:remaining]
+            reader.push_back(chunk[remaining:])
+            return
+        remaining -= len(chunk)
+        yield chunk
+    raise ValueError("Truncated stored member in zip archive")
+
+
+def _has_zip64_extra(extra: bytes) -> bool:
+    """Whether a local header's extra field holds zip64 sizes."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, size = struct.unpack_from("<HH", extra, offset)
+        if header_id == ZIP64_EXTRA_ID:
+            return True
+        offset += 4 + size
+    return False
+
+
+def _read_data_descriptor_crc(reader: _ChunkReader, *, zip64: bool = False) -> int:
+    """Consume a data descriptor and return its CRC-32.
+
+    The sizes take 8 bytes each instead of 4 when the member's local header has a zip64
+    extra field.
+    """
+    field = reader.read_exact(4)
+    if field == DATA_DESCRIPTOR_SIGNATURE:
+        field = reader.read_exact(4)
+    reader.read_exact(16 if zip64 else 8)  # compressed and uncompressed sizes
+    return struct.unpack("<I", field)[0]
+
+
+def _member_content(
+    reader: _ChunkReader,
+    name: str,
+    method: int,
+    compressed_size: int,
+    *,
+    has_descriptor: bool,
+) -> Iterator[bytes]:
+    """Pick the decoder for a member's data based on its local header."""
+    if method == zipfile.ZIP_DEFLATED:
+        return _inflate(reader)
+    if method == zipfile.ZIP_STORED and not has_descriptor and compressed_size != ZIP64_SIZE_MARKER:
+        return _read_stored(reader, compressed_size)
+    raise ValueError(f"Zip member {name!r} cannot be streamed (method {method})")
+
+
+def iter_zip_member(chunks: Iterable[bytes], member_name: str) -> Iterator[bytes]:
+    """Yield the decompressed content of one member of a zip archive read sequentially.
+
+    The archive is parsed from its local file headers as the chunks arrive, so it never has
+    to be seekable or stored on disk. The member's CRC-32 is verified once it ends.
+    """
+    reader = _ChunkReader(chunks)
+    while True:
+        if reader.read_exact(4) != LOCAL_HEADER_SIGNATURE:
+            # Reached the central directory without seeing the member
+            raise ValueError(f"Member {member_name!r} not found in zip archive")
+
+        (_, flags, method, _, _, crc, compressed_size, _, name_length, extra_length) = (
+            struct.unpack("<HHHHHIIIHH", reader.read_exact(26))
+        )
+        encoding = "utf-8" if flags & FLAG_UTF8_NAME else "cp437"
+        name = reader.read_exact(name_length).decode(encoding)
+        zip64 = _has_zip64_extra(reader.read_exact(extra_length))
+        has_descriptor = bool(flags & FLAG_DATA_DESCRIPTOR)
+        content = _member_content(
+            reader,
+            name,
+            method,
+            compressed_size,
+            has_descriptor=has_descriptor,
+        )
+
+        if name != member_name:
+            for _ in content:
+                pass
+            if has_descriptor:
+                _read_data_descriptor_crc(reader, zip64=zip64)
+            continue
+
+        checksum = 0
+        for data in content:
+            checksum = zlib.crc32(data, checksum)
+            yield data
+
+        if has_descriptor:
+            crc = _read_data_descriptor_crc(reader, zip64=zip64)
+        if checksum != crc:
+            raise ValueError(f"CRC mismatch for zip member {member_name!r}")
+        return
@@ -0,0 +1,390 @@
+"""Vectorized generator of synthetic sales extracts for scale testing.
+
+Rows follow the layout of ``RAW.RAW_SALES_DATA``: countries are drawn from a fixed
+region -> country hierarchy, each item type has one unit price and cost as in the source
+dataset, and order dates grow denser towards the end of the date range. Rows arrive
+roughly in order-date order, except for a share of late-arriving rows dated in the past
+and a share of exact duplicates of earlier rows, which the raw layer has to deduplicate.
+
+Data is produced chunk by chunk with NumPy, so memory stays bounded by the chunk size
+times the number of workers. Each chunk has its own random stream derived from the seed,
+which makes the output reproducible for a given seed and chunk size. CSV output uses the
+source header and M/D/YYYY dates so it can stand in for the downloaded extract; Parquet
+uses SALES_SCHEMA.
+
+Run ``python -m utils.synthetic_sales ROWS DESTINATION`` to generate a file.
+"""
+
+import argparse
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import TypeVar
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from utils.logger import get_logger
+from utils.sales_data import (
+    DICTIONARY_COLUMNS,
+    SALES_SCHEMA,
+    STAGING_FORMATS,
+    to_source_batch,
+)
+
+logger = get_logger()
+
+T = TypeVar("T")
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+DEFAULT_WORKERS = 4
+DEFAULT_DUPLICATE_RATE = 0.01
+DEFAULT_LATE_RATE = 0.02
+# Exponent of the order date distribution; 1.0 is uniform, larger values favour later dates
+DEFAULT_DATE_SKEW = 2.0
+START_DATE = np.datetime64("2010-01-01")
+END_DATE = np.datetime64("2017-07-28")
+MAX_SHIPPING_DAYS = 50
+MAX_LATE_DAYS = 365
+
+REGIONS = {
+    "Asia": (
+        "Bangladesh", "Bhutan", "Brunei", "Cambodia", "China", "India", "Indonesia", "Japan",
+        "Kazakhstan", "Kyrgyzstan", "Laos", "Malaysia", "Maldives", "Mongolia", "Myanmar",
+        "Nepal", "North Korea", "Philippines", "Singapore", "South Korea", "Sri Lanka",
+        "Taiwan", "Tajikistan", "Thailand", "Turkmenistan", "Uzbekistan", "Vietnam",
+    ),
+    "Australia and Oceania": (
+        "Australia", "East Timor", "Federated States of Micronesia", "Fiji", "Kiribati",
+        "Marshall Islands", "Nauru", "New Zealand", "Palau", "Papua New Guinea", "Samoa",
+        "Solomon Islands", "Tonga", "Tuvalu", "Vanuatu",
+    ),
+    "Central America and the Caribbean": (
+        "Antigua and Barbuda", "Barbados", "Belize", "Costa Rica", "Cuba", "Dominica",
+        "Dominican Republic", "El Salvador", "Grenada", "Guatemala", "Haiti", "Honduras",
+        "Jamaica", "Nicaragua", "Panama", "Saint Kitts and Nevis", "Saint Lucia",
+        "Saint Vincent and the Grenadines", "The Bahamas", "Trinidad and Tobago",
+    ),
+    "Europe": (
+        "Albania", "Andorra", "Armenia", "Austria", "Belarus", "Belgium",
+        "Bosnia and Herzegovina", "Bulgaria", "Croatia", "Cyprus", "Czech Republic", "Denmark",
+        "Estonia", "Finland", "France", "Georgia", "Germany", "Greece", "Hungary", "Iceland",
+        "Ireland", "Italy", "Kosovo", "Latvia", "Liechtenstein", "Lithuania", "Luxembourg",
+        "Macedonia", "Malta", "Moldova", "Monaco", "Montenegro", "Netherlands", "Norway",
+        "Poland", "Portugal", "Romania", "Russia", "San Marino", "Serbia", "Slovakia",
+        "Slovenia", "Spain", "Sweden", "Switzerland", "Ukraine", "United Kingdom",
+        "Vatican City",
+    ),
+    "Middle East and North Africa": (
+        "Afghanistan", "Algeria", "Azerbaijan", "Bahrain", "Egypt", "Iran", "Iraq", "Israel",
+        "Jordan", "Kuwait", "Lebanon", "Libya", "Morocco", "Oman", "Pakistan", "Qatar",
+        "Saudi Arabia", "Syria", "Tunisia", "Turkey", "United Arab Emirates", "Yemen",
+    ),
+    "North America": ("Canada", "Greenland", "Mexico", "United States of America"),
+    "Sub-Saharan Africa": (
+        "Angola", "Benin", "Botswana", "Burkina Faso", "Burundi", "Cameroon", "Cape Verde",
+        "Central African Republic", "Chad", "Comoros", "Cote d'Ivoire",
+        "Democratic Republic of the Congo", "Djibouti", "Equatorial Guinea", "Eritrea",
+        "Ethiopia", "Gabon", "Ghana", "Guinea", "Guinea-Bissau", "Kenya", "Lesotho",
+        "Liberia", "Madagascar", "Malawi", "Mali", "Mauritania", "Mauritius", "Mozambique",
+        "Namibia", "Niger", "Nigeria", "Republic of the Congo", "Rwanda",
+        "Sao Tome and Principe", "Senegal", "Seychelles", "Sierra Leone", "Somalia",
+        "South Africa", "South Sudan", "Sudan", "Swaziland", "Tanzania", "The Gambia", "Togo",
+        "Uganda", "Zambia", "Zimbabwe",
+    ),
+}  # fmt: skip
+
+# Item type -> (unit price, unit cost), fixed per item type as in the source dataset
+ITEM_PRICES = {
+    "Baby Food": (255.28, 159.42),
+    "Beverages": (47.45, 31.79),
+    "Cereal": (205.70, 117.11),
+    "Clothes": (109.28, 35.84),
+    "Cosmetics": (437.20, 263.33),
+    "Fruits": (9.33, 6.92),
+    "Household": (668.27, 502.54),
+    "Meat": (421.89, 364.69),
+    "Office Supplies": (651.21, 524.96),
+    "Personal Care": (81.73, 56.67),
+    "Snacks": (152.58, 97.44),
+    "Vegetables": (154.06, 90.93),
+}
+SALES_CHANNELS = ("Offline", "Online")
+ORDER_PRIORITIES = ("C", "H", "L", "M")
+MAX_UNITS_SOLD = 10_000
+
+# Order IDs are a bijective scramble of the row index onto 10-digit numbers, so they look
+# random but never collide; the multiplier must be coprime with ORDER_ID_SPACE, which bounds
+# the rows of an extract.
+ORDER_ID_BASE = 1_000_000_000
+ORDER_ID_SPACE = 9_000_000_000
+ORDER_ID_MULTIPLIER = 7**10
+
+_COUNTRIES = pa.array([country for countries in REGIONS.values() for country in countries])
+_COUNTRY_REGION = np.repeat(
+    np.arange(len(REGIONS), dtype=np.int32),
+    [len(countries) for countries in REGIONS.values()],
+)
+_DICTIONARIES = {
+    "region": pa.array(list(REGIONS)),
+    "country": _COUNTRIES,
+    "item_type": pa.array(list(ITEM_PRICES)),
+    "sales_channel": pa.array(SALES_CHANNELS),
+    "order_priority": pa.array(ORDER_PRIORITIES),
+}
+_UNIT_PRICES, _UNIT_COSTS = np.array(list(ITEM_PRICES.values())).T
+
+
+def _order_days(
+    rng: np.random.Generator,
+    start: int,
+    size: int,
+    total_rows: int,
+    date_skew: float,
+) -> np.ndarray:
+    """Map each row's position in the output to an order date offset from START_DATE.
+
+    Positions are spread evenly over [0, 1) and passed through the inverse CDF ``p**(1/k)``,
+    so the stream is sorted by date while the number of orders per day grows over time.
+    """
+    span = (END_DATE - START_DATE).astype(int)
+    position = (np.arange(start, start + size) + rng.random(size)) / total_rows
+    return (position ** (1 / date_skew) * span).astype(np.int32)
+
+
+def _duplicate_sources(rng: np.random.Generator, size: int, duplicate_rate: float) -> np.ndarray:
+    """Return, per row, the index of the row whose content it carries.
+
+    Duplicates copy a random earlier original row of the same chunk; all other rows point
+    at themselves.
+    """
+    sources = np.arange(size)
+    is_duplicate = rng.random(size) < duplicate_rate
+    originals = np.flatnonzero(~is_duplicate)
+    duplicates = np.flatnonzero(is_duplicate)
+    # Number of originals before each duplicate; the first rows of a chunk stay original
+    earlier = np.searchsorted(originals, duplicates)
+    duplicates, earlier = duplicates[earlier > 0], earlier[earlier > 0]
+    sources[duplicates] = originals[(rng.random(len(duplicates)) * earlier).astype(np.int64)]
+    return sources
+
+
+def generate_batch(
+    rng: np.random.Generator,
+    start: int,
+    size: int,
+    total_rows: int,
+    *,
+    duplicate_rate: float = DEFAULT_DUPLICATE_RATE,
+    late_rate: float = DEFAULT_LATE_RATE,
+    date_skew: float = DEFAULT_DATE_SKEW,
+) -> pa.RecordBatch:
+    """Generate rows ``start`` to ``start + size`` of a ``total_rows`` extract."""
+    country = rng.integers(0, len(_COUNTRIES), size, dtype=np.int32)
+    item_type = rng.integers(0, len(ITEM_PRICES), size, dtype=np.int32)
+    indices = {
+        "region": _COUNTRY_REGION[country],
+        "country": country,
+        "item_type": item_type,
+        "sales_channel": rng.integers(0, len(SALES_CHANNELS), size, dtype=np.int32),
+        "order_priority": rng.integers(0, len(ORDER_PRIORITIES), size, dtype=np.int32),
+    }
+
+    order_days = _order_days(rng, start, size, total_rows, date_skew)
+    # Late rows reach the extract long after the orders around them were placed
+    is_late = rng.random(size) < late_rate
+    order_days[is_late] -= rng.integers(1, MAX_LATE_DAYS, is_late.sum(), dtype=np.int32)
+    np.maximum(order_days, 0, out=order_days)
+    ship_days = order_days + rng.integers(0, MAX_SHIPPING_DAYS + 1, size, dtype=np.int32)
+
+    row_index = np.arange(start, start + size, dtype=np.int64)
+    columns = {
+        **indices,
+        "order_date": START_DATE + order_days.astype("timedelta64[D]"),
+        "order_id": ORDER_ID_BASE + row_index * ORDER_ID_MULTIPLIER % ORDER_ID_SPACE,
+        "ship_date": START_DATE + ship_days.astype("timedelta64[D]"),
+        "units_sold": rng.integers(1, MAX_UNITS_SOLD + 1, size, dtype=np.int64),
+        "unit_price": _UNIT_PRICES[item_type],
+        "unit_cost": _UNIT_COSTS[item_type],
+    }
+
+    sources = _duplicate_sources(rng, size, duplicate_rate)
+    arrays = [
+        pa.DictionaryArray.from_arrays(columns[name][sources], _DICTIONARIES[name])
+        if name in DICTIONARY_COLUMNS
+        else pa.array(columns[name][sources], type=SALES_SCHEMA.field(name).type)
+        for name in SALES_SCHEMA.names
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=SALES_SCHEMA)
+
+
+def _check_rows(rows: int) -> None:
+    """Reject extracts with more rows than there are distinct order IDs."""
+    if rows > ORDER_ID_SPACE:
+        raise ValueError(f"At most {ORDER_ID_SPACE} rows have distinct order IDs, got {rows}")
+
+
+def _generate_chunk(
+    chunk: int,
+    rows: int,
+    seed: int,
+    chunk_size: int,
+    options: dict[str, float],
+) -> pa.RecordBatch:
+    """Generate one chunk from its own random stream, independent of the other chunks."""
+    start = chunk * chunk_size
+    rng = np.random.default_rng([seed, chunk])
+    return generate_batch(rng, start, min(chunk_size, rows - start), rows, **options)
+
+
+def iter_batches(
+    rows: int,
+    *,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    **options: float,
+) -> Iterator[pa.RecordBatch]:
+    """Yield a synthetic extract of ``rows`` rows as SALES_SCHEMA batches of ``chunk_size``.
+
+    ``options`` are passed through to ``generate_batch`` (duplicate and late rates, skew).
+    """
+    _check_rows(rows)
+    for chunk in range(-(-rows // chunk_size)):
+        yield _generate_chunk(chunk, rows, seed, chunk_size, options)
+
+
+def _encode_csv_chunk(
+    chunk: int,
+    rows: int,
+    seed: int,
+    chunk_size: int,
+    options: dict[str, float],
+) -> tuple[pa.Buffer, int]:
+    """Generate one chunk as source-format CSV bytes; only the first chunk has the header."""
+    batch = _generate_chunk(chunk, rows, seed, chunk_size, options)
+    sink = pa.BufferOutputStream()
+    pa_csv.write_csv(
+        to_source_batch(batch),
+        sink,
+        write_options=pa_csv.WriteOptions(include_header=chunk == 0),
+    )
+    return sink.getvalue(), batch.num_rows
+
+
+def _map_ordered(
+    executor: ThreadPoolExecutor,
+    fn: Callable[[int], T],
+    chunks: int,
+    window: int,
+) -> Iterator[T]:
+    """Run ``fn`` over the chunk numbers concurrently, yielding results in chunk order.
+
+    At most ``window`` chunks are generated ahead of the consumer, which bounds memory.
+    """
+    pending: deque[Future[T]] = deque()
+    for chunk in range(chunks):
+        if len(pending) == window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(fn, chunk))
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_sales_data(
+    destination: Path,
+    rows: int,
+    fmt: str = "csv",
+    *,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_workers: int = DEFAULT_WORKERS,
+    **options: float,
+) -> int:
+    """Write a synthetic extract to ``destination`` as CSV or Parquet; returns the row count.
+
+    Chunks are generated and encoded on ``max_workers`` threads (NumPy and Arrow release the
+    GIL) and written in order, so the file is the same for any number of workers.
+    ``options`` are passed through to ``generate_batch`` (duplicate and late rates, skew).
+    """
+    if fmt not in STAGING_FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}, expected one of {STAGING_FORMATS}")
+    _check_rows(rows)
+
+    started = time.perf_counter()
+    chunks = -(-rows // chunk_size)
+    written = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if fmt == "parquet":
+            generate = partial(
+                _generate_chunk,
+                rows=rows,
+                seed=seed,
+                chunk_size=chunk_size,
+                options=options,
+            )
+            with pq.ParquetWriter(
+                destination,
+                SALES_SCHEMA,
+                use_dictionary=list(DICTIONARY_COLUMNS),
+            ) as writer:
+                for batch in _map_ordered(executor, generate, chunks, max_workers):
+                    writer.write_batch(batch)
+                    written += batch.num_rows
+        else:
+            encode = partial(
+                _encode_csv_chunk,
+                rows=rows,
+                seed=seed,
+                chunk_size=chunk_size,
+                options=options,
+            )
+            with destination.open("wb") as output:
+                for data, chunk_rows in _map_ordered(executor, encode, chunks, max_workers):
+                    output.write(data)
+                    written += chunk_rows
+
+    seconds = time.perf_counter() - started
+    logger.info(
+        "Generated %d rows into %s in %.2fs (%.0f rows/s)",
+        written,
+        destination,
+        seconds,
+        written / seconds if seconds else 0.0,
+    )
+    return written
+
+
+def main() -> None:
+    """Generate a synthetic extract from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rows", type=int)
+    parser.add_argument("destination", type=Path)
+    parser.add_argument("--format", choices=STAGING_FORMATS, default="csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--duplicate-rate", type=float, default=DEFAULT_DUPLICATE_RATE)
+    parser.add_argument("--late-rate", type=float, default=DEFAULT_LATE_RATE)
+    parser.add_argument("--date-skew", type=float, default=DEFAULT_DATE_SKEW)
+    args = parser.parse_args()
+
+    write_sales_data(
+        args.destination,
+        args.rows,
+        args.format,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        max_workers=args.workers,
+        duplicate_rate=args.duplicate_rate,
+        late_rate=args.late_rate,
+        date_skew=args.date_skew,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""High-watermark of the incremental ADF copy, stored as a blob next to the staged data.
+
+The watermark is the end of the last last-modified window the copy loaded successfully.
+Each incremental run loads the blobs modified from the watermark up to the newest staged
+blob, and advances the watermark to the window end only once the copy has succeeded, so a
+failed or cancelled run is retried with the same window on the next run. Windows are
+half-open, like the ``modifiedDatetimeStart``/``modifiedDatetimeEnd`` filters of the copy,
+so no blob falls into two of them.
+
+The window end comes from the blobs' Last-Modified, i.e. from the storage clock the copy
+filters by, not from the local clock: if the two drift apart, a blob uploaded just before a
+local window end could fall outside the copy's filter and still be passed by the watermark.
+"""
+
+import json
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob import BlobProperties, ContainerClient
+
+from utils.logger import get_logger
+from utils.sales_data import partition_prefix
+
+logger = get_logger()
+
+# Window start of the first incremental run, which loads every blob
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+# Precision of a blob's Last-Modified
+LAST_MODIFIED_RESOLUTION = timedelta(seconds=1)
+
+
+def watermark_blob(blob_name: str) -> str:
+    """Return the blob holding the watermark of the extract's incremental copy."""
+    return f"{partition_prefix(blob_name)}/_watermark.json"
+
+
+@dataclass(frozen=True)
+class LoadWindow:
+    """Last-modified window of the blobs an incremental run loads; no start loads all."""
+
+    start: datetime | None
+    end: datetime
+
+    def contains(self, last_modified: datetime) -> bool:
+        """Whether a blob modified at ``last_modified`` falls into the window."""
+        return (self.start is None or last_modified >= self.start) and last_modified < self.end
+
+    def parameters(self) -> dict[str, str]:
+        """Return the window as pipeline run parameters."""
+        return {
+            "windowStart": (self.start or EPOCH).isoformat(),
+            "windowEnd": self.end.isoformat(),
+        }
+
+
+def read_watermark(container_client: ContainerClient, blob_name: str) -> datetime | None:
+    """Return the stored watermark, or None if nothing was loaded incrementally yet."""
+    try:
+        content = container_client.download_blob(watermark_blob(blob_name)).readall()
+    except ResourceNotFoundError:
+        return None
+    return datetime.fromisoformat(json.loads(content)["modified_before"])
+
+
+def next_window(
+    container_client: ContainerClient,
+    blob_name: str,
+    staged_blobs: Iterable[BlobProperties],
+) -> LoadWindow:
+    """Return the window from the stored watermark up to and including the newest blob.
+
+    The window is empty when no staged blob was modified since the watermark.
+    """
+    start = read_watermark(container_client, blob_name)
+    end = start or EPOCH
+    newest = max((blob.last_modified for blob in staged_blobs), default=None)
+    if newest:
+        end = max(end, newest + LAST_MODIFIED_RESOLUTION)
+    window = LoadWindow(start, end)
+    logger.info(
+        "Loading blobs modified from %s until %s",
+        window.start or "the beginning",
+        window.end,
+    )
+    return window
+
+
+def advance_watermark(
+    container_client: ContainerClient,
+    blob_name: str,
+    window: LoadWindow,
+    run_id: str,
+) -> None:
+    """Store the end of a successfully loaded window as the new watermark."""
+    watermark = {
+        "modified_before": window.end.isoformat(),
+        "run_id": run_id,
+        "updated_at": datetime.now(UTC).isoformat(),
+    }
+    container_client.upload_blob(
+        watermark_blob(blob_name),
+        json.dumps(watermark, indent=2),
+        overwrite=True,
+    )
+    logger.info("Advanced the watermark to %s", window.end)